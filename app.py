@@ -1,10 +1,14 @@
 # SMARTCONTROL/app.py
 # (FICHEIRO COMPLETO E CORRIGIDO)
 
-from flask import Flask, render_template, jsonify, g
+from flask import Flask, render_template, jsonify, g, request, got_request_exception
 from flask_cors import CORS # Importe o CORS
-from config.database import get_connection # Importe o get_connection
+from config.database import LazyConnection, LazyCursor, get_pool_stats
 from routes import all_blueprints
+from routes.decorators import get_permission_cache_stats
+from routes.audit_helper import init_audit_sink, get_audit_stats
+from routes.cache import get_cache_stats
+from commands import register_commands
 import logging
 from logging.handlers import RotatingFileHandler
 import os
@@ -31,6 +35,14 @@ def create_app():
     origins = origins_env.split(',')
     
     CORS(app, resources={r"/api/*": {"origins": origins}}, supports_credentials=True)
+
+    # 4. Unit of work: um único commit por requisição (escrita + auditoria).
+    # Ative com DB_UNIT_OF_WORK=true.
+    app.config['DB_UNIT_OF_WORK'] = os.environ.get('DB_UNIT_OF_WORK', 'False').lower() == 'true'
+
+    # 5. Uploads servidos pelo servidor web (X-Sendfile) em vez do worker Python.
+    # Só com um proxy configurado para isso (ex: Apache mod_xsendfile).
+    app.config['USE_X_SENDFILE'] = os.environ.get('USE_X_SENDFILE', 'False').lower() == 'true'
     
     # --- FIM DAS CONFIGURAÇÕES DE PRODUÇÃO ---
 
@@ -55,27 +67,74 @@ def create_app():
     app.logger.info('SMARTCONTROL startup')
     # --- FIM DA CONFIGURAÇÃO DE LOGS ---
 
+    # --- AUDITORIA (síncrona ou em lote/background, ver AUDIT_SINK) ---
+    init_audit_sink(app)
+
 
     # --- GESTÃO AUTOMÁTICA DA BASE DE DADOS ---
     @app.before_request
     def db_connect():
-        """Abre uma conexão DB antes de cada requisição."""
-        if not hasattr(g, 'db_conn') or g.db_conn.is_connected() == False:
-            g.db_conn = get_connection()
-            if g.db_conn:
-                g.db_cursor = g.db_conn.cursor(dictionary=True)
-            else:
-                app.logger.error("Falha ao obter conexão com a base de dados.")
-                g.db_cursor = None
+        """
+        Prepara handles "preguiçosos" para a requisição: a conexão só é
+        emprestada do pool quando a rota executar SQL pela primeira vez.
+        """
+        g.db_conn = LazyConnection(deferred_commit=app.config['DB_UNIT_OF_WORK'],
+                                   on_statement=app.config.get('DB_STATEMENT_LISTENER'))
+        g.db_cursor = LazyCursor(g.db_conn, dictionary=True)
+
+    def db_mark_failed(sender, exception, **extra):
+        """Exceção não tratada na rota: o after_request corre na mesma, mas não pode fazer commit."""
+        g.db_request_failed = True
+
+    # weak=False: a função é local a create_app e o sinal só guardaria uma referência fraca
+    got_request_exception.connect(db_mark_failed, app, weak=False)
+
+    @app.after_request
+    def db_commit(response):
+        """
+        Modo unit of work (DB_UNIT_OF_WORK=true): a escrita da rota e a auditoria
+        vão num único commit, feito aqui. Se o commit falhar, a resposta passa a 500.
+        Uma resposta 5xx ou uma exceção na rota desfaz a transação, mesmo que a
+        rota tenha chamado commit() antes de falhar.
+        """
+        conn = g.get('db_conn')
+        if conn is None or not conn.deferred_commit:
+            return response
+        if g.get('db_request_failed') or response.status_code >= 500:
+            try:
+                conn.rollback()
+            except Exception as e:
+                app.logger.error(f"Falha no rollback da unit of work ({request.path}): {e}", exc_info=True)
+            return response
+        try:
+            conn.finish()
+        except Exception as e:
+            app.logger.error(f"Falha no commit da unit of work ({request.path}): {e}", exc_info=True)
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+            return jsonify({'message': 'Erro interno ao gravar as alterações'}), 500
+        return response
 
     @app.teardown_request
     def db_disconnect(exception=None):
-        """Fecha a conexão DB depois de cada requisição."""
+        """Devolve a conexão DB ao pool (se a requisição chegou a usar uma)."""
+        conn = getattr(g, 'db_conn', None)
+        if exception and conn:
+            # Rollback automático de qualquer transação deixada a meio
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+
+        # Não usar 'if cursor:' aqui - num LazyCursor isso abriria a conexão.
         cursor = getattr(g, 'db_cursor', None)
-        if cursor:
+        if cursor is not None:
             cursor.close()
         conn = getattr(g, 'db_conn', None)
-        if conn and conn.is_connected():
+        if conn is not None:
+            # close() devolve a conexão ao pool (que descarta as que caíram)
             conn.close()
             
         if exception:
@@ -90,6 +149,9 @@ def create_app():
         # app.logger.info(f"Blueprint '{bp.name}' registrado em {prefix}")
 
     
+    # --- COMANDOS CLI (flask --app app db-migrate, ...) ---
+    register_commands(app)
+
     # --- ROTAS PRINCIPAIS (HTML) ---
     @app.route('/')
     def index():
@@ -106,7 +168,10 @@ def create_app():
                 db_status = "OK"
             else:
                 db_status = "Connection Failed"
-            return jsonify(status="OK", database=db_status), 200
+            return jsonify(status="OK", database=db_status, pool=get_pool_stats(),
+                           permissionCache=get_permission_cache_stats(),
+                           audit=get_audit_stats(),
+                           caches=get_cache_stats()), 200
         except Exception as e:
             app.logger.error(f"Health check falhou: {e}", exc_info=True)
             return jsonify(status="Error", database="Error"), 500
@@ -0,0 +1,103 @@
+# SMARTCONTROL/commands.py
+# Comandos de linha de comandos da aplicação (flask --app app <comando>).
+
+import click
+from config.database import get_connection
+from config.migrations import apply_migrations
+from config.explain_check import seed_database, run_explain_check
+from routes.records_read_model import rebuild as rebuild_records_read_model, RECORDS_REBUILD_CHUNK
+from routes.audit_archive import ensure_future_partitions, archive_old_partitions, AUDIT_RETENTION_MONTHS, AUDIT_ARCHIVE_DIR
+from routes.audit_helper import replay_spill, AUDIT_SPILL_PATH
+
+
+def _connection_or_fail():
+    conn = get_connection()
+    if conn is None:
+        raise click.ClickException('Falha ao obter conexão com a base de dados.')
+    return conn
+
+
+def register_commands(app):
+    """Regista os comandos CLI na aplicação."""
+
+    @app.cli.command('db-migrate')
+    def db_migrate():
+        """Aplica as migrações pendentes de database/migrations."""
+        conn = _connection_or_fail()
+        try:
+            applied = apply_migrations(conn, log=click.echo)
+        finally:
+            conn.close()
+        click.echo(f"{len(applied)} migração(ões) aplicada(s)." if applied else "Nenhuma migração pendente.")
+
+    @app.cli.command('audit-partitions')
+    @click.option('--months-ahead', default=3, show_default=True, help='Meses futuros a preparar.')
+    def audit_partitions(months_ahead):
+        """Cria as partições mensais da auditoria para os próximos meses."""
+        conn = _connection_or_fail()
+        try:
+            created = ensure_future_partitions(conn, months_ahead)
+        finally:
+            conn.close()
+        click.echo(f"Partições criadas: {', '.join(created)}" if created else "Nenhuma partição nova necessária.")
+
+    @app.cli.command('audit-archive')
+    @click.option('--retention-months', default=AUDIT_RETENTION_MONTHS, show_default=True,
+                  help='Meses mantidos na tabela; os anteriores vão para o arquivo.')
+    @click.option('--archive-dir', default=AUDIT_ARCHIVE_DIR, show_default=True)
+    def audit_archive(retention_months, archive_dir):
+        """Move as partições de auditoria além da retenção para ficheiros JSONL.gz."""
+        conn = _connection_or_fail()
+        try:
+            archived = archive_old_partitions(conn, retention_months, archive_dir)
+        finally:
+            conn.close()
+        if not archived:
+            click.echo("Nenhuma partição a arquivar.")
+        for name, rows in archived.items():
+            click.echo(f"{name}: {rows} linhas arquivadas.")
+
+    @app.cli.command('audit-replay-spill')
+    @click.option('--spill-path', default=AUDIT_SPILL_PATH, show_default=True)
+    def audit_replay_spill(spill_path):
+        """Grava na auditoria as entradas do ficheiro de spill (AUDIT_SINK=async) e apaga-o."""
+        conn = _connection_or_fail()
+        try:
+            total = replay_spill(conn, spill_path, log=click.echo)
+        finally:
+            conn.close()
+        click.echo(f"{total} entrada(s) reposta(s)." if total else "Nenhuma entrada de auditoria por repor.")
+
+    @app.cli.command('records-rebuild')
+    @click.option('--chunk', default=RECORDS_REBUILD_CHUNK, show_default=True, help='Termos por commit.')
+    def records_rebuild(chunk):
+        """Reconstrói o modelo de leitura dos termos (registros_leitura) a partir das tabelas de origem."""
+        conn = _connection_or_fail()
+        try:
+            total = rebuild_records_read_model(conn, chunk, log=click.echo)
+        finally:
+            conn.close()
+        click.echo(f"{total} termo(s) no modelo de leitura.")
+
+    @app.cli.command('explain-check')
+    @click.option('--seed', 'seed_scale', type=int, default=0,
+                  help='Semeia N aparelhos/funcionários/linhas sintéticos antes (só em bases locais!).')
+    @click.option('--path', 'paths', multiple=True, help='Rota GET a verificar (por omissão, as rotas "quentes").')
+    def explain_check(seed_scale, paths):
+        """Falha se alguma consulta das rotas fizer full scan ou filesort (EXPLAIN)."""
+        conn = _connection_or_fail()
+        try:
+            if seed_scale:
+                seeded = seed_database(conn, seed_scale)
+                click.echo(f"{seed_scale} registos sintéticos inseridos." if seeded else "Dados sintéticos já existentes.")
+            failures = run_explain_check(app, conn, list(paths) or None)
+        finally:
+            conn.close()
+
+        for path, sql, problems in failures:
+            click.echo(f"\n{path}\n  {sql}")
+            for problem in problems:
+                click.echo(f"  -> {problem}")
+        if failures:
+            raise click.ClickException(f"{len(failures)} consulta(s) com plano de execução problemático.")
+        click.echo("Todos os planos de execução usam índices.")
@@ -1,23 +1,408 @@
 import mysql.connector
 from mysql.connector import Error
 import os # Importe a biblioteca 'os'
+import queue
+import threading
+import time
+import logging
+
+logger = logging.getLogger('flask.app')
+
+
+def _env_int(name, default):
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _env_bool(name, default):
+    return str(os.environ.get(name, default)).lower() in ('1', 'true', 'yes', 'on')
+
+
+def _connect():
+    """Abre uma conexão física nova com o MySQL."""
+    # Use os.environ.get() para ler as credenciais do ambiente.
+    # Os valores 'root', '123456', etc., são agora "fallbacks" apenas para desenvolvimento.
+    return mysql.connector.connect(
+        host=os.environ.get('DB_HOST', 'localhost'),
+        user=os.environ.get('DB_USER', 'root'),
+        password=os.environ.get('DB_PASS', '123456'), # Altere '123456' para a sua senha de dev, se for diferente
+        database=os.environ.get('DB_NAME', 'controle_ativos'),
+        port=os.environ.get('DB_PORT', 3306)
+    )
+
+
+class PooledConnection:
+    """
+    Embrulha uma conexão física do pool.
+    close() devolve a conexão ao pool em vez de a fechar; todo o resto
+    (cursor, commit, rollback, is_connected...) é delegado à conexão real.
+    """
+
+    def __init__(self, pool, raw_conn, created_at):
+        self._pool = pool
+        self._raw = raw_conn
+        self._created_at = created_at
+        self._returned = False
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def close(self):
+        if self._returned:
+            return
+        self._returned = True
+        self._pool._release(self._raw, self._created_at)
+
+
+class ConnectionPool:
+    """
+    Pool de conexões MySQL com tamanho fixo + overflow.
+
+    - pool_size: conexões mantidas abertas (idle) entre requisições.
+    - max_overflow: conexões extra criadas em picos; são fechadas ao devolver
+      se o pool já estiver cheio.
+    - timeout: segundos de espera por uma conexão livre antes de falhar.
+    - max_lifetime: conexões mais antigas que isto (segundos) são recicladas.
+    - ping_after: conexões paradas há mais que isto (segundos) levam um ping
+      antes de serem entregues.
+    - reset_on_return: faz rollback/reset da sessão ao devolver a conexão.
+    """
+
+    def __init__(self, connect, pool_size=5, max_overflow=10, timeout=10,
+                 max_lifetime=1800, ping_after=30, reset_on_return=True):
+        self._connect = connect
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.ping_after = ping_after
+        self.reset_on_return = reset_on_return
+
+        # Cada item do idle é (conexão, criada_em, devolvida_em)
+        self._idle = queue.LifoQueue(maxsize=pool_size)
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(pool_size + max_overflow)
+        self._open = 0
+        self._in_use = 0
+        self._checkouts = 0
+        self._checkout_failures = 0
+        self._recycled = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def _discard(self, raw_conn):
+        try:
+            raw_conn.close()
+        except Exception:
+            pass
+        with self._lock:
+            self._open -= 1
+
+    def _is_usable(self, raw_conn, created_at, returned_at):
+        now = time.monotonic()
+        if self.max_lifetime and now - created_at > self.max_lifetime:
+            with self._lock:
+                self._recycled += 1
+            return False
+        if self.ping_after is not None and now - returned_at > self.ping_after:
+            try:
+                raw_conn.ping(reconnect=False)
+            except Exception:
+                return False
+        return True
+
+    def acquire(self):
+        """Empresta uma conexão do pool (ou cria uma nova, até ao limite)."""
+        started = time.monotonic()
+        if not self._slots.acquire(timeout=self.timeout):
+            with self._lock:
+                self._checkout_failures += 1
+            raise Error(msg=f"Pool de conexões esgotado (timeout de {self.timeout}s).")
+
+        waited = time.monotonic() - started
+        try:
+            while True:
+                try:
+                    raw_conn, created_at, returned_at = self._idle.get_nowait()
+                except queue.Empty:
+                    raw_conn = self._connect()
+                    created_at = time.monotonic()
+                    with self._lock:
+                        self._open += 1
+                    break
+                if self._is_usable(raw_conn, created_at, returned_at):
+                    break
+                self._discard(raw_conn)
+        except Exception:
+            self._slots.release()
+            with self._lock:
+                self._checkout_failures += 1
+            raise
+
+        with self._lock:
+            self._in_use += 1
+            self._checkouts += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+        return PooledConnection(self, raw_conn, created_at)
+
+    def _release(self, raw_conn, created_at):
+        with self._lock:
+            self._in_use -= 1
+        try:
+            keep = raw_conn.is_connected()
+            if keep and self.reset_on_return:
+                # Garante que nada da requisição anterior (transação aberta,
+                # variáveis de sessão) passa para a próxima.
+                raw_conn.rollback()
+                raw_conn.reset_session()
+            if keep and self.max_lifetime and time.monotonic() - created_at > self.max_lifetime:
+                with self._lock:
+                    self._recycled += 1
+                keep = False
+            if keep:
+                try:
+                    self._idle.put_nowait((raw_conn, created_at, time.monotonic()))
+                except queue.Full:
+                    keep = False
+            if not keep:
+                self._discard(raw_conn)
+        except Exception as e:
+            logger.warning(f"Conexão descartada ao voltar ao pool: {e}")
+            self._discard(raw_conn)
+        finally:
+            self._slots.release()
+
+    def stats(self):
+        """Métricas do pool (para /health e monitorização)."""
+        with self._lock:
+            return {
+                'size': self.pool_size,
+                'maxOverflow': self.max_overflow,
+                'open': self._open,
+                'inUse': self._in_use,
+                'idle': self._idle.qsize(),
+                'checkouts': self._checkouts,
+                'checkoutFailures': self._checkout_failures,
+                'recycled': self._recycled,
+                'waitAvgMs': round(self._wait_total / self._checkouts * 1000, 3) if self._checkouts else 0.0,
+                'waitMaxMs': round(self._wait_max * 1000, 3),
+            }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Cria (uma vez por processo) o pool configurado pelas variáveis de ambiente."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    _connect,
+                    pool_size=_env_int('DB_POOL_SIZE', 5),
+                    max_overflow=_env_int('DB_POOL_MAX_OVERFLOW', 10),
+                    timeout=_env_int('DB_POOL_TIMEOUT', 10),
+                    max_lifetime=_env_int('DB_POOL_MAX_LIFETIME', 1800),
+                    ping_after=_env_int('DB_POOL_PING_AFTER', 30),
+                    reset_on_return=_env_bool('DB_POOL_RESET_ON_RETURN', True),
+                )
+    return _pool
+
+
+def get_pool_stats():
+    return get_pool().stats()
+
 
 def get_connection():
     """
-    Estabelece uma conexão com a base de dados usando variáveis de ambiente.
+    Empresta uma conexão do pool. Chamar close() devolve-a ao pool.
+    Com DB_POOL_ENABLED=false volta ao comportamento antigo (uma conexão nova por chamada).
     """
     try:
-        # Use os.environ.get() para ler as credenciais do ambiente.
-        # Os valores 'root', '123456', etc., são agora "fallbacks" apenas para desenvolvimento.
-        conn = mysql.connector.connect(
-            host=os.environ.get('DB_HOST', 'localhost'),
-            user=os.environ.get('DB_USER', 'root'),
-            password=os.environ.get('DB_PASS', '123456'), # Altere '123456' para a sua senha de dev, se for diferente
-            database=os.environ.get('DB_NAME', 'controle_ativos'),
-            port=os.environ.get('DB_PORT', 3306)
-        )
-        return conn
+        if not _env_bool('DB_POOL_ENABLED', True):
+            return _connect()
+        return get_pool().acquire()
     except Error as e:
-        # É melhor usar um logger aqui, mas print() funciona por agora.
-        print(f"Erro ao conectar no MySQL: {e}")
-        return None
\ No newline at end of file
+        logger.error(f"Erro ao conectar no MySQL: {e}")
+        return None
+
+
+class LazyConnection:
+    """
+    Conexão "preguiçosa" para a requisição: só empresta uma conexão do pool
+    na primeira vez que alguém realmente precisa dela (cursor, commit...).
+    Rotas que não tocam na base de dados nunca chegam a abrir conexão.
+
+    Com deferred_commit=True (modo "unit of work") os commit() feitos pelas rotas
+    apenas marcam a transação para commit; o commit real acontece uma única vez
+    em finish(), no fim da requisição.
+    """
+
+    def __init__(self, factory=get_connection, deferred_commit=False, on_statement=None):
+        self._factory = factory
+        self._conn = None
+        # on_statement(sql, params), se indicado, é chamado antes de cada execute
+        # dos cursores desta conexão (usado pelo 'flask explain-check').
+        self.on_statement = on_statement
+        self._failed = False
+        self.deferred_commit = deferred_commit
+        self._commit_pending = False
+        self._before_commit = []
+        self._after_commit = []
+        # Dados ligados à transação corrente (ex: linhas de auditoria pendentes);
+        # descartados em rollback e depois do commit.
+        self.tx_data = {}
+
+    def _ensure(self):
+        if self._conn is None and not self._failed:
+            self._conn = self._factory()
+            if self._conn is None:
+                self._failed = True
+                logger.error("Falha ao obter conexão com a base de dados.")
+        return self._conn
+
+    @property
+    def acquired(self):
+        return self._conn is not None
+
+    def __bool__(self):
+        # Só é "verdadeira" se já houver conexão aberta: o padrão
+        # 'if g.db_conn: g.db_conn.rollback()' não deve abrir uma conexão só para o rollback.
+        return self._conn is not None
+
+    def __getattr__(self, name):
+        conn = self._ensure()
+        if conn is None:
+            raise Error(msg="Sem conexão com a base de dados.")
+        return getattr(conn, name)
+
+    def cursor(self, **kwargs):
+        conn = self._ensure()
+        if conn is None:
+            raise Error(msg="Sem conexão com a base de dados.")
+        cursor = conn.cursor(**kwargs)
+        return RecordingCursor(cursor, self.on_statement) if self.on_statement else cursor
+
+    def add_before_commit(self, hook):
+        """Regista hook(conn) a executar na mesma transação, imediatamente antes do commit real."""
+        self._before_commit.append(hook)
+
+    def add_after_commit(self, callback):
+        """
+        Regista callback() a executar depois do commit real (descartado em rollback).
+        Sem commit diferido, as rotas já fizeram commit quando o chamam: corre de imediato.
+        """
+        if not self.deferred_commit:
+            callback()
+            return
+        self._after_commit.append(callback)
+
+    def _commit_now(self):
+        conn = self._ensure()
+        if conn is None:
+            raise Error(msg="Sem conexão com a base de dados.")
+        hooks, self._before_commit = self._before_commit, []
+        for hook in hooks:
+            hook(self)
+        conn.commit()
+        self._commit_pending = False
+        self.tx_data = {}
+        callbacks, self._after_commit = self._after_commit, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Erro num callback pós-commit: {e}", exc_info=True)
+
+    def commit(self):
+        if self.deferred_commit:
+            self._commit_pending = True
+            return
+        self._commit_now()
+
+    def rollback(self):
+        self._commit_pending = False
+        self._before_commit = []
+        self._after_commit = []
+        self.tx_data = {}
+        if self._conn is not None:
+            self._conn.rollback()
+
+    def finish(self):
+        """Fecha a unit of work: um único commit se alguma rota o pediu, senão rollback."""
+        if self._conn is None:
+            return
+        if self._commit_pending:
+            self._commit_now()
+        else:
+            self.rollback()
+
+    def is_connected(self):
+        return self._conn is not None and self._conn.is_connected()
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+class RecordingCursor:
+    """Cursor que comunica cada instrução executada a um listener, antes de a executar."""
+
+    def __init__(self, cursor, listener):
+        self._cursor = cursor
+        self._listener = listener
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        self._listener(operation, params)
+        return self._cursor.execute(operation, params, *args, **kwargs)
+
+    def executemany(self, operation, seq_params, *args, **kwargs):
+        seq_params = list(seq_params)
+        self._listener(operation, seq_params[0] if seq_params else None)
+        return self._cursor.executemany(operation, seq_params, *args, **kwargs)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class LazyCursor:
+    """
+    Cursor "preguiçoso" associado a uma LazyConnection. O teste 'if not g.db_cursor'
+    usado pelas rotas é o ponto onde a conexão é realmente obtida.
+    """
+
+    def __init__(self, lazy_conn, **cursor_kwargs):
+        self._lazy_conn = lazy_conn
+        self._cursor_kwargs = cursor_kwargs
+        self._cursor = None
+
+    def _ensure(self):
+        if self._cursor is None:
+            if self._lazy_conn._ensure() is not None:
+                self._cursor = self._lazy_conn.cursor(**self._cursor_kwargs)
+        return self._cursor
+
+    def __bool__(self):
+        return self._ensure() is not None
+
+    def __getattr__(self, name):
+        cursor = self._ensure()
+        if cursor is None:
+            raise Error(msg="Sem conexão com a base de dados.")
+        return getattr(cursor, name)
+
+    def close(self):
+        if self._cursor is not None:
+            try:
+                self._cursor.close()
+            finally:
+                self._cursor = None
@@ -0,0 +1,217 @@
+# SMARTCONTROL/config/explain_check.py
+# Verificação dos planos de execução das consultas "quentes" ('flask explain-check').
+#
+# 1. (opcional) semeia a base de dados LOCAL com dados sintéticos, para que o
+#    otimizador escolha os planos que escolheria em produção;
+# 2. chama as rotas GET com o test client da aplicação, registando todas as
+#    instruções SQL executadas (LazyConnection.on_statement);
+# 3. corre EXPLAIN sobre cada SELECT registado e reporta full scans (type ALL)
+#    e ordenações sem índice (Using filesort).
+
+from datetime import date, datetime, timedelta
+from urllib.parse import quote
+import logging
+from routes.records_read_model import rebuild as rebuild_records_read_model
+
+logger = logging.getLogger('flask.app')
+
+# Prefixo dos dados sintéticos (matrículas, números, IMEIs)
+SEED_PREFIX = 'EXP'
+
+# Pedidos verificados; os {marcadores} são preenchidos com ids dos dados existentes
+HOT_REQUESTS = [
+    '/api/records/?page=1&limit=10',
+    '/api/records/?page=1&limit=10&filter=Em%20Uso',
+    '/api/records/?cursor=&limit=10',
+    '/api/records/?page=1&limit=10&sort_column=employeeName&sort_direction=asc',
+    '/api/records/{record_id}',
+    '/api/employees/?page=1&limit=20',
+    '/api/employees/{employee_id}/history',
+    '/api/devices/?page=1&limit=20',
+    '/api/devices/{imei}/history',
+    '/api/lines/?page=1&limit=20',
+    '/api/lines/{line_id}/history',
+    '/api/maintenance/?page=1&limit=20',
+    '/api/audit/Device/{device_id}?limit=20',
+    '/api/audit/?limit=20',
+    '/api/search/?q={imei_prefix}',
+]
+
+# Tabelas pequenas por natureza, onde um full scan é o plano certo
+ALLOWED_FULL_SCAN = {'empresa', 'usuarios', 'schema_migrations'}
+
+
+def _insert_rows(cursor, table, columns, rows, chunk=1000):
+    placeholders = '(' + ', '.join(['%s'] * len(columns)) + ')'
+    for start in range(0, len(rows), chunk):
+        part = rows[start:start + chunk]
+        cursor.execute(
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES " + ', '.join([placeholders] * len(part)),
+            tuple(v for row in part for v in row)
+        )
+
+
+def _seeded_ids(cursor, table, column):
+    cursor.execute(f"SELECT id FROM {table} WHERE {column} LIKE %s ORDER BY id", (SEED_PREFIX + '%',))
+    return [row['id'] for row in cursor.fetchall()]
+
+
+def seed_database(conn, scale=5000):
+    """
+    Insere 'scale' funcionários, linhas e aparelhos sintéticos, com termos,
+    manutenções, histórico de linhas e auditoria proporcionais. Só para bases locais.
+    Devolve False se os dados sintéticos já existirem.
+    """
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute("SELECT 1 FROM funcionarios WHERE matricula = %s", (f'{SEED_PREFIX}{0:07d}',))
+        if cursor.fetchone():
+            return False
+
+        today = date.today()
+        _insert_rows(cursor, 'funcionarios', ('nome', 'matricula', 'cargo', 'email'), [
+            (f'Funcionário {i}', f'{SEED_PREFIX}{i:07d}', f'Cargo {i % 20}', f'func{i}@exemplo.local')
+            for i in range(scale)
+        ])
+        _insert_rows(cursor, 'linhas', ('numero', 'operadora', 'plano', 'status'), [
+            (f'{SEED_PREFIX}{i:09d}', ('Vivo', 'Claro', 'TIM')[i % 3], f'Plano {i % 5}',
+             'Ativa' if i % 10 else 'Inativa')
+            for i in range(scale)
+        ])
+        employee_ids = _seeded_ids(cursor, 'funcionarios', 'matricula')
+        line_ids = _seeded_ids(cursor, 'linhas', 'numero')
+
+        conditions = ('Novo', 'Aprovado para uso', 'Em manutenção', 'Danificado')
+        _insert_rows(cursor, 'aparelhos', ('modelo', 'imei1', 'imei2', 'linha_id', 'condicao', 'observacoes'), [
+            (f'Modelo {i % 50}', f'{SEED_PREFIX}{i:012d}', None, line_ids[i] if i % 2 else None,
+             conditions[i % len(conditions)], f'Observação {i}')
+            for i in range(scale)
+        ])
+        device_ids = _seeded_ids(cursor, 'aparelhos', 'imei1')
+
+        records = []
+        for i, device_id in enumerate(device_ids):
+            employee_id = employee_ids[i % len(employee_ids)]
+            delivered = today - timedelta(days=400 + i % 365)
+            records.append((employee_id, device_id, delivered, delivered + timedelta(days=90), 'Devolvido'))
+            if i % 2:
+                records.append((employee_id, device_id, today - timedelta(days=i % 300), None, 'Em Uso'))
+        _insert_rows(cursor, 'registros', ('funcionario_id', 'aparelho_id', 'data_entrega', 'data_devolucao', 'status'), records)
+        cursor.execute(
+            "UPDATE aparelhos a JOIN registros r ON r.aparelho_id = a.id AND r.status = 'Em Uso' "
+            "SET a.registro_atual_id = r.id WHERE a.imei1 LIKE %s", (SEED_PREFIX + '%',)
+        )
+        conn.commit()
+        rebuild_records_read_model(conn)
+
+        _insert_rows(cursor, 'manutencoes', ('aparelho_id', 'data_envio', 'fornecedor', 'custo', 'status'), [
+            (device_id, today - timedelta(days=i % 500), f'Fornecedor {i % 8}', 100 + i % 400,
+             'Em manutenção' if i % 4 == 0 else 'Concluído')
+            for i, device_id in enumerate(device_ids[::2])
+        ])
+        _insert_rows(cursor, 'linha_historico', ('linha_id', 'aparelho_imei', 'data_vinculacao'), [
+            (line_id, f'{SEED_PREFIX}{i:012d}', datetime.now() - timedelta(days=i % 700))
+            for i, line_id in enumerate(line_ids)
+        ])
+        _insert_rows(cursor, 'auditoria', ('timestamp', 'user_id', 'username', 'action_type',
+                                           'target_resource', 'target_id', 'details'), [
+            (datetime.now() - timedelta(minutes=i), 1, 'Seed', ('CREATE', 'UPDATE')[i % 2],
+             'Device', str(device_ids[i % len(device_ids)]), '{}')
+            for i in range(scale * 2)
+        ])
+        conn.commit()
+
+        for table in ('funcionarios', 'linhas', 'aparelhos', 'registros', 'registros_leitura', 'manutencoes', 'linha_historico', 'auditoria'):
+            cursor.execute(f"ANALYZE TABLE {table}")
+            cursor.fetchall()
+        return True
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def _request_params(conn):
+    """Ids reais para preencher os marcadores de HOT_REQUESTS."""
+    cursor = conn.cursor(dictionary=True)
+    try:
+        values = {}
+        for name, sql in (
+            ('record_id', "SELECT id FROM registros ORDER BY id LIMIT 1"),
+            ('employee_id', "SELECT funcionario_id AS id FROM registros ORDER BY id LIMIT 1"),
+            ('device_id', "SELECT id FROM aparelhos ORDER BY id LIMIT 1"),
+            ('line_id', "SELECT id FROM linhas ORDER BY id LIMIT 1"),
+        ):
+            cursor.execute(sql)
+            row = cursor.fetchone()
+            values[name] = row['id'] if row else 0
+        cursor.execute("SELECT imei1 FROM aparelhos WHERE id = %s", (values['device_id'],))
+        row = cursor.fetchone()
+        imei = row['imei1'] if row else '0'
+        values['imei'] = quote(imei)
+        values['imei_prefix'] = quote(imei[:6])
+        return values
+    finally:
+        cursor.close()
+
+
+def collect_statements(app, paths):
+    """Chama cada rota GET com o test client e devolve {path: [(sql, params)]}."""
+    recorded = []
+    previous = app.config.get('DB_STATEMENT_LISTENER')
+    app.config['DB_STATEMENT_LISTENER'] = lambda sql, params: recorded.append((sql, params))
+    statements = {}
+    try:
+        with app.test_client() as client:
+            for path in paths:
+                recorded.clear()
+                response = client.get(path)
+                if response.status_code >= 400:
+                    logger.warning(f"explain-check: {path} respondeu {response.status_code}")
+                statements[path] = list(recorded)
+    finally:
+        app.config['DB_STATEMENT_LISTENER'] = previous
+    return statements
+
+
+def explain_problems(conn, sql, params):
+    """Corre EXPLAIN e devolve as linhas do plano com full scan ou filesort."""
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute("EXPLAIN " + sql, params)
+        plan = cursor.fetchall()
+    finally:
+        cursor.close()
+
+    problems = []
+    for row in plan:
+        table = row.get('table') or ''
+        extra = row.get('Extra') or ''
+        if not table or table.startswith('<'):
+            continue  # tabelas derivadas / UNION: o custo está nas linhas de origem
+        if row.get('type') == 'ALL' and table not in ALLOWED_FULL_SCAN:
+            problems.append(f"full scan em '{table}' (~{row.get('rows')} linhas)")
+        if 'Using filesort' in extra:
+            problems.append(f"filesort em '{table}' ({extra})")
+    return problems
+
+
+def run_explain_check(app, conn, paths=None):
+    """
+    Verifica os SELECT emitidos por cada rota. Devolve [(path, sql, [problemas])]
+    só com as instruções problemáticas (lista vazia = tudo bem).
+    """
+    values = _request_params(conn)
+    paths = [path.format(**values) for path in (paths or HOT_REQUESTS)]
+    failures = []
+    seen = set()
+    for path, statements in collect_statements(app, paths).items():
+        for sql, params in statements:
+            if not sql.lstrip('( \n\t').upper().startswith('SELECT') or sql in seen:
+                continue
+            seen.add(sql)
+            problems = explain_problems(conn, sql, params)
+            if problems:
+                failures.append((path, ' '.join(sql.split()), problems))
+    return failures
@@ -0,0 +1,68 @@
+# SMARTCONTROL/config/migrations.py
+# Aplica as migrações versionadas em database/migrations (ficheiros V<nnn>__descricao.sql).
+# O schema completo em database/controle_ativos.sql já regista as versões que inclui,
+# por isso uma instalação nova não volta a aplicá-las.
+
+import os
+import re
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'database', 'migrations')
+_FILENAME_RE = re.compile(r'^(V\d+)__(.+)\.sql$')
+
+
+def list_migrations(directory=MIGRATIONS_DIR):
+    """Devolve [(versão, caminho)] ordenado pela versão."""
+    found = []
+    for name in os.listdir(directory) if os.path.isdir(directory) else []:
+        match = _FILENAME_RE.match(name)
+        if match:
+            found.append((match.group(1), os.path.join(directory, name)))
+    return sorted(found, key=lambda item: int(item[0][1:]))
+
+
+def split_statements(sql_text):
+    """Divide um ficheiro SQL em instruções (terminadas por ';' no fim da linha)."""
+    statements, current = [], []
+    for line in sql_text.splitlines():
+        stripped = line.strip()
+        if not current and (not stripped or stripped.startswith('--')):
+            continue
+        current.append(line)
+        if stripped.endswith(';'):
+            statements.append('\n'.join(current).rstrip().rstrip(';'))
+            current = []
+    if current and '\n'.join(current).strip():
+        statements.append('\n'.join(current))
+    return statements
+
+
+def applied_versions(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version VARCHAR(20) PRIMARY KEY,
+            aplicada_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("SELECT version FROM schema_migrations")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def apply_migrations(conn, directory=MIGRATIONS_DIR, log=print):
+    """Aplica, por ordem, as migrações ainda não registadas. Devolve a lista de versões aplicadas."""
+    cursor = conn.cursor()
+    try:
+        done = applied_versions(cursor)
+        applied = []
+        for version, path in list_migrations(directory):
+            if version in done:
+                continue
+            log(f"A aplicar {os.path.basename(path)}...")
+            with open(path, encoding='utf-8') as fh:
+                for statement in split_statements(fh.read()):
+                    cursor.execute(statement)
+            cursor.execute("INSERT INTO schema_migrations (version) VALUES (%s)", (version,))
+            conn.commit()
+            applied.append(version)
+        return applied
+    finally:
+        cursor.close()
@@ -25,7 +25,10 @@ CREATE TABLE funcionarios (
     matricula VARCHAR(50) UNIQUE NOT NULL,
     cargo VARCHAR(100) NOT NULL,
     email VARCHAR(120),
-    criado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    ativo BOOLEAN NOT NULL DEFAULT TRUE, -- 0 = deixou de vir no ficheiro dos RH (sincronização)
+    criado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_funcionarios_nome (nome),
+    FULLTEXT INDEX ft_funcionarios_nome (nome)
 );
 
 -- ========================
@@ -50,6 +53,10 @@ CREATE TABLE aparelhos (
     linha_id INT,
     condicao ENUM('Novo','Aprovado para uso','Em manutenção','Danificado','Sinistrado', 'Com Defeito') DEFAULT 'Novo',
     observacoes TEXT,
+    registro_atual_id INT NULL, -- termo "Em Uso" do aparelho (NULL = disponível); FK criada depois de registros
+    UNIQUE INDEX uq_aparelhos_registro_atual (registro_atual_id),
+    INDEX idx_aparelhos_imei2 (imei2),
+    FULLTEXT INDEX ft_aparelhos_texto (modelo, observacoes),
     FOREIGN KEY (linha_id) REFERENCES linhas(id) ON DELETE SET NULL
 );
 
@@ -73,10 +80,22 @@ CREATE TABLE registros (
     bo_url VARCHAR(255),
     return_checker VARCHAR(100), -- <<-- ADICIONADO
     status ENUM('Em Uso','Devolvido') DEFAULT 'Em Uso',
+    -- aparelho_id só enquanto o termo está aberto: o UNIQUE impede dois termos "Em Uso" por aparelho
+    aparelho_em_uso INT AS (IF(status = 'Em Uso', aparelho_id, NULL)) STORED,
+    UNIQUE INDEX uq_registros_aparelho_em_uso (aparelho_em_uso),
+    INDEX idx_registros_status_aparelho (status, aparelho_id),
+    INDEX idx_registros_aparelho_data (aparelho_id, data_entrega),
+    INDEX idx_registros_funcionario_data (funcionario_id, data_entrega),
+    INDEX idx_registros_status_data (status, data_entrega),
+    INDEX idx_registros_data (data_entrega),
+    INDEX idx_registros_status (status), -- ordenação (status, id) da listagem
     FOREIGN KEY (funcionario_id) REFERENCES funcionarios(id),
     FOREIGN KEY (aparelho_id) REFERENCES aparelhos(id)
 );
 
+ALTER TABLE aparelhos ADD CONSTRAINT fk_aparelhos_registro_atual
+    FOREIGN KEY (registro_atual_id) REFERENCES registros(id) ON DELETE SET NULL;
+
 -- ========================
 -- 6. Manutenções
 -- ========================
@@ -90,6 +109,8 @@ CREATE TABLE manutencoes (
     fornecedor VARCHAR(100),
     custo DECIMAL(10,2),
     status VARCHAR(50) DEFAULT 'Em manutenção',
+    INDEX idx_manutencoes_aparelho_data (aparelho_id, data_envio),
+    INDEX idx_manutencoes_data_envio (data_envio),
     FOREIGN KEY (aparelho_id) REFERENCES aparelhos(id)
 );
 
@@ -100,7 +121,9 @@ CREATE TABLE empresa (
     id INT AUTO_INCREMENT PRIMARY KEY,
     nome VARCHAR(150) NOT NULL,
     cnpj VARCHAR(20),
-    logo LONGBLOB
+    logo LONGBLOB,
+    logo_hash CHAR(64) NULL, -- SHA-256 do logo: ETag e versão do URL /api/company/logo
+    logo_relatorio MEDIUMBLOB NULL -- logo reduzido para os relatórios (NULL = usar o original)
 );
 
 -- ========================
@@ -119,20 +142,122 @@ CREATE TABLE IF NOT EXISTS linha_historico (
     aparelho_imei VARCHAR(50) NOT NULL,
     data_vinculacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     data_desvinculacao TIMESTAMP NULL,
+    INDEX idx_linha_historico_linha_data (linha_id, data_vinculacao),
     FOREIGN KEY (linha_id) REFERENCES linhas(id) ON DELETE CASCADE
 );
 
 -- ========================
--- 10. TABELA DE AUDITORIA (ADICIONADA)
+-- 10. TABELA DE AUDITORIA (ADICIONADA, PARTICIONADA POR MÊS)
 -- ========================
 CREATE TABLE auditoria (
-    id INT AUTO_INCREMENT PRIMARY KEY,
-    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    user_id INT,
+    id INT AUTO_INCREMENT,
+    timestamp TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    user_id INT, -- sem FK: tabelas particionadas não suportam chaves estrangeiras
     username VARCHAR(100),
     action_type VARCHAR(50),
     target_resource VARCHAR(100),
     target_id VARCHAR(100),
     details JSON,
-    FOREIGN KEY (user_id) REFERENCES usuarios(id) ON DELETE SET NULL
-);
\ No newline at end of file
+    PRIMARY KEY (id, timestamp),
+    INDEX idx_auditoria_recurso (target_resource, target_id, timestamp, id),
+    INDEX idx_auditoria_timestamp (timestamp, id),
+    INDEX idx_auditoria_utilizador (user_id, timestamp, id),
+    INDEX idx_auditoria_acao (action_type, timestamp, id)
+)
+-- Uma partição por mês; 'flask audit-partitions' cria os meses seguintes e
+-- 'flask audit-archive' move os meses antigos para ficheiros .jsonl.gz.
+PARTITION BY RANGE (UNIX_TIMESTAMP(timestamp)) (
+    PARTITION p000000 VALUES LESS THAN (UNIX_TIMESTAMP('2026-01-01 00:00:00')),
+    PARTITION p202601 VALUES LESS THAN (UNIX_TIMESTAMP('2026-02-01 00:00:00')),
+    PARTITION p202602 VALUES LESS THAN (UNIX_TIMESTAMP('2026-03-01 00:00:00')),
+    PARTITION p202603 VALUES LESS THAN (UNIX_TIMESTAMP('2026-04-01 00:00:00')),
+    PARTITION p202604 VALUES LESS THAN (UNIX_TIMESTAMP('2026-05-01 00:00:00')),
+    PARTITION p202605 VALUES LESS THAN (UNIX_TIMESTAMP('2026-06-01 00:00:00')),
+    PARTITION p202606 VALUES LESS THAN (UNIX_TIMESTAMP('2026-07-01 00:00:00')),
+    PARTITION p202607 VALUES LESS THAN (UNIX_TIMESTAMP('2026-08-01 00:00:00')),
+    PARTITION p202608 VALUES LESS THAN (UNIX_TIMESTAMP('2026-09-01 00:00:00')),
+    PARTITION p202609 VALUES LESS THAN (UNIX_TIMESTAMP('2026-10-01 00:00:00')),
+    PARTITION p202610 VALUES LESS THAN (UNIX_TIMESTAMP('2026-11-01 00:00:00')),
+    PARTITION p202611 VALUES LESS THAN (UNIX_TIMESTAMP('2026-12-01 00:00:00')),
+    PARTITION p202612 VALUES LESS THAN (UNIX_TIMESTAMP('2027-01-01 00:00:00')),
+    PARTITION pmax VALUES LESS THAN MAXVALUE
+);
+
+-- ========================
+-- 11. JOBS DE IMPORTAÇÃO EM BACKGROUND
+-- ========================
+CREATE TABLE import_jobs (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    tipo VARCHAR(30) NOT NULL,
+    status ENUM('Pendente','Em execução','Concluído','Falhou') NOT NULL DEFAULT 'Pendente',
+    ficheiro VARCHAR(255),
+    processados INT NOT NULL DEFAULT 0,
+    importados INT NOT NULL DEFAULT 0,
+    ignorados INT NOT NULL DEFAULT 0,
+    falhas INT NOT NULL DEFAULT 0,
+    erros JSON,
+    mensagem TEXT,
+    user_id INT,
+    username VARCHAR(100),
+    criado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    iniciado_em TIMESTAMP NULL,
+    concluido_em TIMESTAMP NULL,
+    heartbeat_em TIMESTAMP NULL, -- renovado pelo processo que tem o job (jobs órfãos expiram)
+    INDEX idx_import_jobs_status (status, criado_em)
+);
+
+-- ========================
+-- 12. MODELO DE LEITURA DOS TERMOS
+-- ========================
+-- Cópia desnormalizada de registros + funcionário + aparelho + linha para a listagem
+-- de termos; mantida pelas escritas (routes/records_read_model.py), 'flask records-rebuild'.
+CREATE TABLE registros_leitura (
+    id INT PRIMARY KEY, -- = registros.id
+    data_entrega DATE NOT NULL,
+    data_devolucao DATE,
+    status ENUM('Em Uso','Devolvido') DEFAULT 'Em Uso',
+    termo_entrega_url VARCHAR(255),
+    termo_devolucao_url VARCHAR(255),
+    bo_url VARCHAR(255),
+    funcionario_id INT NOT NULL,
+    funcionario_nome VARCHAR(100) NOT NULL,
+    funcionario_matricula VARCHAR(50) NOT NULL,
+    aparelho_id INT NOT NULL,
+    aparelho_modelo VARCHAR(100) NOT NULL,
+    aparelho_imei1 VARCHAR(50) NOT NULL,
+    linha_id INT,
+    linha_numero VARCHAR(20),
+    INDEX idx_registros_leitura_data (data_entrega),
+    INDEX idx_registros_leitura_nome (funcionario_nome),
+    INDEX idx_registros_leitura_modelo (aparelho_modelo),
+    INDEX idx_registros_leitura_status (status),
+    INDEX idx_registros_leitura_status_data (status, data_entrega),
+    INDEX idx_registros_leitura_status_nome (status, funcionario_nome),
+    INDEX idx_registros_leitura_status_modelo (status, aparelho_modelo),
+    INDEX idx_registros_leitura_matricula (funcionario_matricula),
+    INDEX idx_registros_leitura_funcionario (funcionario_id),
+    INDEX idx_registros_leitura_aparelho (aparelho_id),
+    INDEX idx_registros_leitura_linha (linha_id),
+    FOREIGN KEY (id) REFERENCES registros(id) ON DELETE CASCADE
+);
+
+-- ========================
+-- 13. CONTROLO DE MIGRAÇÕES
+-- ========================
+-- Versões de database/migrations já incluídas neste schema (flask db-migrate ignora-as).
+CREATE TABLE schema_migrations (
+    version VARCHAR(20) PRIMARY KEY,
+    aplicada_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+INSERT INTO schema_migrations (version) VALUES
+    ('V001'),
+    ('V002'),
+    ('V003'),
+    ('V004'),
+    ('V005'),
+    ('V006'),
+    ('V007'),
+    ('V008'),
+    ('V009'),
+    ('V010'),
+    ('V011');
\ No newline at end of file
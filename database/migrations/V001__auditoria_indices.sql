@@ -0,0 +1,8 @@
+-- ========================
+-- V001: Índices da auditoria (histórico por recurso e feed global paginado)
+-- ========================
+ALTER TABLE auditoria
+    ADD INDEX idx_auditoria_recurso (target_resource, target_id, timestamp, id),
+    ADD INDEX idx_auditoria_timestamp (timestamp, id),
+    ADD INDEX idx_auditoria_utilizador (user_id, timestamp, id),
+    ADD INDEX idx_auditoria_acao (action_type, timestamp, id);
@@ -0,0 +1,21 @@
+-- ========================
+-- V003: Jobs de importação em background
+-- ========================
+CREATE TABLE import_jobs (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    tipo VARCHAR(30) NOT NULL,
+    status ENUM('Pendente','Em execução','Concluído','Falhou') NOT NULL DEFAULT 'Pendente',
+    ficheiro VARCHAR(255),
+    processados INT NOT NULL DEFAULT 0,
+    importados INT NOT NULL DEFAULT 0,
+    ignorados INT NOT NULL DEFAULT 0,
+    falhas INT NOT NULL DEFAULT 0,
+    erros JSON,
+    mensagem TEXT,
+    user_id INT,
+    username VARCHAR(100),
+    criado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    iniciado_em TIMESTAMP NULL,
+    concluido_em TIMESTAMP NULL,
+    INDEX idx_import_jobs_status (status, criado_em)
+);
@@ -0,0 +1,6 @@
+-- ========================
+-- V004: Funcionários ativos (sincronização com o ficheiro dos RH)
+-- ========================
+-- POST /api/employees/import?mode=sync&flag_missing=1 marca com ativo = 0
+-- os funcionários que deixaram de vir no ficheiro, sem apagar (mantém as FKs de registros).
+ALTER TABLE funcionarios ADD COLUMN ativo BOOLEAN NOT NULL DEFAULT TRUE;
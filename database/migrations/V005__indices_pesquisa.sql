@@ -0,0 +1,9 @@
+-- ========================
+-- V005: Índices da pesquisa unificada (/api/search)
+-- ========================
+-- Prefixo (LIKE 'xxx%'): imei1, linhas.numero e matricula já têm índice UNIQUE; falta o imei2.
+CREATE INDEX idx_aparelhos_imei2 ON aparelhos (imei2);
+
+-- Texto: MATCH ... AGAINST em modo booleano
+CREATE FULLTEXT INDEX ft_aparelhos_texto ON aparelhos (modelo, observacoes);
+CREATE FULLTEXT INDEX ft_funcionarios_nome ON funcionarios (nome);
@@ -0,0 +1,22 @@
+-- ========================
+-- V006: Índices para os filtros e ordenações das rotas
+-- ========================
+-- Verificados com 'flask explain-check'. Os índices da auditoria
+-- (target_resource, target_id, timestamp) já vêm da V001.
+
+-- Termos: "em uso" por aparelho, histórico do aparelho e do funcionário, listagem por data
+CREATE INDEX idx_registros_status_aparelho ON registros (status, aparelho_id);
+CREATE INDEX idx_registros_aparelho_data ON registros (aparelho_id, data_entrega);
+CREATE INDEX idx_registros_funcionario_data ON registros (funcionario_id, data_entrega);
+CREATE INDEX idx_registros_status_data ON registros (status, data_entrega);
+CREATE INDEX idx_registros_data ON registros (data_entrega);
+
+-- Manutenções: histórico do aparelho e listagem por data de envio
+CREATE INDEX idx_manutencoes_aparelho_data ON manutencoes (aparelho_id, data_envio);
+CREATE INDEX idx_manutencoes_data_envio ON manutencoes (data_envio);
+
+-- Histórico de vinculação de linhas
+CREATE INDEX idx_linha_historico_linha_data ON linha_historico (linha_id, data_vinculacao);
+
+-- Listagem de funcionários (ordenada por nome)
+CREATE INDEX idx_funcionarios_nome ON funcionarios (nome);
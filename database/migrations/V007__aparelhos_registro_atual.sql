@@ -0,0 +1,26 @@
+-- ========================
+-- V007: Termo atual do aparelho
+-- ========================
+-- aparelhos.registro_atual_id aponta para o termo "Em Uso" do aparelho (NULL = disponível).
+-- É mantido pela criação de termos e pela devolução, na mesma transação.
+--
+-- A coluna gerada registros.aparelho_em_uso (aparelho_id só enquanto o termo está
+-- "Em Uso") com índice UNIQUE garante que um aparelho nunca tem dois termos abertos.
+-- Se esta migração falhar nesse índice, há aparelhos com mais de um termo aberto:
+--   SELECT aparelho_id, COUNT(*) FROM registros WHERE status = 'Em Uso'
+--   GROUP BY aparelho_id HAVING COUNT(*) > 1;
+-- Devolva os termos a mais e volte a correr 'flask db-migrate'.
+
+ALTER TABLE registros
+    ADD COLUMN aparelho_em_uso INT AS (IF(status = 'Em Uso', aparelho_id, NULL)) STORED,
+    ADD UNIQUE INDEX uq_registros_aparelho_em_uso (aparelho_em_uso);
+
+ALTER TABLE aparelhos
+    ADD COLUMN registro_atual_id INT NULL,
+    ADD UNIQUE INDEX uq_aparelhos_registro_atual (registro_atual_id),
+    ADD CONSTRAINT fk_aparelhos_registro_atual
+        FOREIGN KEY (registro_atual_id) REFERENCES registros(id) ON DELETE SET NULL;
+
+UPDATE aparelhos a
+JOIN registros r ON r.aparelho_id = a.id AND r.status = 'Em Uso'
+SET a.registro_atual_id = r.id;
@@ -0,0 +1,50 @@
+-- ========================
+-- V008: Modelo de leitura dos termos
+-- ========================
+-- Cópia desnormalizada de registros + funcionário + aparelho + linha, para que a
+-- listagem, a ordenação e os filtros dos termos leiam uma única tabela indexada.
+-- Mantida pelas escritas de termos, funcionários, aparelhos e linhas
+-- (routes/records_read_model.py); 'flask records-rebuild' reconstrói-a.
+
+CREATE TABLE registros_leitura (
+    id INT PRIMARY KEY, -- = registros.id
+    data_entrega DATE NOT NULL,
+    data_devolucao DATE,
+    status ENUM('Em Uso','Devolvido') DEFAULT 'Em Uso',
+    termo_entrega_url VARCHAR(255),
+    termo_devolucao_url VARCHAR(255),
+    bo_url VARCHAR(255),
+    funcionario_id INT NOT NULL,
+    funcionario_nome VARCHAR(100) NOT NULL,
+    funcionario_matricula VARCHAR(50) NOT NULL,
+    aparelho_id INT NOT NULL,
+    aparelho_modelo VARCHAR(100) NOT NULL,
+    aparelho_imei1 VARCHAR(50) NOT NULL,
+    linha_id INT,
+    linha_numero VARCHAR(20),
+    INDEX idx_registros_leitura_data (data_entrega),
+    INDEX idx_registros_leitura_nome (funcionario_nome),
+    INDEX idx_registros_leitura_modelo (aparelho_modelo),
+    INDEX idx_registros_leitura_status_data (status, data_entrega),
+    INDEX idx_registros_leitura_status_nome (status, funcionario_nome),
+    INDEX idx_registros_leitura_status_modelo (status, aparelho_modelo),
+    INDEX idx_registros_leitura_matricula (funcionario_matricula),
+    INDEX idx_registros_leitura_funcionario (funcionario_id),
+    INDEX idx_registros_leitura_aparelho (aparelho_id),
+    INDEX idx_registros_leitura_linha (linha_id),
+    FOREIGN KEY (id) REFERENCES registros(id) ON DELETE CASCADE
+);
+
+INSERT INTO registros_leitura (
+    id, data_entrega, data_devolucao, status, termo_entrega_url, termo_devolucao_url, bo_url,
+    funcionario_id, funcionario_nome, funcionario_matricula,
+    aparelho_id, aparelho_modelo, aparelho_imei1, linha_id, linha_numero
+)
+SELECT
+    r.id, r.data_entrega, r.data_devolucao, r.status, r.termo_entrega_url, r.termo_devolucao_url, r.bo_url,
+    f.id, f.nome, f.matricula,
+    a.id, a.modelo, a.imei1, l.id, l.numero
+FROM registros r
+JOIN funcionarios f ON r.funcionario_id = f.id
+JOIN aparelhos a ON r.aparelho_id = a.id
+LEFT JOIN linhas l ON a.linha_id = l.id;
@@ -0,0 +1,12 @@
+-- ========================
+-- V009: Logótipo da empresa servido à parte
+-- ========================
+-- logo_hash: SHA-256 do logótipo, usado como ETag e no URL (/api/company/logo?v=...).
+-- logo_relatorio: versão reduzida para o cabeçalho dos relatórios, gerada ao gravar
+-- o logótipo (com Pillow); enquanto for NULL é servido o original.
+
+ALTER TABLE empresa
+    ADD COLUMN logo_hash CHAR(64) NULL,
+    ADD COLUMN logo_relatorio MEDIUMBLOB NULL;
+
+UPDATE empresa SET logo_hash = SHA2(logo, 256) WHERE logo IS NOT NULL;
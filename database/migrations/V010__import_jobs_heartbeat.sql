@@ -0,0 +1,13 @@
+-- ========================
+-- V010: Batimento dos jobs de importação
+-- ========================
+-- heartbeat_em: renovado periodicamente pelo processo que tem o job na fila ou em
+-- execução (routes/import_jobs.py). Um job por terminar com o batimento parado há
+-- mais de IMPORT_JOB_STALE_MINUTES ficou órfão (processo reiniciado ou morto) e é
+-- dado como falhado pelos outros processos.
+
+ALTER TABLE import_jobs
+    ADD COLUMN heartbeat_em TIMESTAMP NULL;
+
+UPDATE import_jobs SET heartbeat_em = COALESCE(iniciado_em, criado_em)
+    WHERE status IN ('Pendente', 'Em execução');
@@ -0,0 +1,8 @@
+-- ========================
+-- V011: Ordenação dos termos por status
+-- ========================
+-- A listagem ordena por (status, id) e pagina com status = v AND id < i: um índice
+-- só em status (o InnoDB acrescenta a chave primária) serve a ordem e o range scan.
+
+CREATE INDEX idx_registros_status ON registros (status);
+CREATE INDEX idx_registros_leitura_status ON registros_leitura (status);
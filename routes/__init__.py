@@ -13,6 +13,10 @@ from .upload_routes import upload_bp
 from .dashboard_routes import dashboard_bp
 from .audit_routes import audit_bp
 from .line_records_routes import line_records_bp
+from .jobs_routes import jobs_bp
+from .export_routes import export_bp
+from .reports_routes import reports_bp
+from .search_routes import search_bp
 
 # Lista de todos os blueprints para registro automático
 all_blueprints = [
@@ -27,5 +31,9 @@ all_blueprints = [
     upload_bp,
     dashboard_bp,
     audit_bp,
-    line_records_bp 
+    line_records_bp,
+    jobs_bp,
+    export_bp,
+    reports_bp,
+    search_bp
 ]
\ No newline at end of file
@@ -0,0 +1,206 @@
+# SMARTCONTROL/routes/audit_archive.py
+# Manutenção das partições mensais da auditoria e arquivo "frio" em JSONL.gz.
+#
+# - ensure_future_partitions: cria as partições dos próximos meses (divide a pmax).
+# - archive_old_partitions: exporta os meses além da retenção para
+#   <AUDIT_ARCHIVE_DIR>/auditoria_pAAAAMM.jsonl.gz e remove a partição.
+# - search_archive: responde a consultas de auditoria a partir dos ficheiros arquivados.
+
+from datetime import date, datetime
+import gzip
+import json
+import logging
+import os
+import re
+
+logger = logging.getLogger('flask.app')
+
+AUDIT_ARCHIVE_DIR = os.environ.get('AUDIT_ARCHIVE_DIR', 'archive/auditoria')
+AUDIT_RETENTION_MONTHS = int(os.environ.get('AUDIT_RETENTION_MONTHS', 12))
+
+_PARTITION_RE = re.compile(r'^p(\d{4})(\d{2})$')
+_ARCHIVE_RE = re.compile(r'^auditoria_p(\d{6})\.jsonl\.gz$')
+
+
+def _add_months(day, months):
+    month_index = day.year * 12 + (day.month - 1) + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def list_partitions(cursor):
+    """Devolve [(nome, limite_superior_em_epoch ou None para MAXVALUE)] por ordem."""
+    cursor.execute("""
+        SELECT PARTITION_NAME AS name, PARTITION_DESCRIPTION AS upper_bound
+        FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'auditoria' AND PARTITION_NAME IS NOT NULL
+        ORDER BY PARTITION_ORDINAL_POSITION
+    """)
+    partitions = []
+    for row in cursor.fetchall():
+        name, bound = (row['name'], row['upper_bound']) if isinstance(row, dict) else row
+        partitions.append((name, None if bound == 'MAXVALUE' else int(bound)))
+    return partitions
+
+
+def ensure_future_partitions(conn, months_ahead=3, today=None):
+    """Garante uma partição por mês até 'months_ahead' meses à frente. Devolve as criadas."""
+    today = today or date.today()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        existing = {name for name, _ in list_partitions(cursor)}
+        if 'pmax' not in existing:
+            raise RuntimeError("A tabela auditoria não está particionada (aplique a migração V002).")
+        created = []
+        for offset in range(months_ahead + 1):
+            month = _add_months(date(today.year, today.month, 1), offset)
+            name = f"p{month.year:04d}{month.month:02d}"
+            if name in existing:
+                continue
+            upper = _add_months(month, 1)
+            cursor.execute(f"""
+                ALTER TABLE auditoria REORGANIZE PARTITION pmax INTO (
+                    PARTITION {name} VALUES LESS THAN (UNIX_TIMESTAMP('{upper.isoformat()} 00:00:00')),
+                    PARTITION pmax VALUES LESS THAN MAXVALUE
+                )
+            """)
+            created.append(name)
+        return created
+    finally:
+        cursor.close()
+
+
+def _row_to_json(row):
+    return json.dumps({
+        key: (value.isoformat(sep=' ') if isinstance(value, datetime) else value)
+        for key, value in row.items()
+    }, ensure_ascii=False)
+
+
+def archive_partition(conn, name, archive_dir=AUDIT_ARCHIVE_DIR):
+    """
+    Exporta uma partição para JSONL.gz e só depois a remove da tabela.
+    O ficheiro é escrito em .tmp e renomeado, para nunca ficar um arquivo parcial.
+    """
+    os.makedirs(archive_dir, exist_ok=True)
+    final_path = os.path.join(archive_dir, f"auditoria_{name}.jsonl.gz")
+    tmp_path = final_path + '.tmp'
+    if os.path.exists(final_path):
+        raise RuntimeError(f"O arquivo {final_path} já existe; remova-o ou verifique a partição {name}.")
+
+    exported = 0
+    cursor = conn.cursor(dictionary=True)
+    try:
+        # O nome vem de information_schema e foi validado pelo chamador
+        cursor.execute(f"""
+            SELECT id, timestamp, user_id, username, action_type, target_resource, target_id, details
+            FROM auditoria PARTITION ({name})
+            ORDER BY timestamp, id
+        """)
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as fh:
+            while True:
+                rows = cursor.fetchmany(1000)
+                if not rows:
+                    break
+                for row in rows:
+                    fh.write(_row_to_json(row) + '\n')
+                exported += len(rows)
+
+        cursor.execute(f"SELECT COUNT(*) AS total FROM auditoria PARTITION ({name})")
+        total = cursor.fetchone()['total']
+        if total != exported:
+            raise RuntimeError(f"Partição {name} mudou durante o arquivo ({exported} exportadas, {total} na tabela).")
+
+        os.replace(tmp_path, final_path)
+        cursor.execute(f"ALTER TABLE auditoria DROP PARTITION {name}")
+        logger.info(f"Partição de auditoria {name} arquivada em {final_path} ({exported} linhas).")
+        return exported
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    finally:
+        cursor.close()
+
+
+def archive_old_partitions(conn, retention_months=AUDIT_RETENTION_MONTHS, archive_dir=AUDIT_ARCHIVE_DIR, today=None):
+    """Arquiva todas as partições cujos dados são mais antigos que a retenção. Devolve {partição: linhas}."""
+    today = today or date.today()
+    cutoff = _add_months(date(today.year, today.month, 1), -retention_months)
+    cutoff_epoch = int(datetime(cutoff.year, cutoff.month, 1).timestamp())
+
+    cursor = conn.cursor(dictionary=True)
+    try:
+        partitions = list_partitions(cursor)
+    finally:
+        cursor.close()
+
+    archived = {}
+    for name, upper_bound in partitions:
+        if upper_bound is None or name == 'pmax':
+            continue
+        if name != 'p000000' and not _PARTITION_RE.match(name):
+            continue
+        # Só partições inteiramente anteriores ao corte (limite superior <= corte)
+        if upper_bound <= cutoff_epoch:
+            archived[name] = archive_partition(conn, name, archive_dir)
+    return archived
+
+
+def _archive_files(archive_dir, date_from=None, date_to=None):
+    """Ficheiros de arquivo por ordem decrescente de mês, ignorando meses fora do intervalo pedido."""
+    if not os.path.isdir(archive_dir):
+        return []
+    files = []
+    for filename in os.listdir(archive_dir):
+        match = _ARCHIVE_RE.match(filename)
+        if not match:
+            continue
+        stamp = match.group(1)
+        if stamp != '000000':
+            month_start = f"{stamp[:4]}-{stamp[4:]}-01"
+            month_end = _add_months(date(int(stamp[:4]), int(stamp[4:]), 1), 1).isoformat()
+            if date_from and month_end <= date_from:
+                continue
+            if date_to and month_start > date_to:
+                continue
+        files.append((stamp, os.path.join(archive_dir, filename)))
+    return [path for _, path in sorted(files, reverse=True)]
+
+
+def search_archive(filters, limit, after=None, archive_dir=AUDIT_ARCHIVE_DIR):
+    """
+    Procura no arquivo frio com os mesmos filtros das rotas de auditoria
+    (target_resource, target_id, user_id, action_type, date_from, date_to).
+    Devolve até limit+1 linhas ordenadas por (timestamp, id) decrescente, a partir
+    do cursor 'after' = (timestamp, id). É um caminho lento, só para consultas pontuais.
+    """
+    date_from = filters.get('date_from')
+    date_to = filters.get('date_to')
+    matches = []
+    for path in _archive_files(archive_dir, date_from, date_to):
+        file_matches = []
+        with gzip.open(path, 'rt', encoding='utf-8') as fh:
+            for line in fh:
+                row = json.loads(line)
+                if filters.get('target_resource') and str(row.get('target_resource') or '').lower() != filters['target_resource'].lower():
+                    continue
+                if filters.get('target_id') and str(row.get('target_id')) != str(filters['target_id']):
+                    continue
+                if filters.get('user_id') is not None and row.get('user_id') != filters['user_id']:
+                    continue
+                if filters.get('action_type') and row.get('action_type') != filters['action_type']:
+                    continue
+                day = (row.get('timestamp') or '')[:10]
+                if date_from and day < date_from:
+                    continue
+                if date_to and day > date_to:
+                    continue
+                if after and (row['timestamp'], row['id']) >= (after[0], after[1]):
+                    continue
+                file_matches.append(row)
+        file_matches.sort(key=lambda r: (r['timestamp'], r['id']), reverse=True)
+        matches.extend(file_matches)
+        # Os ficheiros estão por mês decrescente: com limit+1 linhas já temos a página
+        if len(matches) > limit:
+            break
+    return matches[:limit + 1]
@@ -3,20 +3,315 @@
 
 # Removido: from config.database import get_connection
 from flask import g, current_app # Importar g e current_app
+from config.database import get_connection
+from datetime import datetime
+import atexit
 import json
 import logging
+import os
+import queue
+import threading
+import time
 
 # Obter o logger configurado no app.py
 logger = logging.getLogger('flask.app')
 
+AUDIT_SPILL_PATH = os.environ.get('AUDIT_SPILL_PATH', 'logs/audit_spill.jsonl')
+
+AUDIT_INSERT_SQL = """
+    INSERT INTO auditoria (timestamp, user_id, username, action_type, target_resource, target_id, details)
+    VALUES (%s, %s, %s, %s, %s, %s, %s)
+"""
+
+
+def insert_audit_rows(cursor, rows):
+    """
+    Grava várias linhas de auditoria de uma vez.
+    O executemany do mysql-connector transforma o INSERT num único INSERT multi-linha.
+    """
+    if rows:
+        cursor.executemany(AUDIT_INSERT_SQL, rows)
+
+
+class AuditWriter:
+    """
+    Escritor assíncrono de auditoria: log_change só coloca a entrada numa fila
+    limitada e uma thread em background grava-as em lote (INSERT multi-linha)
+    quando o lote enche ou quando passa o intervalo de flush.
+
+    Política de backpressure quando a fila está cheia:
+    - 'block': a requisição espera (até put_timeout) por espaço; se mesmo assim
+      não houver, a entrada vai para o ficheiro de spill.
+    - 'spill': a entrada é imediatamente anexada ao ficheiro JSONL de spill.
+    O ficheiro de spill (também usado quando a gravação na base de dados falha) é
+    reposto na tabela com 'flask audit-replay-spill' (replay_spill).
+    """
+
+    def __init__(self, connect=get_connection, max_queue=10000, batch_size=200,
+                 flush_interval=1.0, backpressure='block', put_timeout=5.0,
+                 spill_path=AUDIT_SPILL_PATH):
+        self._connect = connect
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.backpressure = backpressure
+        self.put_timeout = put_timeout
+        self.spill_path = spill_path
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self._spill_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'enqueued': 0, 'written': 0, 'spilled': 0, 'flushes': 0,
+            'flushFailures': 0, 'lastFlushMs': 0.0, 'maxFlushMs': 0.0, 'totalFlushMs': 0.0,
+        }
+
+    def _ensure_started(self):
+        # Arranca a thread no próprio processo (threads não sobrevivem ao fork do Gunicorn).
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                self._stop.clear()
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+                self._thread.start()
+                if os.path.exists(self.spill_path):
+                    logger.warning(f"Há entradas de auditoria em {self.spill_path}: reponha-as com 'flask audit-replay-spill'.")
+
+    def submit(self, row):
+        self._ensure_started()
+        try:
+            if self.backpressure == 'block':
+                self._queue.put(row, timeout=self.put_timeout)
+            else:
+                self._queue.put_nowait(row)
+        except queue.Full:
+            logger.warning("Fila de auditoria cheia: entrada enviada para o ficheiro de spill.")
+            self._spill([row])
+            return
+        with self._stats_lock:
+            self._stats['enqueued'] += 1
+
+    def _spill(self, rows):
+        with self._spill_lock:
+            os.makedirs(os.path.dirname(self.spill_path) or '.', exist_ok=True)
+            with open(self.spill_path, 'a', encoding='utf-8') as fh:
+                for timestamp, user_id, username, action_type, target_resource, target_id, details in rows:
+                    fh.write(json.dumps({
+                        'timestamp': timestamp.isoformat(sep=' ') if timestamp else None,
+                        'user_id': user_id, 'username': username, 'action_type': action_type,
+                        'target_resource': target_resource, 'target_id': target_id, 'details': details,
+                    }, ensure_ascii=False) + '\n')
+        with self._stats_lock:
+            self._stats['spilled'] += len(rows)
+
+    def _flush(self, batch):
+        started = time.monotonic()
+        conn = self._connect()
+        try:
+            if conn is None:
+                raise RuntimeError("Sem conexão com a base de dados.")
+            cursor = conn.cursor()
+            try:
+                insert_audit_rows(cursor, batch)
+                conn.commit()
+            finally:
+                cursor.close()
+        except Exception as e:
+            logger.error(f"!!! FAILED TO FLUSH AUDIT BATCH ({len(batch)} entradas): {e}", exc_info=True)
+            if conn is not None:
+                try:
+                    conn.rollback()
+                except Exception:
+                    pass
+            with self._stats_lock:
+                self._stats['flushFailures'] += 1
+            # O lote vai para o ficheiro de spill, a repor com 'flask audit-replay-spill'
+            self._spill(batch)
+            return
+        finally:
+            if conn is not None:
+                conn.close()
+
+        elapsed = (time.monotonic() - started) * 1000
+        with self._stats_lock:
+            self._stats['written'] += len(batch)
+            self._stats['flushes'] += 1
+            self._stats['lastFlushMs'] = round(elapsed, 3)
+            self._stats['maxFlushMs'] = round(max(self._stats['maxFlushMs'], elapsed), 3)
+            self._stats['totalFlushMs'] += elapsed
+
+    def _run(self):
+        while True:
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            if batch:
+                self._flush(batch)
+            if self._stop.is_set() and self._queue.empty():
+                return
+
+    def stop(self, timeout=10.0):
+        """Esvazia a fila e termina a thread (chamado no shutdown)."""
+        self._stop.set()
+        if self._thread is not None and self._pid == os.getpid():
+            self._thread.join(timeout)
+        # Se a thread não chegou a correr (ou não terminou a tempo), grava o que restar aqui mesmo.
+        leftover = []
+        while True:
+            try:
+                leftover.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        for i in range(0, len(leftover), self.batch_size):
+            self._flush(leftover[i:i + self.batch_size])
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['queueDepth'] = self._queue.qsize()
+        stats['queueCapacity'] = self._queue.maxsize
+        stats['avgFlushMs'] = round(stats.pop('totalFlushMs') / stats['flushes'], 3) if stats['flushes'] else 0.0
+        stats['backpressure'] = self.backpressure
+        return stats
+
+
+_audit_writer = None
+
+
+def _read_spill(path):
+    with open(path, encoding='utf-8') as fh:
+        for line in fh:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            timestamp = entry['timestamp']
+            yield (
+                datetime.fromisoformat(timestamp) if timestamp else None,
+                entry['user_id'], entry['username'], entry['action_type'],
+                entry['target_resource'], entry['target_id'], entry['details'],
+            )
+
+
+def _replay_file(conn, path, batch_size):
+    cursor = conn.cursor()
+    total = 0
+    try:
+        batch = []
+        for row in _read_spill(path):
+            batch.append(row)
+            if len(batch) >= batch_size:
+                insert_audit_rows(cursor, batch)
+                total += len(batch)
+                batch = []
+        insert_audit_rows(cursor, batch)
+        total += len(batch)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    os.remove(path)
+    return total
+
+
+def replay_spill(conn, spill_path=AUDIT_SPILL_PATH, batch_size=500, log=None):
+    """
+    Grava na auditoria as entradas do ficheiro de spill e apaga-o. O ficheiro é primeiro
+    renomeado para <spill>.replaying, para que as entradas que entretanto forem para o
+    spill fiquem num ficheiro novo. Cada ficheiro vai num único commit: se falhar, o
+    .replaying fica intacto e é reposto na execução seguinte. Devolve o número de entradas.
+    """
+    log = log or logger.info
+    replaying = f"{spill_path}.replaying"
+    total = 0
+    # Primeiro um .replaying deixado por uma execução que falhou, depois o spill atual
+    for source in (None, spill_path):
+        if source is not None:
+            if not os.path.exists(source):
+                break
+            os.replace(source, replaying)
+        if os.path.exists(replaying):
+            total += _replay_file(conn, replaying, batch_size)
+    if total:
+        log(f"{total} entrada(s) de auditoria repostas a partir de {spill_path}.")
+    return total
+
+
+def init_audit_sink(app):
+    """
+    Configura o destino da auditoria. AUDIT_SINK=sync (padrão) grava dentro da
+    requisição, como antes; AUDIT_SINK=async usa o AuditWriter em background.
+    """
+    global _audit_writer
+    sink = os.environ.get('AUDIT_SINK', 'sync').lower()
+    app.config['AUDIT_SINK'] = sink
+    if sink != 'async' or _audit_writer is not None:
+        return
+    _audit_writer = AuditWriter(
+        max_queue=int(os.environ.get('AUDIT_QUEUE_SIZE', 10000)),
+        batch_size=int(os.environ.get('AUDIT_BATCH_SIZE', 200)),
+        flush_interval=float(os.environ.get('AUDIT_FLUSH_INTERVAL', 1.0)),
+        backpressure=os.environ.get('AUDIT_BACKPRESSURE', 'block').lower(),
+        put_timeout=float(os.environ.get('AUDIT_BLOCK_TIMEOUT', 5.0)),
+        spill_path=AUDIT_SPILL_PATH,
+    )
+    atexit.register(_audit_writer.stop)
+    app.logger.info(f"Auditoria assíncrona ativa (backpressure={_audit_writer.backpressure}).")
+
+
+def get_audit_stats():
+    if _audit_writer is None:
+        return {'sink': 'sync'}
+    return dict(_audit_writer.stats(), sink='async')
+
+
+def _flush_request_audit(conn):
+    """Hook de before_commit: grava as linhas pendentes da unit of work na mesma transação."""
+    rows = conn.tx_data.pop('audit_rows', None)
+    if rows:
+        cursor = conn.cursor()
+        try:
+            insert_audit_rows(cursor, rows)
+        finally:
+            cursor.close()
+
+
 def log_change(user_id, username, action_type, target_resource, target_id, details_dict):
     """
     Grava um registo na tabela de auditoria.
-    AGORA USA g.db_cursor e g.db_conn
+    AGORA USA g.db_cursor e g.db_conn (ou a fila assíncrona, se AUDIT_SINK=async).
+    No modo unit of work a linha entra na transação da requisição e só é gravada
+    no commit final, junto com a escrita de negócio (tem precedência sobre o modo async).
     """
     try:
         details_json = json.dumps(details_dict, ensure_ascii=False)
-        
+
+        conn = g.get('db_conn')
+        if conn is not None and getattr(conn, 'deferred_commit', False):
+            rows = conn.tx_data.setdefault('audit_rows', [])
+            if not rows:
+                conn.add_before_commit(_flush_request_audit)
+            rows.append((datetime.now(), user_id, username, action_type, target_resource, target_id, details_json))
+            logger.info(f"AUDIT LOG (unit of work): User '{username}' performed '{action_type}' on {target_resource} '{target_id}'")
+            return
+
+        if _audit_writer is not None:
+            _audit_writer.submit((datetime.now(), user_id, username, action_type, target_resource, target_id, details_json))
+            logger.info(f"AUDIT LOG (queued): User '{username}' performed '{action_type}' on {target_resource} '{target_id}'")
+            return
+
         # Usar a conexão e cursor globais
         if not g.db_cursor:
             logger.error("!!! FAILED TO LOG AUDIT: No g.db_cursor available.")
@@ -28,7 +323,7 @@ def log_change(user_id, username, action_type, target_resource, target_id, detai
         """
         g.db_cursor.execute(sql, (user_id, username, action_type, target_resource, target_id, details_json))
         g.db_conn.commit() # Fazer commit na conexão global
-        
+
         logger.info(f"AUDIT LOG: User '{username}' performed '{action_type}' on {target_resource} '{target_id}'")
 
     except Exception as e:
@@ -2,31 +2,106 @@
 # (FICHEIRO COMPLETO E CORRIGIDO)
 
 from flask import Blueprint, jsonify, request, g, current_app
+from .pagination import parse_limit, decode_cursor, keyset_page
+from .audit_archive import search_archive
 # Removido get_connection
 
 audit_bp = Blueprint('audit', __name__)
 
+# Ordem estável para keyset: (timestamp, id) decrescente, coberta pelos índices idx_auditoria_*
+_KEY_FIELDS = ('timestamp', 'id')
+
+
+def _read_cursor():
+    """Lê ?cursor= (timestamp, id da última linha). Lança ValueError se for inválido."""
+    cursor_token = request.args.get('cursor')
+    return decode_cursor(cursor_token, 2) if cursor_token else None
+
+
+def _fetch_page(filters, limit):
+    """
+    Busca uma página (keyset) na tabela quente ou, com ?archive=1, no arquivo
+    frio JSONL.gz dos meses já removidos da tabela.
+    """
+    after = _read_cursor()
+    if request.args.get('archive', '0').lower() in ('1', 'true'):
+        rows = search_archive(filters, limit, after)
+        items, next_cursor = keyset_page(rows, limit, _KEY_FIELDS)
+        return {'items': items, 'nextCursor': next_cursor, 'source': 'archive'}
+
+    where = []
+    params = []
+    if filters.get('target_resource'):
+        where.append("target_resource = %s"); params.append(filters['target_resource'])
+    if filters.get('target_id'):
+        where.append("target_id = %s"); params.append(filters['target_id'])
+    if filters.get('user_id') is not None:
+        where.append("user_id = %s"); params.append(filters['user_id'])
+    if filters.get('action_type'):
+        where.append("action_type = %s"); params.append(filters['action_type'])
+    if filters.get('date_from'):
+        where.append("timestamp >= %s"); params.append(filters['date_from'])
+    if filters.get('date_to'):
+        where.append("timestamp < %s + INTERVAL 1 DAY"); params.append(filters['date_to'])
+    if after:
+        where.append("(timestamp, id) < (%s, %s)"); params.extend(after)
+
+    sql = f"""
+        SELECT id, timestamp, user_id, username, action_type, target_resource, target_id, details
+        FROM auditoria
+        WHERE {' AND '.join(where) if where else '1=1'}
+        ORDER BY timestamp DESC, id DESC
+        LIMIT %s
+    """
+    g.db_cursor.execute(sql, tuple(params + [limit + 1]))
+    items, next_cursor = keyset_page(g.db_cursor.fetchall(), limit, _KEY_FIELDS)
+    return {'items': items, 'nextCursor': next_cursor, 'source': 'database'}
+
+
 @audit_bp.route('/<string:resource>/<string:resource_id>', methods=['GET'])
 def get_audit_logs(resource, resource_id):
     """
-    Busca o histórico de alterações para um recurso específico.
+    Busca o histórico de alterações para um recurso específico, paginado por cursor
+    (?limit=&cursor=). A resposta traz 'items' e 'nextCursor' (None na última página).
+    Com ?archive=1 a consulta é feita no arquivo frio.
     """
     try:
         if not g.db_cursor:
              return jsonify({'message': 'Erro interno: Falha na conexão com a base de dados'}), 500
-             
-        sql = """
-            SELECT id, timestamp, username, action_type, details 
-            FROM auditoria 
-            WHERE target_resource = %s AND target_id = %s
-            ORDER BY timestamp DESC
-        """
-        g.db_cursor.execute(sql, (resource, resource_id))
-        logs = g.db_cursor.fetchall()
-        
-        return jsonify(logs)
 
+        filters = {'target_resource': resource, 'target_id': resource_id}
+        return jsonify(_fetch_page(filters, parse_limit()))
+
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
         current_app.logger.error(f"Erro ao buscar logs de auditoria para {resource}/{resource_id}: {e}", exc_info=True)
         return jsonify({'message': 'Erro ao buscar histórico de alterações'}), 500
-    # Removido 'finally'
\ No newline at end of file
+    # Removido 'finally'
+
+
+@audit_bp.route('/', methods=['GET'])
+def get_audit_feed():
+    """
+    Feed global de auditoria, paginado por cursor.
+    Filtros opcionais: user_id, action_type, resource, date_from, date_to (AAAA-MM-DD).
+    Com ?archive=1 a consulta é feita no arquivo frio.
+    """
+    try:
+        if not g.db_cursor:
+             return jsonify({'message': 'Erro interno: Falha na conexão com a base de dados'}), 500
+
+        filters = {
+            'user_id': request.args.get('user_id', type=int),
+            'action_type': request.args.get('action_type'),
+            'target_resource': request.args.get('resource'),
+            'date_from': request.args.get('date_from'),
+            'date_to': request.args.get('date_to'),
+        }
+        return jsonify(_fetch_page(filters, parse_limit()))
+
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    except Exception as e:
+        current_app.logger.error(f"Erro ao buscar feed de auditoria: {e}", exc_info=True)
+        return jsonify({'message': 'Erro ao buscar auditoria'}), 500
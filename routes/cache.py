@@ -0,0 +1,107 @@
+# SMARTCONTROL/routes/cache.py
+# Cache em memória (por processo) com invalidação por número de versão.
+#
+# Cada cache tem um contador de versão; as escritas chamam invalidate_after_commit(nome),
+# que incrementa a versão depois do commit, e as entradas antigas deixam de ser usadas.
+# Pedidos concorrentes para a mesma chave são "single-flighted": só um calcula o valor,
+# os outros esperam e reutilizam-no. O TTL limita o tempo em que outros processos
+# (workers do Gunicorn, que não veem a versão deste) podem servir dados antigos.
+
+from flask import g
+import os
+import threading
+import time
+
+
+class VersionedCache:
+
+    def __init__(self, name, ttl=30.0, max_entries=256):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.version = 0
+        self._entries = {}
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'waits': 0, 'invalidations': 0}
+
+    def bump(self):
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+            self._stats['invalidations'] += 1
+
+    def get_or_compute(self, key, compute):
+        """Devolve o valor em cache para 'key' ou calcula-o (uma única vez por versão) com compute()."""
+        while True:
+            with self._lock:
+                version = self.version
+                entry = self._entries.get(key)
+                if entry and entry[0] == version and entry[1] > time.monotonic():
+                    self._stats['hits'] += 1
+                    return entry[2]
+                waiter = self._inflight.get(key)
+                if waiter is None:
+                    waiter = threading.Event()
+                    self._inflight[key] = waiter
+                    self._stats['misses'] += 1
+                    break
+                self._stats['waits'] += 1
+            # Outro pedido já está a calcular esta chave: espera e volta a tentar
+            waiter.wait(timeout=30)
+
+        try:
+            value = compute()
+            with self._lock:
+                # Se entretanto houve uma escrita, o valor pode já estar desatualizado: não guardar
+                if self.version == version:
+                    if len(self._entries) >= self.max_entries:
+                        self._entries.pop(next(iter(self._entries)))
+                    self._entries[key] = (version, time.monotonic() + self.ttl, value)
+            return value
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            waiter.set()
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, version=self.version, size=len(self._entries))
+
+
+_caches = {}
+_registry_lock = threading.Lock()
+
+
+def get_cache(name, ttl=None, max_entries=256):
+    """Obtém (ou cria) a cache com este nome. O TTL vem de <NOME>_CACHE_TTL, por omissão 30s."""
+    with _registry_lock:
+        cache = _caches.get(name)
+        if cache is None:
+            if ttl is None:
+                ttl = float(os.environ.get(f'{name.upper()}_CACHE_TTL', 30))
+            cache = _caches[name] = VersionedCache(name, ttl, max_entries)
+        return cache
+
+
+def invalidate(*names):
+    for name in names:
+        get_cache(name).bump()
+
+
+def invalidate_after_commit(*names):
+    """
+    Invalida as caches depois do commit da requisição atual (no modo unit of work,
+    só quando o commit real acontecer; num rollback não invalida nada).
+    """
+    conn = g.get('db_conn')
+    if conn is not None and hasattr(conn, 'add_after_commit'):
+        conn.add_after_commit(lambda: invalidate(*names))
+    else:
+        invalidate(*names)
+
+
+def get_cache_stats():
+    with _registry_lock:
+        caches = list(_caches.values())
+    return {cache.name: cache.stats() for cache in caches}
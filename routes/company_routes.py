@@ -1,32 +1,149 @@
 # SMARTCONTROL/routes/company_routes.py
 # (FICHEIRO COMPLETO E CORRIGIDO)
+#
+# O logótipo não vai no JSON da empresa: GET /api/company devolve logoUrl /
+# reportLogoUrl e os bytes são servidos por GET /api/company/logo, com o SHA-256
+# como ETag. O URL leva a versão (?v=), por isso pode ficar em cache no browser
+# "para sempre"; um logótipo novo muda o URL.
+#
+# Só são aceites logótipos PNG, JPEG, GIF e WebP: um SVG pode ter scripts e seria
+# servido na mesma origem da API. Os SVG gravados antes desta regra continuam a ser
+# servidos, mas com uma CSP que bloqueia scripts e com nosniff.
 
-from flask import Blueprint, jsonify, request, current_app, g
+from flask import Blueprint, Response, jsonify, request, current_app, g
 import base64
+import hashlib
+import io
+import os
 from .decorators import require_permission # Importar decorador
 
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
 company_bp = Blueprint('company', __name__)
 
+# Tamanho máximo da versão do logótipo para o cabeçalho dos relatórios (px)
+LOGO_REPORT_MAX_WIDTH = int(os.environ.get('LOGO_REPORT_MAX_WIDTH', 400))
+LOGO_REPORT_MAX_HEIGHT = int(os.environ.get('LOGO_REPORT_MAX_HEIGHT', 160))
+LOGO_MAX_AGE = 365 * 24 * 3600
+
+_IMAGE_SIGNATURES = (
+    (b'\x89PNG', 'image/png'),
+    (b'\xff\xd8', 'image/jpeg'),
+    (b'GIF8', 'image/gif'),
+    (b'<svg', 'image/svg+xml'),
+    (b'<?xml', 'image/svg+xml'),
+)
+# Tipos aceites no upload do logótipo (ver o topo do ficheiro)
+_LOGO_MIMETYPES = ('image/png', 'image/jpeg', 'image/gif', 'image/webp')
+_SVG_HEADERS = {
+    'Content-Security-Policy': "default-src 'none'; style-src 'unsafe-inline'",
+    'Content-Disposition': 'inline; filename=logo.svg',
+}
+
+
+def _image_mimetype(data):
+    for signature, mimetype in _IMAGE_SIGNATURES:
+        if data.startswith(signature):
+            return mimetype
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'image/webp'
+    return 'application/octet-stream'
+
+
+def _report_variant(data):
+    """Versão reduzida (PNG) para os relatórios; None sem Pillow ou se não ficar mais pequena."""
+    if Image is None:
+        return None
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            image.thumbnail((LOGO_REPORT_MAX_WIDTH, LOGO_REPORT_MAX_HEIGHT))
+            if image.mode not in ('RGB', 'RGBA', 'L', 'LA'):
+                image = image.convert('RGBA')
+            output = io.BytesIO()
+            image.save(output, format='PNG', optimize=True)
+    except Exception as e:
+        current_app.logger.warning(f"Não foi possível gerar a versão do logótipo para relatórios: {e}")
+        return None
+    variant = output.getvalue()
+    return variant if len(variant) < len(data) else None
+
+
+def _logo_url(logo_hash, variant=None):
+    if not logo_hash:
+        return None
+    url = f"/api/company/logo?v={logo_hash[:16]}"
+    return url + f"&variant={variant}" if variant else url
+
+
 @company_bp.route('/', methods=['GET'])
 def get_company():
     try:
         if not g.db_cursor:
              return jsonify({'message': 'Erro interno: Falha na conexão com a base de dados'}), 500
              
-        g.db_cursor.execute("SELECT nome, cnpj, logo FROM empresa WHERE id = 1")
+        g.db_cursor.execute("SELECT nome, cnpj, logo_hash FROM empresa WHERE id = 1")
         company_data = g.db_cursor.fetchone()
 
         if not company_data:
-            return jsonify({'nome': 'Relatório do Sistema', 'cnpj': 'Não informado', 'logo': None})
-
-        if company_data.get('logo'):
-            company_data['logo'] = base64.b64encode(company_data['logo']).decode('utf-8')
+            return jsonify({'nome': 'Relatório do Sistema', 'cnpj': 'Não informado', 'logoUrl': None, 'reportLogoUrl': None})
 
+        logo_hash = company_data.pop('logo_hash')
+        company_data['logoUrl'] = _logo_url(logo_hash)
+        company_data['reportLogoUrl'] = _logo_url(logo_hash, 'report')
         return jsonify(company_data)
     except Exception as e:
         current_app.logger.error(f"Erro ao buscar dados da empresa: {e}", exc_info=True)
         return jsonify({'message': 'Erro interno ao buscar dados da empresa'}), 500
 
+
+@company_bp.route('/logo', methods=['GET'])
+def get_company_logo():
+    """
+    Bytes do logótipo (?variant=report para a versão dos relatórios). ETag = SHA-256;
+    com ?v= igual à versão atual responde com Cache-Control de um ano (immutable).
+    """
+    variant = request.args.get('variant')
+    if variant not in (None, 'report'):
+        return jsonify({'message': 'variant inválido. Use: report'}), 400
+    try:
+        if not g.db_cursor:
+             return jsonify({'message': 'Erro interno: Falha na conexão com a base de dados'}), 500
+
+        # Primeiro só o hash: um 304 não chega a ler o BLOB
+        g.db_cursor.execute("SELECT logo_hash, logo_relatorio IS NOT NULL AS has_report FROM empresa WHERE id = 1")
+        row = g.db_cursor.fetchone()
+        if not row or not row['logo_hash']:
+            return jsonify({'message': 'Logótipo não definido'}), 404
+
+        use_report = variant == 'report' and row['has_report']
+        etag = row['logo_hash'] + ('-report' if use_report else '')
+        if request.args.get('v') == row['logo_hash'][:16]:
+            cache_control = f'public, max-age={LOGO_MAX_AGE}, immutable'
+        else:
+            cache_control = 'no-cache'
+
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            column = 'logo_relatorio' if use_report else 'logo'
+            g.db_cursor.execute(f"SELECT {column} AS data FROM empresa WHERE id = 1")
+            data = g.db_cursor.fetchone()['data']
+            mimetype = _image_mimetype(data)
+            response = Response(bytes(data), mimetype=mimetype)
+            if mimetype == 'image/svg+xml':
+                response.headers.update(_SVG_HEADERS)
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = cache_control
+        response.headers['X-Content-Type-Options'] = 'nosniff'
+        return response
+    except Exception as e:
+        current_app.logger.error(f"Erro ao buscar o logótipo da empresa: {e}", exc_info=True)
+        return jsonify({'message': 'Erro interno ao buscar o logótipo'}), 500
+
+
 @company_bp.route('/', methods=['POST'])
 @require_permission('company_update') # Proteger esta rota
 def update_company():
@@ -42,17 +159,21 @@ def update_company():
         g.db_cursor.execute("SELECT id FROM empresa WHERE id = 1")
         record_exists = g.db_cursor.fetchone()
 
-        logo_data = None
+        logo_data = logo_hash = logo_report = None
         if logo_base64 and ',' in logo_base64:
             # Remove o cabeçalho 'data:image/png;base64,' antes de descodificar
             logo_data = base64.b64decode(logo_base64.split(',')[1])
+            if _image_mimetype(logo_data) not in _LOGO_MIMETYPES:
+                return jsonify({'message': 'Logótipo inválido: use uma imagem PNG, JPEG, GIF ou WebP'}), 400
+            logo_hash = hashlib.sha256(logo_data).hexdigest()
+            logo_report = _report_variant(logo_data)
 
         if record_exists:
             # ATUALIZA (UPDATE)
             if logo_data:
                 g.db_cursor.execute(
-                    "UPDATE empresa SET nome = %s, cnpj = %s, logo = %s WHERE id = 1",
-                    (nome, cnpj, logo_data)
+                    "UPDATE empresa SET nome = %s, cnpj = %s, logo = %s, logo_hash = %s, logo_relatorio = %s WHERE id = 1",
+                    (nome, cnpj, logo_data, logo_hash, logo_report)
                 )
             else:
                 # Se não for enviado um novo logótipo, não se altera o existente
@@ -63,8 +184,8 @@ def update_company():
         else:
             # CRIA (INSERT)
             g.db_cursor.execute(
-                "INSERT INTO empresa (id, nome, cnpj, logo) VALUES (1, %s, %s, %s)",
-                (nome, cnpj, logo_data)
+                "INSERT INTO empresa (id, nome, cnpj, logo, logo_hash, logo_relatorio) VALUES (1, %s, %s, %s, %s, %s)",
+                (nome, cnpj, logo_data, logo_hash, logo_report)
             )
         
         g.db_conn.commit()
@@ -2,66 +2,94 @@
 # (FICHEIRO COMPLETO E CORRIGIDO)
 
 from flask import Blueprint, jsonify, current_app, g, request
+from .cache import get_cache
+import hashlib
+import json
 # Removido get_connection
 
 dashboard_bp = Blueprint('dashboard', __name__)
 
-@dashboard_bp.route('/stats', methods=['GET'])
-def get_dashboard_stats():
-    try:
-        if not g.db_cursor:
-             return jsonify({'message': 'Erro interno: Falha na conexão com a base de dados'}), 500
+UNAVAILABLE_CONDITIONS = ('Em manutenção', 'Danificado', 'Sinistrado', 'Com Defeito')
 
-        g.db_cursor.execute("SELECT COUNT(*) as total FROM aparelhos")
-        total_devices = g.db_cursor.fetchone()['total']
+DASHBOARD_STATS_SQL = """
+    SELECT
+        (SELECT COUNT(*) FROM funcionarios) AS total_employees,
+        d.condicao, d.total, d.in_use
+    FROM (SELECT 1) AS um
+    LEFT JOIN (
+        SELECT
+            a.condicao,
+            COUNT(*) AS total,
+            SUM(a.registro_atual_id IS NOT NULL) AS in_use
+        FROM aparelhos a
+        GROUP BY a.condicao
+    ) AS d ON TRUE
+"""
 
-        g.db_cursor.execute("SELECT COUNT(*) as total FROM funcionarios")
-        total_employees = g.db_cursor.fetchone()['total']
-        
-        g.db_cursor.execute("SELECT COUNT(*) as count FROM aparelhos WHERE condicao = 'Em manutenção'")
-        maintenance_devices_for_card = g.db_cursor.fetchone()['count']
-        
-        g.db_cursor.execute("SELECT COUNT(DISTINCT aparelho_id) as count FROM registros WHERE status = 'Em Uso'")
-        in_use_devices_for_card = g.db_cursor.fetchone()['count']
+def _compute_dashboard_stats():
+    """Calcula as estatísticas e o respetivo ETag. Chamada apenas em cache miss."""
+    if not g.db_cursor:
+        raise ConnectionError('Falha na conexão com a base de dados')
 
-        g.db_cursor.execute("SELECT DISTINCT aparelho_id FROM registros WHERE status = 'Em Uso'")
-        in_use_ids_tuples = g.db_cursor.fetchall()
-        in_use_ids = [item['aparelho_id'] for item in in_use_ids_tuples]
-        in_use_count = len(in_use_ids)
+    # Uma única consulta: por condição, total de aparelhos e quantos estão em uso,
+    # mais o total de funcionários. Tudo o resto é derivado em Python.
+    g.db_cursor.execute(DASHBOARD_STATS_SQL)
+    rows = g.db_cursor.fetchall()
 
-        unavailable_conditions = "('Em manutenção', 'Danificado', 'Sinistrado', 'Com Defeito')"
-        
-        if in_use_ids:
-            placeholders = ','.join(['%s'] * len(in_use_ids))
-            unavailable_query = f"""
-                SELECT COUNT(*) as count FROM aparelhos
-                WHERE condicao IN {unavailable_conditions} AND id NOT IN ({placeholders})
-            """
-            g.db_cursor.execute(unavailable_query, tuple(in_use_ids))
-        else:
-            unavailable_query = f"SELECT COUNT(*) as count FROM aparelhos WHERE condicao IN {unavailable_conditions}"
-            g.db_cursor.execute(unavailable_query)
-            
-        unavailable_count = g.db_cursor.fetchone()['count']
-        
-        available_count = total_devices - in_use_count - unavailable_count
+    total_employees = rows[0]['total_employees'] if rows else 0
+    total_devices = 0
+    in_use_count = 0
+    unavailable_count = 0
+    maintenance_devices_for_card = 0
+    devices_by_condition = []
+    for row in rows:
+        if row['total'] is None:
+            continue  # LEFT JOIN sem aparelhos
+        total = int(row['total'])
+        in_use = int(row['in_use'] or 0)
+        total_devices += total
+        in_use_count += in_use
+        if row['condicao'] == 'Em manutenção':
+            maintenance_devices_for_card = total
+        if row['condicao'] in UNAVAILABLE_CONDITIONS:
+            unavailable_count += total - in_use
+        devices_by_condition.append({'condicao': row['condicao'], 'count': total})
 
-        g.db_cursor.execute("SELECT condicao, COUNT(*) as count FROM aparelhos GROUP BY condicao")
-        devices_by_condition = g.db_cursor.fetchall()
+    in_use_devices_for_card = in_use_count
+    available_count = total_devices - in_use_count - unavailable_count
 
-        stats = {
-            "totalDevices": total_devices,
-            "inUseDevices": in_use_devices_for_card,
-            "maintenanceDevices": maintenance_devices_for_card,
-            "totalEmployees": total_employees,
-            "devicesByCondition": devices_by_condition,
-            "deviceStatusSummary": {
-                'Em Uso': in_use_count,
-                'Disponível': available_count,
-                'Indisponível': unavailable_count
-            }
+    stats = {
+        "totalDevices": total_devices,
+        "inUseDevices": in_use_devices_for_card,
+        "maintenanceDevices": maintenance_devices_for_card,
+        "totalEmployees": total_employees,
+        "devicesByCondition": devices_by_condition,
+        "deviceStatusSummary": {
+            'Em Uso': in_use_count,
+            'Disponível': available_count,
+            'Indisponível': unavailable_count
         }
-        return jsonify(stats)
+    }
+    body = json.dumps(stats, sort_keys=True, default=str)
+    return stats, hashlib.sha1(body.encode('utf-8')).hexdigest()
+
+
+@dashboard_bp.route('/stats', methods=['GET'])
+def get_dashboard_stats():
+    """
+    Estatísticas do dashboard, servidas de uma cache em memória invalidada pelas
+    escritas de aparelhos, termos, manutenções e funcionários. Responde com ETag:
+    um browser que já tem os números recebe 304 sem corpo.
+    """
+    try:
+        stats, etag = get_cache('dashboard').get_or_compute('stats', _compute_dashboard_stats)
+
+        response = jsonify(stats)
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response.make_conditional(request)
+    except ConnectionError:
+        return jsonify({'message': 'Erro interno: Falha na conexão com a base de dados'}), 500
     except Exception as e:
         current_app.logger.error(f"Erro ao buscar estatísticas do dashboard: {e}", exc_info=True)
         return jsonify({'message': 'Erro interno ao buscar estatísticas'}), 500
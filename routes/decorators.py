@@ -1,11 +1,124 @@
 from functools import wraps
 from flask import request, abort, g, current_app
+from collections import OrderedDict
 import json
+import os
+import threading
+import time
+
+# --- CACHE DE PERMISSÕES ---
+# Guarda (role, permissões já descodificadas) por ID de utilizador, com TTL e
+# tamanho máximo (LRU). update_user/delete_user invalidam a entrada depois do commit
+# (invalidate_user_permissions_after_commit).
+# A cache é de cada processo: a invalidação só chega ao processo que fez a alteração.
+# Nos outros workers (Gunicorn) uma permissão revogada continua válida até
+# PERMISSION_CACHE_TTL segundos; é esse o atraso máximo. PERMISSION_CACHE_TTL=0 desativa a cache.
+PERMISSION_CACHE_TTL = float(os.environ.get('PERMISSION_CACHE_TTL', 60))
+PERMISSION_CACHE_SIZE = int(os.environ.get('PERMISSION_CACHE_SIZE', 1024))
+
+_permission_cache = OrderedDict()
+_permission_cache_lock = threading.Lock()
+_permission_cache_stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+# Incrementada a cada invalidação: uma leitura da DB feita antes dela não é guardada
+_permission_cache_generation = 0
+
+
+def _cache_key(user_id):
+    try:
+        return int(user_id)
+    except (TypeError, ValueError):
+        return str(user_id)
+
+
+def _get_cached_permissions(user_id):
+    key = _cache_key(user_id)
+    with _permission_cache_lock:
+        entry = _permission_cache.get(key)
+        if entry and entry[0] > time.monotonic():
+            _permission_cache.move_to_end(key)
+            _permission_cache_stats['hits'] += 1
+            return entry[1], entry[2]
+        if entry:
+            del _permission_cache[key]
+        _permission_cache_stats['misses'] += 1
+        return None
+
+
+def _current_generation():
+    with _permission_cache_lock:
+        return _permission_cache_generation
+
+
+def _store_permissions(user_id, role, permissions, generation=None):
+    if PERMISSION_CACHE_TTL <= 0 or PERMISSION_CACHE_SIZE <= 0:
+        return
+    key = _cache_key(user_id)
+    with _permission_cache_lock:
+        if generation is not None and generation != _permission_cache_generation:
+            return  # houve uma invalidação durante a leitura: o valor lido pode ser o antigo
+        _permission_cache[key] = (time.monotonic() + PERMISSION_CACHE_TTL, role, permissions)
+        _permission_cache.move_to_end(key)
+        while len(_permission_cache) > PERMISSION_CACHE_SIZE:
+            _permission_cache.popitem(last=False)
+            _permission_cache_stats['evictions'] += 1
+
+
+def invalidate_user_permissions(user_id=None):
+    """Remove as permissões em cache de um utilizador (ou de todos, se user_id for None)."""
+    global _permission_cache_generation
+    with _permission_cache_lock:
+        _permission_cache_generation += 1
+        if user_id is None:
+            _permission_cache.clear()
+        else:
+            _permission_cache.pop(_cache_key(user_id), None)
+        _permission_cache_stats['invalidations'] += 1
+
+
+def invalidate_user_permissions_after_commit(user_id=None):
+    """
+    Invalida depois do commit da requisição atual: no modo unit of work o commit da
+    rota é diferido e uma requisição concorrente voltaria a pôr em cache as permissões
+    antigas. Num rollback não invalida nada.
+    """
+    conn = g.get('db_conn')
+    if conn is not None and hasattr(conn, 'add_after_commit'):
+        conn.add_after_commit(lambda: invalidate_user_permissions(user_id))
+    else:
+        invalidate_user_permissions(user_id)
+
+
+def get_permission_cache_stats():
+    with _permission_cache_lock:
+        return dict(_permission_cache_stats, size=len(_permission_cache))
+# --- FIM DO CACHE DE PERMISSÕES ---
+
+
+def _load_permissions(user_id):
+    """Lê role e permissões do utilizador na base de dados. Devolve None se não existir."""
+    if not g.db_cursor:
+        current_app.logger.error(f"Falha na verificação de permissão: Sem cursor de DB. Rota: {request.path}")
+        abort(500, description="Erro interno: falha na conexão da base de dados.")
+
+    g.db_cursor.execute("SELECT role, permissoes FROM usuarios WHERE id = %s", (user_id,))
+    user_db_data = g.db_cursor.fetchone()
+    if not user_db_data:
+        return None
+
+    permissoes_str = user_db_data.get('permissoes')
+    user_permissions = {}
+    if permissoes_str:
+        try:
+            user_permissions = json.loads(permissoes_str)
+        except json.JSONDecodeError:
+            current_app.logger.error(f"Erro ao descodificar JSON de permissões para o utilizador ID {user_id}.")
+            abort(500, description="Erro interno: falha ao ler permissões.")
+    return user_db_data.get('role'), user_permissions
 
 def require_permission(permission_key):
     """
     Decorador que verifica se o utilizador logado tem uma permissão específica.
-    Busca as permissões REAIS do utilizador na base de dados.
+    Busca as permissões REAIS do utilizador na base de dados (com cache em memória).
     """
     def decorator(f):
         @wraps(f)
@@ -24,35 +137,23 @@ def require_permission(permission_key):
 
                 user_id = current_user.get('id')
 
-                # 2. Buscar permissões REAIS na base de dados (usando a conexão 'g' do app.py)
-                if not g.db_cursor:
-                    current_app.logger.error(f"Falha na verificação de permissão: Sem cursor de DB. Rota: {request.path}")
-                    abort(500, description="Erro interno: falha na conexão da base de dados.")
-                    
-                g.db_cursor.execute("SELECT role, permissoes FROM usuarios WHERE id = %s", (user_id,))
-                user_db_data = g.db_cursor.fetchone()
-
-                if not user_db_data:
-                    current_app.logger.error(f"Falha na verificação de permissão: Utilizador ID {user_id} não encontrado na DB. Rota: {request.path}")
-                    abort(401, description="Acesso não autorizado: utilizador inválido.")
+                # 2. Buscar permissões REAIS (cache em memória; na falta, a base de dados)
+                cached = _get_cached_permissions(user_id)
+                if cached is None:
+                    generation = _current_generation()
+                    cached = _load_permissions(user_id)
+                    if cached is None:
+                        current_app.logger.error(f"Falha na verificação de permissão: Utilizador ID {user_id} não encontrado na DB. Rota: {request.path}")
+                        abort(401, description="Acesso não autorizado: utilizador inválido.")
+                    _store_permissions(user_id, *cached, generation=generation)
+                role, user_permissions = cached
 
                 # 3. Verificar permissões
-                role = user_db_data.get('role')
-                
                 # Administradores têm acesso total
                 if role == 'administrador':
                     return f(*args, **kwargs) # Permite acesso
 
                 # Verificar permissões específicas para outros roles
-                permissoes_str = user_db_data.get('permissoes')
-                user_permissions = {}
-                if permissoes_str:
-                    try:
-                        user_permissions = json.loads(permissoes_str)
-                    except json.JSONDecodeError:
-                        current_app.logger.error(f"Erro ao descodificar JSON de permissões para o utilizador ID {user_id}.")
-                        abort(500, description="Erro interno: falha ao ler permissões.")
-
                 if user_permissions.get(permission_key, False):
                     return f(*args, **kwargs) # Permite acesso
                 
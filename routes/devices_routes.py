@@ -4,30 +4,43 @@
 from flask import Blueprint, jsonify, request, g, current_app
 import json
 from .audit_helper import log_change 
-import csv
-import io
 from .decorators import require_permission
+from .cache import invalidate_after_commit
+from .pagination import ListingSpec, listing_response
+from .import_engine import ImportSpec, RowError, iter_csv_rows, run_import, validate_import, wants_dry_run
+from .import_jobs import submit_import_job, wants_background
+from .records_read_model import sync_device
 
 devices_bp = Blueprint('devices', __name__)
 
+DEVICE_LISTING = ListingSpec(
+    select="""
+        a.id, a.modelo AS model, a.imei1, a.imei2,
+        a.condicao AS `condition`, a.observacoes AS colorNotes,
+        a.linha_id AS lineId, l.numero AS currentLine, a.status
+    """,
+    from_sql="FROM aparelhos a LEFT JOIN linhas l ON a.linha_id = l.id",
+    sortable={'id': 'a.id', 'model': 'a.modelo', 'imei1': 'a.imei1',
+              'condition': 'a.condicao', 'currentLine': 'l.numero'},
+    filters={'condition': ('a.condicao', 'eq'), 'operator': ('l.operadora', 'eq'),
+             'model': ('a.modelo', 'eq'), 'imei1': ('a.imei1', 'eq'),
+             'q': (['a.modelo', 'a.imei1', 'a.imei2'], 'like')},
+    default_sort='id',
+    id_column='a.id',
+)
+
 @devices_bp.route('/', methods=['GET'])
 def get_devices():
+    """
+    Lista aparelhos. Aceita filtros (condition, operator, model, imei1, q), ordenação
+    (sort, direction) e, com page/limit, devolve o envelope paginado.
+    Com ?stream=json|ndjson envia todas as linhas em streaming.
+    """
     try:
         if not g.db_cursor:
              return jsonify({'message': 'Erro interno: Falha na conexão com a base de dados'}), 500
              
-        # Versão estável e correta da consulta
-        sql = """
-            SELECT 
-                a.id, a.modelo AS model, a.imei1, a.imei2, 
-                a.condicao AS `condition`, a.observacoes AS colorNotes,
-                l.numero AS currentLine, a.status
-            FROM aparelhos a
-            LEFT JOIN linhas l ON a.linha_id = l.id
-        """
-        g.db_cursor.execute(sql)
-        devices = g.db_cursor.fetchall()
-        return jsonify(devices)
+        return listing_response(DEVICE_LISTING, g.db_cursor)
     except Exception as e:
         current_app.logger.error(f"Erro ao buscar aparelhos: {e}", exc_info=True)
         return jsonify({'message': 'Erro ao buscar aparelhos'}), 500
@@ -58,6 +71,7 @@ def add_device():
             (modelo, imei1, imei2, condicao, observacoes, linha_id if linha_id else None)
         )
         g.db_conn.commit()
+        invalidate_after_commit('dashboard', 'reports')
         
         log_change(
             user_id=user_id, username=username, action_type='CREATE',
@@ -92,12 +106,15 @@ def update_device(imei):
         g.db_cursor.execute("SELECT * FROM aparelhos WHERE imei1 = %s", (imei, ))
         old_data = g.db_cursor.fetchone()
 
+        if old_data:
+            sync_device(g.db_cursor, old_data['id'], modelo, linha_id if linha_id else None)
         # Query de UPDATE corrigida
         g.db_cursor.execute( 
             "UPDATE aparelhos SET modelo = %s, imei2 = %s, condicao = %s, observacoes = %s, linha_id = %s WHERE imei1 = %s",
             (modelo, imei2, condicao, observacoes, linha_id if linha_id else None, imei)
         )
         g.db_conn.commit()
+        invalidate_after_commit('dashboard', 'reports')
         
         if g.db_cursor.rowcount == 0:
             return jsonify({'message': 'Aparelho não encontrado'}), 404
@@ -130,6 +147,7 @@ def delete_device(imei):
 
         g.db_cursor.execute("DELETE FROM aparelhos WHERE imei1 = %s", (imei,))
         g.db_conn.commit()
+        invalidate_after_commit('dashboard', 'reports')
 
         if g.db_cursor.rowcount == 0:
             return jsonify({'message': 'Aparelho não encontrado'}), 404
@@ -176,6 +194,47 @@ def get_device_history(imei):
         current_app.logger.error(f"Erro ao buscar histórico do aparelho {imei}: {e}", exc_info=True)
         return jsonify({'message': 'Erro ao buscar histórico do aparelho'}), 500
 
+VALID_CONDITIONS = ['Novo', 'Aprovado para uso', 'Em manutenção', 'Danificado', 'Sinistrado', 'Com Defeito']
+
+def is_valid_imei(imei):
+    """IMEI com 15 dígitos e dígito de controlo (Luhn) correto."""
+    if len(imei) != 15 or not imei.isdigit():
+        return False
+    total = 0
+    for position, char in enumerate(imei):
+        digit = int(char)
+        if position % 2 == 1:
+            digit *= 2
+            if digit > 9:
+                digit -= 9
+        total += digit
+    return total % 10 == 0
+
+def _parse_device_row(row):
+    modelo, imei1, condicao = row[0], row[1], row[2]
+    imei2 = row[3] if len(row) > 3 else None
+    observacoes = row[4] if len(row) > 4 else None
+
+    if not all([modelo, imei1, condicao]):
+        raise RowError(f'Linha com dados obrigatórios em falta: {",".join(row)}')
+    if condicao not in VALID_CONDITIONS:
+        raise RowError(f'IMEI {imei1}: Condição "{condicao}" inválida.')
+    if not is_valid_imei(imei1):
+        raise RowError(f'IMEI {imei1}: IMEI inválido (15 dígitos com dígito de controlo).')
+    if imei2 and not is_valid_imei(imei2):
+        raise RowError(f'IMEI {imei1}: IMEI2 {imei2} inválido.')
+    return (modelo, imei1, imei2, condicao, observacoes)
+
+DEVICE_IMPORT = ImportSpec(
+    table='aparelhos',
+    columns=('modelo', 'imei1', 'imei2', 'condicao', 'observacoes'),
+    min_columns=3,
+    parse=_parse_device_row,
+    label=lambda row: f'IMEI {row[1]}',
+    name='Aparelhos',
+    unique=[('imei1', 'IMEI')],
+)
+
 @devices_bp.route('/import', methods=['POST'])
 @require_permission('devices_import')
 def import_devices():
@@ -191,49 +250,32 @@ def import_devices():
     user_id = current_user.get('id')
     username = current_user.get('nome', 'Sistema')
 
+    # ?background=1: guarda o ficheiro, agenda o job e responde de imediato (202)
+    if wants_background(request) and not wants_dry_run(request):
+        try:
+            job_id = submit_import_job(DEVICE_IMPORT, file, user_id, username, target_resource='Device')
+            return jsonify({'message': 'Importação agendada.', 'jobId': job_id, 'statusUrl': f'/api/jobs/{job_id}'}), 202
+        except Exception as e:
+            current_app.logger.error(f"Erro ao agendar importação ({DEVICE_IMPORT.name}): {e}", exc_info=True)
+            return jsonify({'message': 'Erro ao agendar a importação.'}), 500
+
     try:
         if not g.db_cursor:
              return jsonify({'message': 'Erro interno: Falha na conexão com a base de dados'}), 500
              
-        stream = io.StringIO(file.stream.read().decode("UTF-8"), newline=None)
-        csv_reader = csv.reader(stream)
-        
-        next(csv_reader)
-        
-        success_count = 0
-        skipped_count = 0
-        failed_entries = []
-        valid_conditions = ['Novo', 'Aprovado para uso', 'Em manutenção', 'Danificado', 'Sinistrado', 'Com Defeito']
-
-        for row in csv_reader:
-            try:
-                if len(row) < 3:
-                    failed_entries.append(f'Linha com colunas insuficientes: {",".join(row)}')
-                    continue
-                modelo, imei1, condicao = row[0], row[1], row[2]
-                imei2 = row[3] if len(row) > 3 else None
-                observacoes = row[4] if len(row) > 4 else None
+        # Pré-passagem: validação e chaves repetidas/existentes, antes de gravar
+        report = validate_import(DEVICE_IMPORT, iter_csv_rows(file.stream), g.db_cursor)
+        if wants_dry_run(request):
+            return jsonify(report.to_dict(dry_run=True))
 
-                if not all([modelo, imei1, condicao]):
-                    failed_entries.append(f'Linha com dados obrigatórios em falta: {",".join(row)}')
-                    continue
-                if condicao not in valid_conditions:
-                    failed_entries.append(f'IMEI {imei1}: Condição "{condicao}" inválida.')
-                    continue
-                
-                g.db_cursor.execute(
-                    "INSERT IGNORE INTO aparelhos (modelo, imei1, imei2, condicao, observacoes) VALUES (%s, %s, %s, %s, %s)",
-                    (modelo, imei1, imei2, condicao, observacoes)
-                )
-                if g.db_cursor.rowcount > 0:
-                    success_count += 1
-                else:
-                    skipped_count += 1
-            except Exception as e:
-                failed_entries.append(f'IMEI {row[1]}: Erro inesperado.')
-                current_app.logger.warning(f"Erro na linha do CSV (Aparelhos): {row} -> {e}")
+        file.stream.seek(0)
+        result = run_import(DEVICE_IMPORT, iter_csv_rows(file.stream), g.db_cursor, report=report)
+        success_count = result.success_count
+        skipped_count = result.skipped_count
+        failed_entries = result.failed_entries
         
         g.db_conn.commit()
+        invalidate_after_commit('dashboard', 'reports')
 
         log_change(
             user_id=user_id, username=username, action_type='IMPORT',
@@ -242,7 +284,8 @@ def import_devices():
         )
         return jsonify({
             'message': f'{success_count} importados, {skipped_count} ignorados.',
-            'failures': failed_entries
+            'failures': failed_entries,
+            'report': report.to_dict()
         }), 201
     except Exception as e:
         if g.db_conn: g.db_conn.rollback()
@@ -260,10 +303,7 @@ def get_eligible_devices():
             FROM aparelhos a
             WHERE 
                 a.condicao IN ('Com Defeito', 'Danificado') 
-                AND NOT EXISTS (
-                    SELECT 1 FROM registros r 
-                    WHERE r.aparelho_id = a.id AND r.status = 'Em Uso'
-                )
+                AND a.registro_atual_id IS NULL
             ORDER BY a.modelo;
         """
         g.db_cursor.execute(sql)
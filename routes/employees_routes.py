@@ -3,22 +3,35 @@
 from flask import Blueprint, jsonify, request, g, current_app
 from .audit_helper import log_change
 from .decorators import require_permission
-import csv
-import io
+from .cache import invalidate_after_commit
+from .pagination import ListingSpec, listing_response
+from .import_engine import ImportSpec, RowError, iter_csv_rows, run_import, run_sync, validate_import, wants_dry_run
+from .records_read_model import sync_employee, sync_employee_names
+from .import_jobs import submit_import_job, wants_background
+import json
 
 employees_bp = Blueprint('employees', __name__)
 
+EMPLOYEE_LISTING = ListingSpec(
+    select="id, nome AS name, matricula, cargo AS position, email, ativo AS active",
+    from_sql="FROM funcionarios",
+    sortable={'id': 'id', 'name': 'nome', 'matricula': 'matricula', 'position': 'cargo'},
+    filters={'position': ('cargo', 'eq'), 'active': ('ativo', 'eq'), 'matricula': ('matricula', 'eq'),
+             'q': (['nome', 'matricula', 'email'], 'like')},
+    default_sort='name',
+)
+
 @employees_bp.route('/', methods=['GET'])
 def get_employees():
-    """Busca e retorna todos os funcionários."""
+    """
+    Busca funcionários (filtros: position, active, matricula, q; ordenação: sort/direction;
+    paginação: page/limit; streaming: stream=json|ndjson).
+    """
     try:
         if not g.db_cursor:
             return jsonify({'message': 'Erro interno: Falha na conexão com a base de dados'}), 500
         
-        # Versão estável e correta da consulta
-        g.db_cursor.execute("SELECT id, nome AS name, matricula, cargo AS position, email FROM funcionarios ORDER BY nome")
-        employees = g.db_cursor.fetchall()
-        return jsonify(employees)
+        return listing_response(EMPLOYEE_LISTING, g.db_cursor)
     except Exception as e:
         current_app.logger.error(f"Erro ao buscar funcionários: {e}", exc_info=True)
         return jsonify({'message': 'Erro ao buscar funcionários'}), 500
@@ -48,6 +61,7 @@ def add_employee():
             (nome, matricula, cargo, email)
         )
         g.db_conn.commit()
+        invalidate_after_commit('dashboard')
         
         log_change(
             user_id=user_id, username=username, action_type='CREATE',
@@ -82,11 +96,14 @@ def update_employee(employee_id):
         g.db_cursor.execute("SELECT * FROM funcionarios WHERE id = %s", (employee_id,))
         old_data = g.db_cursor.fetchone()
 
+        if old_data:
+            sync_employee(g.db_cursor, employee_id, nome, matricula)
         g.db_cursor.execute(
             "UPDATE funcionarios SET nome = %s, matricula = %s, cargo = %s, email = %s WHERE id = %s",
             (nome, matricula, cargo, email, employee_id)
         )
         g.db_conn.commit()
+        invalidate_after_commit('dashboard')
 
         if g.db_cursor.rowcount == 0:
             return jsonify({'message': 'Funcionário não encontrado'}), 404
@@ -122,6 +139,7 @@ def delete_employee(employee_id):
 
         g.db_cursor.execute("DELETE FROM funcionarios WHERE id = %s", (employee_id,))
         g.db_conn.commit()
+        invalidate_after_commit('dashboard')
 
         if g.db_cursor.rowcount == 0:
             return jsonify({'message': 'Funcionário não encontrado'}), 404
@@ -162,10 +180,31 @@ def get_employee_history(employee_id):
         current_app.logger.error(f"Erro ao buscar histórico do funcionário {employee_id}: {e}", exc_info=True)
         return jsonify({'message': 'Erro ao buscar histórico do funcionário'}), 500
 
+def _parse_employee_row(row):
+    nome, matricula, cargo = row[0], row[1], row[2]
+    email = row[3] if len(row) > 3 else None
+
+    if not all([nome, matricula, cargo]):
+        raise RowError(f'Linha com dados obrigatórios em falta: {",".join(row)}')
+    return (nome, matricula, cargo, email)
+
+EMPLOYEE_IMPORT = ImportSpec(
+    table='funcionarios',
+    columns=('nome', 'matricula', 'cargo', 'email'),
+    min_columns=3,
+    parse=_parse_employee_row,
+    label=lambda row: f'Matrícula {row[1]}',
+    name='Funcionários',
+    unique=[('matricula', 'Matrícula')],
+)
+
 @employees_bp.route('/import', methods=['POST'])
 @require_permission('employees_import')
 def import_employees():
-    """Importa funcionários a partir de um arquivo CSV."""
+    """
+    Importa funcionários a partir de um arquivo CSV.
+    Com mode=sync o ficheiro é tratado como a lista completa dos RH (ver _sync_employees).
+    """
     if 'file' not in request.files:
         return jsonify({'message': 'Nenhum ficheiro enviado'}), 400
     
@@ -178,44 +217,35 @@ def import_employees():
     user_id = current_user.get('id')
     username = current_user.get('nome', 'Sistema')
 
+    if request.values.get('mode') == 'sync':
+        return _sync_employees(file, user_id, username)
+
+    # ?background=1: guarda o ficheiro, agenda o job e responde de imediato (202)
+    if wants_background(request) and not wants_dry_run(request):
+        try:
+            job_id = submit_import_job(EMPLOYEE_IMPORT, file, user_id, username, target_resource='Employee')
+            return jsonify({'message': 'Importação agendada.', 'jobId': job_id, 'statusUrl': f'/api/jobs/{job_id}'}), 202
+        except Exception as e:
+            current_app.logger.error(f"Erro ao agendar importação ({EMPLOYEE_IMPORT.name}): {e}", exc_info=True)
+            return jsonify({'message': 'Erro ao agendar a importação.'}), 500
+
     try:
         if not g.db_cursor:
             return jsonify({'message': 'Erro interno: Falha na conexão com a base de dados'}), 500
             
-        stream = io.StringIO(file.stream.read().decode("UTF-8"), newline=None)
-        csv_reader = csv.reader(stream)
-        
-        next(csv_reader) # Pula o cabeçalho
-        
-        success_count = 0
-        skipped_count = 0
-        failed_entries = []
-
-        for row in csv_reader:
-            try:
-                if len(row) < 3:
-                    failed_entries.append(f'Linha com colunas insuficientes: {",".join(row)}')
-                    continue
-                nome, matricula, cargo = row[0], row[1], row[2]
-                email = row[3] if len(row) > 3 else None
-
-                if not all([nome, matricula, cargo]):
-                    failed_entries.append(f'Linha com dados obrigatórios em falta: {",".join(row)}')
-                    continue
-                
-                g.db_cursor.execute(
-                    "INSERT IGNORE INTO funcionarios (nome, matricula, cargo, email) VALUES (%s, %s, %s, %s)",
-                    (nome, matricula, cargo, email)
-                )
-                if g.db_cursor.rowcount > 0:
-                    success_count += 1
-                else:
-                    skipped_count += 1
-            except Exception as e:
-                failed_entries.append(f'Matrícula {row[1]}: Erro inesperado.')
-                current_app.logger.warning(f"Erro na linha do CSV (Funcionários): {row} -> {e}")
+        # Pré-passagem: validação e chaves repetidas/existentes, antes de gravar
+        report = validate_import(EMPLOYEE_IMPORT, iter_csv_rows(file.stream), g.db_cursor)
+        if wants_dry_run(request):
+            return jsonify(report.to_dict(dry_run=True))
+
+        file.stream.seek(0)
+        result = run_import(EMPLOYEE_IMPORT, iter_csv_rows(file.stream), g.db_cursor, report=report)
+        success_count = result.success_count
+        skipped_count = result.skipped_count
+        failed_entries = result.failed_entries
         
         g.db_conn.commit()
+        invalidate_after_commit('dashboard')
 
         log_change(
             user_id=user_id, username=username, action_type='IMPORT',
@@ -224,9 +254,47 @@ def import_employees():
         )
         return jsonify({
             'message': f'{success_count} importados, {skipped_count} ignorados.',
-            'failures': failed_entries
+            'failures': failed_entries,
+            'report': report.to_dict()
         }), 201
     except Exception as e:
         if g.db_conn: g.db_conn.rollback()
         current_app.logger.error(f"Erro GERAL ao importar funcionários: {e}", exc_info=True)
         return jsonify({'message': 'Erro interno ao processar o ficheiro CSV.'}), 500
+
+
+def _sync_employees(file, user_id, username):
+    """
+    Sincronização com o ficheiro completo dos RH, pela matrícula: insere os novos,
+    atualiza só os alterados e deixa os restantes intactos (os registros continuam
+    a apontar para os mesmos ids). Com flag_missing=1 os que não vêm no ficheiro
+    ficam com ativo = 0; com dry_run=1 devolve só as contagens.
+    """
+    flag_missing = request.values.get('flag_missing', '0').lower() in ('1', 'true', 'yes')
+    dry_run = wants_dry_run(request)
+    try:
+        if not g.db_cursor:
+            return jsonify({'message': 'Erro interno: Falha na conexão com a base de dados'}), 500
+
+        result = run_sync(EMPLOYEE_IMPORT, iter_csv_rows(file.stream), g.db_cursor, key='matricula',
+                          flag_column='ativo', flag_missing=flag_missing, dry_run=dry_run)
+        summary = (f'{result.inserted} inseridos, {result.updated} atualizados, {result.unchanged} sem alterações, '
+                   f'{result.missing} em falta no ficheiro ({result.flagged} desativados). Falhas: {len(result.failed_entries)}.')
+        if dry_run:
+            return jsonify({'message': summary, **result.to_dict(dry_run=True)})
+
+        if result.updated:
+            sync_employee_names(g.db_cursor)
+        g.db_conn.commit()
+        invalidate_after_commit('dashboard')
+
+        log_change(
+            user_id=user_id, username=username, action_type='SYNC',
+            target_resource='Employee', target_id='Multiple',
+            details_dict={'message': summary}
+        )
+        return jsonify({'message': summary, **result.to_dict()})
+    except Exception as e:
+        if g.db_conn: g.db_conn.rollback()
+        current_app.logger.error(f"Erro GERAL ao sincronizar funcionários: {e}", exc_info=True)
+        return jsonify({'message': 'Erro interno ao processar o ficheiro CSV.'}), 500
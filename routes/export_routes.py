@@ -0,0 +1,140 @@
+# SMARTCONTROL/routes/export_routes.py
+# Exportações CSV/XLSX feitas no servidor, com os mesmos filtros e ordenação
+# das listagens (ver pagination.ListingSpec). As duas leem numa conexão própria
+# do pool (streaming.open_stream_cursor), não na da requisição.
+#
+# - CSV: enviado em streaming a partir do cursor (streaming.stream_csv).
+# - XLSX: escrito com xlsxwriter em modo constant_memory (uma linha de cada vez)
+#   para um ficheiro temporário, que é enviado e apagado no fim da resposta.
+#   O texto é sempre gravado como texto: um nome ou observação começado por '='
+#   não pode virar fórmula no ficheiro exportado.
+#   O xlsxwriter é opcional; sem ele o formato xlsx devolve 501.
+
+from flask import Blueprint, jsonify, request, current_app, send_file
+from datetime import date, datetime
+from decimal import Decimal
+from .streaming import STREAM_BATCH_SIZE, open_stream_cursor, stream_csv
+from .devices_routes import DEVICE_LISTING
+from .lines_routes import LINE_LISTING
+from .employees_routes import EMPLOYEE_LISTING
+from .maintenance_routes import MAINTENANCE_LISTING
+from .records_routes import RECORD_LISTING
+import os
+import tempfile
+
+try:
+    import xlsxwriter
+except ImportError:
+    xlsxwriter = None
+
+export_bp = Blueprint('export', __name__)
+
+# dataset -> (listing, [(chave da linha, cabeçalho)])
+EXPORTS = {
+    'devices': (DEVICE_LISTING, [
+        ('model', 'Modelo'), ('imei1', 'IMEI'), ('imei2', 'IMEI 2'), ('condition', 'Condição'),
+        ('currentLine', 'Linha'), ('colorNotes', 'Observações'),
+    ]),
+    'lines': (LINE_LISTING, [
+        ('numero', 'Número'), ('operadora', 'Operadora'), ('plano', 'Plano'),
+        ('status', 'Status'), ('imeiVinculado', 'Aparelho Vinculado'),
+    ]),
+    'employees': (EMPLOYEE_LISTING, [
+        ('name', 'Nome'), ('matricula', 'Matrícula'), ('position', 'Cargo'), ('email', 'Email'),
+    ]),
+    'maintenance': (MAINTENANCE_LISTING, [
+        ('numero_os', 'Nº OS'), ('modelo', 'Aparelho'), ('imei1', 'IMEI'), ('data_envio', 'Envio'),
+        ('data_retorno', 'Retorno'), ('defeito_reportado', 'Defeito'), ('servico_realizado', 'Serviço'),
+        ('fornecedor', 'Fornecedor'), ('custo', 'Custo'), ('status', 'Status'),
+    ]),
+    'records': (RECORD_LISTING, [
+        ('employeeName', 'Funcionário'), ('employeeMatricula', 'Matrícula'), ('deviceModel', 'Aparelho'),
+        ('deviceImei', 'IMEI'), ('deviceLine', 'Linha'), ('deliveryDate', 'Data Entrega'),
+        ('returnDate', 'Data Devolução'), ('status', 'Status'),
+    ]),
+}
+
+
+def _listing_sql(spec):
+    where_sql, params = spec.where(request.args)
+    order_sql, _, _ = spec.order_by(request.args)
+    return f"SELECT {spec.select} {spec.from_sql} {where_sql} {order_sql}", params
+
+
+def _write_xlsx(sql, params, columns, path):
+    """Escreve o resultado da consulta no ficheiro, lendo o cursor aos blocos."""
+    cursor = open_stream_cursor(sql, params)
+    workbook = xlsxwriter.Workbook(path, {
+        'constant_memory': True,
+        'tmpdir': tempfile.gettempdir(),
+        'strings_to_formulas': False,
+        'strings_to_numbers': False,
+        'strings_to_urls': False,
+    })
+    try:
+        sheet = workbook.add_worksheet()
+        bold = workbook.add_format({'bold': True})
+        date_format = workbook.add_format({'num_format': 'dd/mm/yyyy'})
+        sheet.write_row(0, 0, [header for _, header in columns], bold)
+
+        row_index = 1
+        while True:
+            rows = cursor.fetchmany(STREAM_BATCH_SIZE)
+            if not rows:
+                break
+            for row in rows:
+                for col_index, (key, _) in enumerate(columns):
+                    value = row.get(key)
+                    if value is None:
+                        continue
+                    if isinstance(value, (date, datetime)):
+                        sheet.write_datetime(row_index, col_index, value, date_format)
+                    elif isinstance(value, Decimal):
+                        sheet.write_number(row_index, col_index, float(value))
+                    elif isinstance(value, (int, float)):
+                        sheet.write_number(row_index, col_index, value)
+                    else:
+                        sheet.write_string(row_index, col_index, str(value))
+                row_index += 1
+    finally:
+        workbook.close()
+        cursor.close()
+
+
+@export_bp.route('/<string:dataset>', methods=['GET'])
+def export_dataset(dataset):
+    """
+    Exporta devices, lines, employees, maintenance ou records.
+    ?format=csv (padrão) ou xlsx; os restantes parâmetros são os filtros e a
+    ordenação da listagem correspondente (ex: /api/export/maintenance?status=Concluído&format=xlsx).
+    """
+    if dataset not in EXPORTS:
+        return jsonify({'message': 'Exportação desconhecida'}), 404
+    fmt = request.args.get('format', 'csv').lower()
+    if fmt not in ('csv', 'xlsx'):
+        return jsonify({'message': 'Formato inválido (use csv ou xlsx)'}), 400
+    if fmt == 'xlsx' and xlsxwriter is None:
+        return jsonify({'message': 'Exportação XLSX indisponível: instale o pacote xlsxwriter'}), 501
+
+    spec, columns = EXPORTS[dataset]
+    filename = f"{dataset}_{date.today().isoformat()}.{fmt}"
+    path = None
+    try:
+        sql, params = _listing_sql(spec)
+        if fmt == 'csv':
+            return stream_csv(sql, params, columns, filename)
+
+        fd, path = tempfile.mkstemp(prefix='export_', suffix='.xlsx')
+        os.close(fd)
+        _write_xlsx(sql, params, columns, path)
+        response = send_file(path, as_attachment=True, download_name=filename,
+                             mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+        response.call_on_close(lambda: os.remove(path))
+        return response
+    except Exception as e:
+        if path and os.path.exists(path):
+            os.remove(path)
+        if isinstance(e, ConnectionError):
+            return jsonify({'message': 'Erro interno: Falha na conexão com a base de dados'}), 500
+        current_app.logger.error(f"Erro ao exportar {dataset} ({fmt}): {e}", exc_info=True)
+        return jsonify({'message': 'Erro ao gerar a exportação'}), 500
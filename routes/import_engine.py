@@ -0,0 +1,352 @@
+# SMARTCONTROL/routes/import_engine.py
+# Motor de importação CSV partilhado por aparelhos, linhas e funcionários.
+#
+# O ficheiro é lido em streaming (linha a linha, sem carregar o upload inteiro para
+# memória), validado por linha e gravado em lotes com um único INSERT IGNORE
+# multi-linha por lote. Se um lote falhar na base de dados, as linhas desse lote
+# são repetidas uma a uma para que o erro fique atribuído à linha certa.
+#
+# Antes de gravar, validate_import faz uma pré-passagem pelo ficheiro: valida
+# todas as linhas, deteta chaves repetidas dentro do ficheiro e procura as chaves
+# já existentes na base de dados com poucas consultas IN (...) em lote. O
+# relatório resultante (aceites / rejeitadas) serve para o modo dry-run e é
+# passado a run_import para que a gravação salte as linhas rejeitadas.
+#
+# run_sync é o modo de sincronização (upsert): compara o ficheiro completo com a
+# tabela pela coluna chave e só grava as linhas novas ou alteradas.
+
+from flask import current_app
+import codecs
+import csv
+import os
+import unicodedata
+
+IMPORT_BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE', 1000))
+# Número de valores por consulta IN (...) na procura de chaves já existentes
+IMPORT_LOOKUP_CHUNK = int(os.environ.get('IMPORT_LOOKUP_CHUNK', 1000))
+
+
+class RowError(Exception):
+    """Linha rejeitada na validação; a mensagem vai para a lista de falhas."""
+
+
+class ImportSpec:
+    """
+    Descreve uma importação:
+    - table / columns: destino do INSERT IGNORE;
+    - min_columns: número mínimo de colunas no CSV;
+    - parse(row): devolve o tuplo de valores (na ordem de 'columns') ou lança RowError;
+    - label(row): identifica a linha nas mensagens de erro inesperado (ex: 'IMEI 123');
+    - name: nome usado nos logs;
+    - unique: colunas únicas verificadas na pré-passagem, como
+      [(coluna, nome_para_mensagens)]; a coluna tem de estar em 'columns'.
+    """
+
+    def __init__(self, table, columns, min_columns, parse, label, name, unique=()):
+        self.table = table
+        self.columns = columns
+        self.min_columns = min_columns
+        self.parse = parse
+        self.label = label
+        self.name = name
+        self.unique = unique
+
+
+class ImportResult:
+
+    def __init__(self):
+        self.success_count = 0
+        self.skipped_count = 0
+        self.failed_entries = []
+        self.processed = 0
+
+
+class ImportReport:
+    """
+    Resultado da pré-passagem. As linhas são numeradas como no ficheiro
+    (a linha 1 é o cabeçalho). 'rejected' guarda as linhas inválidas ou repetidas
+    no ficheiro; 'existing' as que já existem na base de dados (serão ignoradas).
+    """
+
+    def __init__(self):
+        self.total = 0
+        self.rejected = {}
+        self.existing = {}
+
+    @property
+    def accepted(self):
+        return self.total - len(self.rejected) - len(self.existing)
+
+    def to_dict(self, dry_run=False):
+        return {
+            'dryRun': dry_run,
+            'total': self.total,
+            'accepted': self.accepted,
+            'existing': [{'line': line, 'reason': reason} for line, reason in sorted(self.existing.items())],
+            'rejected': [{'line': line, 'reason': reason} for line, reason in sorted(self.rejected.items())],
+        }
+
+
+class SyncResult:
+
+    def __init__(self):
+        self.inserted = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.missing = 0
+        self.flagged = 0
+        self.failed_entries = []
+        self.processed = 0
+
+    def to_dict(self, dry_run=False):
+        return {
+            'dryRun': dry_run,
+            'processed': self.processed,
+            'inserted': self.inserted,
+            'updated': self.updated,
+            'unchanged': self.unchanged,
+            'missing': self.missing,
+            'flagged': self.flagged,
+            'failures': self.failed_entries,
+        }
+
+
+def iter_csv_rows(file_stream, skip_header=True):
+    """Lê o CSV do upload em streaming. Aceita UTF-8 com ou sem BOM."""
+    reader = csv.reader(codecs.iterdecode(file_stream, 'utf-8-sig'))
+    if skip_header:
+        next(reader, None)
+    return reader
+
+
+def wants_dry_run(req):
+    """?dry_run=1 (ou campo de formulário) devolve só o relatório da pré-passagem, sem gravar."""
+    value = req.args.get('dry_run') or req.form.get('dry_run') or ''
+    return value.lower() in ('1', 'true', 'yes')
+
+
+def _parse_row(spec, row):
+    """Valida uma linha. Devolve os valores ou lança RowError com a mensagem para o relatório."""
+    if len(row) < spec.min_columns:
+        raise RowError(f'Linha com colunas insuficientes: {",".join(row)}')
+    try:
+        return spec.parse(row)
+    except RowError:
+        raise
+    except Exception as e:
+        current_app.logger.warning(f"Erro na linha do CSV ({spec.name}): {row} -> {e}")
+        raise RowError(f'{spec.label(row)}: Erro inesperado.')
+
+
+def _existing_values(cursor, table, column, values):
+    """Devolve o subconjunto de 'values' que já existe em table.column, em consultas IN por blocos."""
+    found = set()
+    values = list(values)
+    for start in range(0, len(values), IMPORT_LOOKUP_CHUNK):
+        chunk = values[start:start + IMPORT_LOOKUP_CHUNK]
+        placeholders = ', '.join(['%s'] * len(chunk))
+        cursor.execute(f"SELECT {column} AS value FROM {table} WHERE {column} IN ({placeholders})", tuple(chunk))
+        for row in cursor.fetchall():
+            found.add(row['value'] if isinstance(row, dict) else row[0])
+    return found
+
+
+def _key(value):
+    # As colunas usam uma collation *_ci (accent-insensitive), que ignora maiúsculas,
+    # acentos e espaços finais: 'José ' e 'jose' são a mesma chave
+    decomposed = unicodedata.normalize('NFKD', str(value).rstrip())
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+def validate_import(spec, rows, cursor, first_line=2):
+    """
+    Pré-passagem: valida todas as linhas e verifica as chaves únicas contra o
+    próprio ficheiro (em memória) e contra a base de dados (consultas em lote).
+    Não grava nada. Só as chaves ficam em memória, não as linhas.
+    """
+    report = ImportReport()
+    unique = [(spec.columns.index(column), column, name) for column, name in spec.unique]
+    first_seen = {column: {} for _, column, _ in unique}
+
+    for line, row in enumerate(rows, start=first_line):
+        report.total += 1
+        try:
+            values = _parse_row(spec, row)
+        except RowError as e:
+            report.rejected[line] = str(e)
+            continue
+
+        keys = [(column, name, values[index]) for index, column, name in unique if values[index]]
+        duplicate = next(((column, name, value) for column, name, value in keys
+                          if _key(value) in first_seen[column]), None)
+        if duplicate:
+            column, name, value = duplicate
+            report.rejected[line] = f'{name} {value}: repetido no ficheiro (linha {first_seen[column][_key(value)][0]}).'
+            continue
+        for column, _, value in keys:
+            first_seen[column][_key(value)] = (line, value)
+
+    for _, column, name in unique:
+        seen = first_seen[column]
+        for value in _existing_values(cursor, spec.table, column, [value for _, value in seen.values()]):
+            match = seen.get(_key(value))
+            if match is None:
+                # A collation considerou iguais valores que _key distingue: sem linha a apontar,
+                # a linha é ignorada na gravação pelo INSERT IGNORE
+                current_app.logger.warning(f"Importação ({spec.name}): {column} '{value}' sem correspondência no ficheiro.")
+                continue
+            line, file_value = match
+            report.existing.setdefault(line, f'{name} {file_value}: já existe na base de dados.')
+    return report
+
+
+def _insert_batch(spec, cursor, values):
+    placeholders = '(' + ', '.join(['%s'] * len(spec.columns)) + ')'
+    sql = (f"INSERT IGNORE INTO {spec.table} ({', '.join(spec.columns)}) VALUES "
+           + ', '.join([placeholders] * len(values)))
+    cursor.execute(sql, tuple(v for row_values in values for v in row_values))
+    return cursor.rowcount
+
+
+def _flush(spec, cursor, batch, result):
+    """Grava um lote. batch = [(linha_csv, valores)]."""
+    if not batch:
+        return
+    try:
+        inserted = _insert_batch(spec, cursor, [values for _, values in batch])
+        result.success_count += inserted
+        result.skipped_count += len(batch) - inserted
+        return
+    except Exception as e:
+        current_app.logger.warning(f"Lote do CSV ({spec.name}) falhou, a repetir linha a linha: {e}")
+
+    for row, values in batch:
+        try:
+            if _insert_batch(spec, cursor, [values]) > 0:
+                result.success_count += 1
+            else:
+                result.skipped_count += 1
+        except Exception as e:
+            result.failed_entries.append(f'{spec.label(row)}: Erro inesperado.')
+            current_app.logger.warning(f"Erro na linha do CSV ({spec.name}): {row} -> {e}")
+
+
+def run_import(spec, rows, cursor, batch_size=IMPORT_BATCH_SIZE, on_batch=None, report=None, first_line=2):
+    """
+    Valida e grava as linhas em lotes. Não faz commit (fica a cargo de quem chama).
+    on_batch(result), se indicado, é chamado depois de cada lote gravado.
+    Com o relatório de validate_import (sobre o mesmo ficheiro), as linhas
+    rejeitadas contam como falhas e as já existentes como ignoradas, sem irem à base de dados.
+    """
+    result = ImportResult()
+    batch = []
+    for line, row in enumerate(rows, start=first_line):
+        result.processed += 1
+        if report is not None:
+            if line in report.rejected:
+                result.failed_entries.append(report.rejected[line])
+                continue
+            if line in report.existing:
+                result.skipped_count += 1
+                continue
+        try:
+            batch.append((row, _parse_row(spec, row)))
+        except RowError as e:
+            result.failed_entries.append(str(e))
+            continue
+
+        if len(batch) >= batch_size:
+            _flush(spec, cursor, batch, result)
+            batch = []
+            if on_batch:
+                on_batch(result)
+
+    _flush(spec, cursor, batch, result)
+    if on_batch:
+        on_batch(result)
+    return result
+
+
+def _normalize(value):
+    return None if value is None or value == '' else str(value)
+
+
+def _upsert_batch(spec, cursor, values, flag_column):
+    """INSERT multi-linha com ON DUPLICATE KEY UPDATE: novas linhas e alteradas num só comando."""
+    columns = list(spec.columns) + ([flag_column] if flag_column else [])
+    placeholders = '(' + ', '.join(['%s'] * len(columns)) + ')'
+    updates = ', '.join(f"{column} = VALUES({column})" for column in columns)
+    sql = (f"INSERT INTO {spec.table} ({', '.join(columns)}) VALUES "
+           + ', '.join([placeholders] * len(values))
+           + f" ON DUPLICATE KEY UPDATE {updates}")
+    extra = (1,) if flag_column else ()
+    cursor.execute(sql, tuple(v for row_values in values for v in tuple(row_values) + extra))
+
+
+def run_sync(spec, rows, cursor, key, flag_column=None, flag_missing=False, dry_run=False,
+             batch_size=IMPORT_BATCH_SIZE, first_line=2):
+    """
+    Sincroniza a tabela com um ficheiro completo (ex: exportação noturna dos RH).
+
+    Carrega as linhas atuais indexadas pela coluna 'key' (tem de ser UNIQUE) e, para
+    cada linha do ficheiro, classifica-a como nova, alterada ou sem alterações; só as
+    novas e as alteradas são gravadas, em lotes de upsert. As linhas da tabela que não
+    vêm no ficheiro contam como 'missing' e, com flag_missing, são marcadas com
+    flag_column = 0 (uma linha marcada que volte a aparecer é reativada).
+    Com dry_run nada é gravado. Não faz commit.
+    """
+    result = SyncResult()
+    key_index = spec.columns.index(key)
+    compared = [(index, column) for index, column in enumerate(spec.columns) if column != key]
+
+    select_columns = ['id'] + list(spec.columns) + ([flag_column] if flag_column else [])
+    cursor.execute(f"SELECT {', '.join(select_columns)} FROM {spec.table}")
+    current = {_key(row[key]): row for row in cursor.fetchall()}
+
+    seen = {}
+    pending = []
+    for line, row in enumerate(rows, start=first_line):
+        result.processed += 1
+        try:
+            values = _parse_row(spec, row)
+        except RowError as e:
+            result.failed_entries.append(str(e))
+            continue
+
+        row_key = _key(values[key_index])
+        if row_key in seen:
+            result.failed_entries.append(f'{spec.label(row)}: repetido no ficheiro (linha {seen[row_key]}).')
+            continue
+        seen[row_key] = line
+
+        existing = current.get(row_key)
+        if existing is None:
+            result.inserted += 1
+        elif (any(_normalize(existing[column]) != _normalize(values[index]) for index, column in compared)
+              or (flag_column and not existing[flag_column])):
+            result.updated += 1
+        else:
+            result.unchanged += 1
+            continue
+
+        pending.append(values)
+        if len(pending) >= batch_size:
+            if not dry_run:
+                _upsert_batch(spec, cursor, pending, flag_column)
+            pending = []
+    if pending and not dry_run:
+        _upsert_batch(spec, cursor, pending, flag_column)
+
+    missing_ids = [row['id'] for row_key, row in current.items()
+                   if row_key not in seen and (not flag_column or row[flag_column])]
+    result.missing = len(missing_ids)
+    # Um ficheiro sem nenhuma linha válida nunca desativa a tabela inteira
+    if flag_missing and flag_column and seen and not dry_run:
+        for start in range(0, len(missing_ids), IMPORT_LOOKUP_CHUNK):
+            chunk = missing_ids[start:start + IMPORT_LOOKUP_CHUNK]
+            cursor.execute(
+                f"UPDATE {spec.table} SET {flag_column} = 0 WHERE id IN ({', '.join(['%s'] * len(chunk))})",
+                tuple(chunk)
+            )
+            result.flagged += cursor.rowcount
+    return result
@@ -0,0 +1,263 @@
+# SMARTCONTROL/routes/import_jobs.py
+# Importações CSV em background.
+#
+# O upload é guardado num ficheiro temporário, é criada uma linha em import_jobs
+# e a importação corre num pool de threads (IMPORT_JOB_WORKERS) com uma conexão
+# própria do pool. O progresso (processados / importados / ignorados / falhas) é
+# gravado a cada lote e consultado em GET /api/jobs/<id>.
+#
+# Cada lote é confirmado (commit) junto com o progresso: se o job falhar a meio,
+# as linhas já importadas ficam gravadas e os contadores mostram até onde chegou.
+#
+# Um job nunca fica 'Pendente' para sempre:
+# - se o worker não conseguir marcar a falha na sua conexão, tenta numa nova (_mark_failed);
+# - cada processo renova heartbeat_em dos jobs que tem na fila ou em execução a cada
+#   IMPORT_JOB_HEARTBEAT_SECONDS (thread 'import-job-heartbeat'). Na mesma passagem,
+#   jobs por terminar com o batimento parado há mais de IMPORT_JOB_STALE_MINUTES
+#   ficaram órfãos (processo reiniciado ou morto) e são marcados como falhados.
+#   Um job que só está à espera na fila continua a ter batimento e não expira;
+# - o worker só arranca um job que ainda esteja pendente.
+
+from flask import current_app
+from config.database import get_connection
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from .audit_helper import insert_audit_rows
+from .cache import invalidate
+from .import_engine import iter_csv_rows, run_import, validate_import
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger('flask.app')
+
+IMPORT_JOB_WORKERS = int(os.environ.get('IMPORT_JOB_WORKERS', 2))
+IMPORT_JOBS_DIR = os.environ.get('IMPORT_JOBS_DIR') or None  # None = pasta temporária do sistema
+# Limite de mensagens de erro guardadas por job (o contador 'falhas' conta todas)
+IMPORT_JOB_MAX_ERRORS = int(os.environ.get('IMPORT_JOB_MAX_ERRORS', 1000))
+IMPORT_JOB_HEARTBEAT_SECONDS = int(os.environ.get('IMPORT_JOB_HEARTBEAT_SECONDS', 60))
+# Minutos sem batimento até um job por terminar ser dado como órfão (bem acima do intervalo do batimento)
+IMPORT_JOB_STALE_MINUTES = int(os.environ.get('IMPORT_JOB_STALE_MINUTES', 10))
+
+JOB_PENDING = 'Pendente'
+JOB_RUNNING = 'Em execução'
+JOB_DONE = 'Concluído'
+JOB_FAILED = 'Falhou'
+
+JOB_ERROR_MESSAGE = 'Erro interno ao processar o ficheiro CSV.'
+JOB_STALE_MESSAGE = 'A importação foi interrompida (servidor reiniciado). Tente novamente.'
+
+_executor = None
+_executor_lock = threading.Lock()
+# Jobs deste processo ainda por terminar (na fila ou em execução): recebem o batimento
+_active_jobs = set()
+_active_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=IMPORT_JOB_WORKERS, thread_name_prefix='import-job')
+            threading.Thread(target=_heartbeat_loop, name='import-job-heartbeat', daemon=True).start()
+        return _executor
+
+
+def heartbeat(conn):
+    """
+    Renova o batimento dos jobs deste processo e marca como falhados os jobs órfãos.
+    Devolve o número de jobs expirados.
+    """
+    with _active_lock:
+        job_ids = sorted(_active_jobs)
+    cursor = conn.cursor()
+    try:
+        if job_ids:
+            placeholders = ', '.join(['%s'] * len(job_ids))
+            cursor.execute(f"UPDATE import_jobs SET heartbeat_em = NOW() WHERE id IN ({placeholders})", tuple(job_ids))
+        cursor.execute(
+            """UPDATE import_jobs SET status = %s, mensagem = %s, concluido_em = NOW()
+               WHERE status IN (%s, %s) AND COALESCE(heartbeat_em, criado_em) < NOW() - INTERVAL %s MINUTE""",
+            (JOB_FAILED, JOB_STALE_MESSAGE, JOB_PENDING, JOB_RUNNING, IMPORT_JOB_STALE_MINUTES)
+        )
+        expired = cursor.rowcount
+        conn.commit()
+        if expired:
+            logger.warning(f"{expired} job(s) de importação sem batimento há mais de {IMPORT_JOB_STALE_MINUTES} min marcados como falhados.")
+        return expired
+    finally:
+        cursor.close()
+
+
+def _heartbeat_loop():
+    while True:
+        try:
+            conn = get_connection()
+            if conn is not None:
+                try:
+                    heartbeat(conn)
+                finally:
+                    conn.close()
+        except Exception as e:
+            logger.error(f"Batimento dos jobs de importação falhou: {e}")
+        time.sleep(IMPORT_JOB_HEARTBEAT_SECONDS)
+
+
+def wants_background(req):
+    """?background=1 ou campo de formulário background=1 pede a importação em background."""
+    value = req.args.get('background') or req.form.get('background') or ''
+    return value.lower() in ('1', 'true', 'yes')
+
+
+def _create_job(kind, filename, user_id, username):
+    """
+    Cria a linha do job numa conexão própria, confirmada de imediato: em modo
+    "unit of work" o commit da requisição só acontece depois de o worker arrancar.
+    """
+    conn = get_connection()
+    if conn is None:
+        raise ConnectionError("Falha na conexão com a base de dados")
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "INSERT INTO import_jobs (tipo, status, ficheiro, user_id, username, heartbeat_em) VALUES (%s, %s, %s, %s, %s, NOW())",
+            (kind, JOB_PENDING, filename, user_id, username)
+        )
+        conn.commit()
+        return cursor.lastrowid
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def submit_import_job(spec, file, user_id, username, target_resource, invalidates=('dashboard', 'reports')):
+    """
+    Guarda o upload e agenda a importação. Devolve o id do job.
+    target_resource é usado na entrada de auditoria; invalidates são as caches
+    a invalidar no fim (ver routes/cache.py).
+    """
+    if IMPORT_JOBS_DIR:
+        os.makedirs(IMPORT_JOBS_DIR, exist_ok=True)
+    fd, path = tempfile.mkstemp(prefix='import_', suffix='.csv', dir=IMPORT_JOBS_DIR)
+    os.close(fd)
+    try:
+        file.save(path)
+        job_id = _create_job(spec.name, file.filename, user_id, username)
+    except Exception:
+        os.remove(path)
+        raise
+
+    app = current_app._get_current_object()
+    with _active_lock:
+        _active_jobs.add(job_id)
+    _get_executor().submit(_run_job, app, job_id, spec, path, user_id, username, target_resource, invalidates)
+    return job_id
+
+
+def _update_progress(cursor, job_id, result):
+    cursor.execute(
+        "UPDATE import_jobs SET processados = %s, importados = %s, ignorados = %s, falhas = %s WHERE id = %s",
+        (result.processed, result.success_count, result.skipped_count, len(result.failed_entries), job_id)
+    )
+
+
+def _mark_failed(job_id, message=JOB_ERROR_MESSAGE):
+    """Marca o job como falhado numa conexão nova. Devolve se conseguiu."""
+    try:
+        conn = get_connection()
+        if conn is None:
+            return False
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                "UPDATE import_jobs SET status = %s, mensagem = %s, concluido_em = NOW() WHERE id = %s",
+                (JOB_FAILED, message, job_id)
+            )
+            conn.commit()
+            return True
+        finally:
+            cursor.close()
+            conn.close()
+    except Exception as e:
+        logger.error(f"Job de importação {job_id}: não foi possível marcar como falhado: {e}")
+        return False
+
+
+def _run_job(app, job_id, spec, path, user_id, username, target_resource, invalidates):
+    try:
+        _execute_job(app, job_id, spec, path, user_id, username, target_resource, invalidates)
+    finally:
+        with _active_lock:
+            _active_jobs.discard(job_id)
+
+
+def _execute_job(app, job_id, spec, path, user_id, username, target_resource, invalidates):
+    # O motor de importação usa current_app.logger, por isso o job corre com o contexto da aplicação
+    with app.app_context():
+        conn = get_connection()
+        if conn is None:
+            logger.error(f"Job de importação {job_id}: sem conexão com a base de dados.")
+            os.remove(path)
+            if not _mark_failed(job_id):
+                logger.error(f"Job de importação {job_id}: fica pendente até expirar ({IMPORT_JOB_STALE_MINUTES} min sem batimento).")
+            return
+
+        cursor = conn.cursor(dictionary=True)
+        try:
+            # Só arranca se ainda estiver pendente (pode ter sido dado como órfão por outro processo)
+            cursor.execute(
+                "UPDATE import_jobs SET status = %s, iniciado_em = NOW() WHERE id = %s AND status = %s",
+                (JOB_RUNNING, job_id, JOB_PENDING)
+            )
+            conn.commit()
+            if cursor.rowcount == 0:
+                logger.warning(f"Job de importação {job_id}: já não está pendente; não é executado.")
+                return
+
+            def on_batch(result):
+                _update_progress(cursor, job_id, result)
+                conn.commit()
+
+            # Pré-passagem sobre o ficheiro inteiro antes de gravar (ver import_engine.validate_import)
+            with open(path, 'rb') as fh:
+                report = validate_import(spec, iter_csv_rows(fh), cursor)
+            with open(path, 'rb') as fh:
+                result = run_import(spec, iter_csv_rows(fh), cursor, on_batch=on_batch, report=report)
+
+            message = (f'{result.success_count} importados, {result.skipped_count} ignorados. '
+                       f'Falhas: {len(result.failed_entries)}.')
+            insert_audit_rows(cursor, [(
+                datetime.now(), user_id, username, 'IMPORT', target_resource, 'Multiple',
+                json.dumps({'message': message, 'jobId': job_id}, ensure_ascii=False)
+            )])
+            _update_progress(cursor, job_id, result)
+            cursor.execute(
+                "UPDATE import_jobs SET status = %s, erros = %s, mensagem = %s, concluido_em = NOW() WHERE id = %s",
+                (JOB_DONE, json.dumps(result.failed_entries[:IMPORT_JOB_MAX_ERRORS], ensure_ascii=False), message, job_id)
+            )
+            conn.commit()
+            invalidate(*invalidates)
+            logger.info(f"Job de importação {job_id} ({spec.name}) concluído: {message}")
+        except Exception as e:
+            logger.error(f"Job de importação {job_id} ({spec.name}) falhou: {e}", exc_info=True)
+            try:
+                conn.rollback()
+                cursor.execute(
+                    "UPDATE import_jobs SET status = %s, mensagem = %s, concluido_em = NOW() WHERE id = %s",
+                    (JOB_FAILED, JOB_ERROR_MESSAGE, job_id)
+                )
+                conn.commit()
+            except Exception as update_error:
+                # A conexão do job pode ser a causa da falha: tenta numa nova
+                logger.error(f"Job de importação {job_id}: falha ao marcar na conexão do job: {update_error}")
+                _mark_failed(job_id)
+            # Lotes já confirmados contam para os dados (e para o dashboard)
+            invalidate(*invalidates)
+        finally:
+            cursor.close()
+            conn.close()
+            if os.path.exists(path):
+                os.remove(path)
@@ -0,0 +1,47 @@
+# SMARTCONTROL/routes/jobs_routes.py
+# Consulta do estado dos jobs de importação em background (ver import_jobs.py).
+# Só leitura: os jobs órfãos são expirados pelo batimento dos processos (import_jobs.heartbeat).
+
+from flask import Blueprint, jsonify, g, current_app
+from .import_jobs import JOB_DONE, JOB_FAILED
+import json
+
+jobs_bp = Blueprint('jobs', __name__)
+
+
+def _format_job(job):
+    errors = job.get('erros')
+    if isinstance(errors, str):
+        errors = json.loads(errors)
+    return {
+        'id': job['id'],
+        'type': job['tipo'],
+        'status': job['status'],
+        'fileName': job['ficheiro'],
+        'processed': job['processados'],
+        'imported': job['importados'],
+        'skipped': job['ignorados'],
+        'failed': job['falhas'],
+        'failures': errors or [],
+        'message': job['mensagem'],
+        'createdAt': job['criado_em'].isoformat() if job['criado_em'] else None,
+        'startedAt': job['iniciado_em'].isoformat() if job['iniciado_em'] else None,
+        'finishedAt': job['concluido_em'].isoformat() if job['concluido_em'] else None,
+        'done': job['status'] in (JOB_DONE, JOB_FAILED),
+    }
+
+
+@jobs_bp.route('/<int:job_id>', methods=['GET'])
+def get_job(job_id):
+    try:
+        if not g.db_cursor:
+             return jsonify({'message': 'Erro interno: Falha na conexão com a base de dados'}), 500
+
+        g.db_cursor.execute("SELECT * FROM import_jobs WHERE id = %s", (job_id,))
+        job = g.db_cursor.fetchone()
+        if not job:
+            return jsonify({'message': 'Job não encontrado'}), 404
+        return jsonify(_format_job(job))
+    except Exception as e:
+        current_app.logger.error(f"Erro ao buscar job {job_id}: {e}", exc_info=True)
+        return jsonify({'message': 'Erro ao buscar job'}), 500
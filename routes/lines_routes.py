@@ -5,29 +5,41 @@ from flask import Blueprint, jsonify, request, g, current_app # Adicionado g e c
 # Removido: from config.database import get_connection
 from .audit_helper import log_change
 from .decorators import require_permission # Adicionado import do decorador
-import csv
-import io
+from .cache import invalidate_after_commit
+from .pagination import ListingSpec, listing_response
+from .import_engine import ImportSpec, RowError, iter_csv_rows, run_import, validate_import, wants_dry_run
+from .import_jobs import submit_import_job, wants_background
+from .records_read_model import detach_line
 import json
 
 lines_bp = Blueprint('lines', __name__)
 
+LINE_LISTING = ListingSpec(
+    select="""
+        l.id, l.numero, l.operadora, l.plano, l.status,
+        a.imei1 AS imeiVinculado
+    """,
+    from_sql="FROM linhas l LEFT JOIN aparelhos a ON l.id = a.linha_id",
+    sortable={'id': 'l.id', 'numero': 'l.numero', 'operadora': 'l.operadora',
+              'plano': 'l.plano', 'status': 'l.status'},
+    filters={'status': ('l.status', 'eq'), 'operator': ('l.operadora', 'eq'),
+             'q': (['l.numero', 'l.operadora', 'l.plano'], 'like')},
+    default_sort='id',
+    id_column='l.id',
+)
+
 # GET /lines
 @lines_bp.route('/', methods=['GET'])
 def get_lines():
+    """
+    Lista linhas (filtros: status, operator, q; ordenação: sort/direction;
+    paginação: page/limit; streaming: stream=json|ndjson).
+    """
     try:
         if not g.db_cursor:
              return jsonify({'message': 'Erro interno: Falha na conexão com a base de dados'}), 500
              
-        sql = """
-            SELECT 
-                l.id, l.numero, l.operadora, l.plano, l.status,
-                a.imei1 AS imeiVinculado
-            FROM linhas l
-            LEFT JOIN aparelhos a ON l.id = a.linha_id
-        """
-        g.db_cursor.execute(sql)
-        lines = g.db_cursor.fetchall()
-        return jsonify(lines)
+        return listing_response(LINE_LISTING, g.db_cursor)
     except Exception as e:
         current_app.logger.error(f"Erro ao buscar linhas: {e}", exc_info=True)
         return jsonify({'message': 'Erro ao buscar linhas'}), 500
@@ -59,6 +71,7 @@ def add_line():
             (numero, operadora, plano, status)
         )
         g.db_conn.commit()
+        invalidate_after_commit('reports')
 
         log_change(
             user_id=user_id,
@@ -100,6 +113,7 @@ def update_line(line_id):
             (operadora, plano, status, line_id)
         )
         g.db_conn.commit()
+        invalidate_after_commit('reports')
 
         if g.db_cursor.rowcount == 0:
             return jsonify({'message': 'Linha não encontrada'}), 404
@@ -136,8 +150,10 @@ def delete_line(line_id):
         g.db_cursor.execute("SELECT numero FROM linhas WHERE id = %s", (line_id,))
         line_data = g.db_cursor.fetchone()
 
+        detach_line(g.db_cursor, line_id)
         g.db_cursor.execute("DELETE FROM linhas WHERE id = %s", (line_id,))
         g.db_conn.commit()
+        invalidate_after_commit('reports')
         
         if g.db_cursor.rowcount == 0:
             return jsonify({'message': 'Linha não encontrada'}), 404
@@ -176,6 +192,27 @@ def get_line_history(line_id):
     # Removido 'finally'
 
 
+VALID_LINE_STATUSES = ['Ativa', 'Inativa', 'Cancelada']
+
+def _parse_line_row(row):
+    numero, operadora, plano, status = row[0], row[1], row[2], row[3]
+
+    if not all([numero, operadora, status]):
+        raise RowError(f'Linha com dados obrigatórios em falta: {",".join(row)}')
+    if status not in VALID_LINE_STATUSES:
+        raise RowError(f'Linha {numero}: Status "{status}" inválido.')
+    return (numero, operadora, plano, status)
+
+LINE_IMPORT = ImportSpec(
+    table='linhas',
+    columns=('numero', 'operadora', 'plano', 'status'),
+    min_columns=4,
+    parse=_parse_line_row,
+    label=lambda row: f'Linha {row[0]}',
+    name='Linhas',
+    unique=[('numero', 'Linha')],
+)
+
 # POST /lines/import
 @lines_bp.route('/import', methods=['POST'])
 @require_permission('lines_import') # <-- CORREÇÃO DE SEGURANÇA
@@ -192,44 +229,32 @@ def import_lines():
     user_id = current_user.get('id')
     username = current_user.get('nome', 'Sistema')
 
+    # ?background=1: guarda o ficheiro, agenda o job e responde de imediato (202)
+    if wants_background(request) and not wants_dry_run(request):
+        try:
+            job_id = submit_import_job(LINE_IMPORT, file, user_id, username, target_resource='Line', invalidates=('reports',))
+            return jsonify({'message': 'Importação agendada.', 'jobId': job_id, 'statusUrl': f'/api/jobs/{job_id}'}), 202
+        except Exception as e:
+            current_app.logger.error(f"Erro ao agendar importação ({LINE_IMPORT.name}): {e}", exc_info=True)
+            return jsonify({'message': 'Erro ao agendar a importação.'}), 500
+
     try:
         if not g.db_cursor:
              return jsonify({'message': 'Erro interno: Falha na conexão com a base de dados'}), 500
         
-        stream = io.StringIO(file.stream.read().decode("UTF-8"), newline=None)
-        csv_reader = csv.reader(stream)
-        
-        next(csv_reader) # Pular o cabeçalho
-        
-        success_count = 0
-        skipped_count = 0
-        failed_entries = []
-
-        for row in csv_reader:
-            try:
-                if len(row) < 4:
-                    failed_entries.append(f'Linha com colunas insuficientes: {",".join(row)}')
-                    continue
-
-                numero, operadora, plano, status = row[0], row[1], row[2], row[3]
-
-                if not all([numero, operadora, status]):
-                    failed_entries.append(f'Linha com dados obrigatórios em falta: {",".join(row)}')
-                    continue
-                
-                g.db_cursor.execute(
-                    "INSERT IGNORE INTO linhas (numero, operadora, plano, status) VALUES (%s, %s, %s, %s)",
-                    (numero, operadora, plano, status)
-                )
-                if g.db_cursor.rowcount > 0:
-                    success_count += 1
-                else:
-                    skipped_count += 1
-            except Exception as e:
-                failed_entries.append(f'Linha {row[0]}: Erro inesperado.')
-                current_app.logger.warning(f"Erro na linha do CSV (Linhas): {row} -> {e}")
+        # Pré-passagem: validação e chaves repetidas/existentes, antes de gravar
+        report = validate_import(LINE_IMPORT, iter_csv_rows(file.stream), g.db_cursor)
+        if wants_dry_run(request):
+            return jsonify(report.to_dict(dry_run=True))
+
+        file.stream.seek(0)
+        result = run_import(LINE_IMPORT, iter_csv_rows(file.stream), g.db_cursor, report=report)
+        success_count = result.success_count
+        skipped_count = result.skipped_count
+        failed_entries = result.failed_entries
         
         g.db_conn.commit()
+        invalidate_after_commit('reports')
 
         log_change(
             user_id=user_id,
@@ -242,7 +267,8 @@ def import_lines():
 
         return jsonify({
             'message': f'{success_count} linhas importadas, {skipped_count} ignoradas.',
-            'failures': failed_entries
+            'failures': failed_entries,
+            'report': report.to_dict()
         }), 201
 
     except Exception as e:
@@ -5,28 +5,42 @@ from flask import Blueprint, jsonify, request, g, current_app
 from .audit_helper import log_change
 from datetime import datetime
 from .decorators import require_permission
+from .cache import invalidate_after_commit
+from .pagination import ListingSpec, listing_response
 
 maintenance_bp = Blueprint('maintenance', __name__)
 
+MAINTENANCE_LISTING = ListingSpec(
+    select="""
+        m.id, m.numero_os, m.aparelho_id,
+        a.modelo AS modelo, a.imei1,
+        m.data_envio, m.data_retorno, m.defeito_reportado,
+        m.servico_realizado, m.fornecedor, m.custo, m.status
+    """,
+    from_sql="FROM manutencoes m LEFT JOIN aparelhos a ON a.id = m.aparelho_id",
+    sortable={'id': 'm.id', 'data_envio': 'm.data_envio', 'data_retorno': 'm.data_retorno',
+              'status': 'm.status', 'fornecedor': 'm.fornecedor', 'custo': 'm.custo',
+              'modelo': 'a.modelo'},
+    filters={'status': ('m.status', 'eq'), 'supplier': ('m.fornecedor', 'eq'),
+             'aparelho_id': ('m.aparelho_id', 'eq'),
+             'date_from': ('m.data_envio', 'gte'), 'date_to': ('m.data_envio', 'lte'),
+             'q': (['m.numero_os', 'a.modelo', 'a.imei1'], 'like')},
+    default_sort='data_envio',
+    default_direction='desc',
+    id_column='m.id',
+)
+
 @maintenance_bp.route('/', methods=['GET'])
 def get_maintenances():
+    """
+    Lista manutenções (filtros: status, supplier, aparelho_id, date_from/date_to, q;
+    ordenação: sort/direction; paginação: page/limit; streaming: stream=json|ndjson).
+    """
     try:
         if not g.db_cursor:
              return jsonify({'message': 'Erro interno: Falha na conexão com a base de dados'}), 500
              
-        sql = """
-            SELECT 
-                m.id, m.numero_os, m.aparelho_id,
-                a.modelo AS modelo, a.imei1,
-                m.data_envio, m.data_retorno, m.defeito_reportado,
-                m.servico_realizado, m.fornecedor, m.custo, m.status
-            FROM manutencoes m
-            LEFT JOIN aparelhos a ON a.id = m.aparelho_id
-            ORDER BY m.data_envio DESC
-        """
-        g.db_cursor.execute(sql)
-        rows = g.db_cursor.fetchall()
-        return jsonify(rows)
+        return listing_response(MAINTENANCE_LISTING, g.db_cursor)
     except Exception as e:
         current_app.logger.error(f"Erro get_maintenances: {e}", exc_info=True)
         return jsonify({"message": "Erro ao listar manutenções"}), 500
@@ -38,7 +52,9 @@ def get_maintenance(maint_id):
              return jsonify({'message': 'Erro interno: Falha na conexão com a base de dados'}), 500
              
         g.db_cursor.execute(
-            "SELECT * FROM manutencoes WHERE id = %s", (maint_id,)
+            """SELECT m.*, a.modelo, a.imei1
+               FROM manutencoes m LEFT JOIN aparelhos a ON a.id = m.aparelho_id
+               WHERE m.id = %s""", (maint_id,)
         )
         record = g.db_cursor.fetchone()
         if not record:
@@ -83,6 +99,7 @@ def create_maintenance():
 
         g.db_cursor.execute("UPDATE aparelhos SET condicao = %s WHERE id = %s", ('Em manutenção', aparelho_id))
         g.db_conn.commit()
+        invalidate_after_commit('dashboard', 'reports')
 
         log_change(
             user_id=current_user.get('id'),
@@ -146,6 +163,7 @@ def update_maintenance(maint_id):
                 g.db_cursor.execute("UPDATE aparelhos SET condicao = %s WHERE id = %s", (post_condition, aparelho_id))
 
         g.db_conn.commit()
+        invalidate_after_commit('dashboard', 'reports')
 
         log_change(
             user_id=current_user.get('id'),
@@ -178,6 +196,7 @@ def delete_maintenance(maint_id):
 
         g.db_cursor.execute("DELETE FROM manutencoes WHERE id = %s", (maint_id,))
         g.db_conn.commit()
+        invalidate_after_commit('dashboard', 'reports')
 
         log_change(
             user_id=current_user.get('id'),
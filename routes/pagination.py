@@ -0,0 +1,175 @@
+# SMARTCONTROL/routes/pagination.py
+# Utilitários de paginação partilhados pelas rotas (cursor/keyset e limites).
+#
+# Listagens sem page/limit: continuam a devolver a lista completa, só por
+# compatibilidade com clientes antigos da API. A interface web não as usa (as
+# tabelas pedem páginas, os formulários usam /api/search). Para obter tudo, use
+# ?stream=json|ndjson ou /api/export, que não carregam as linhas em memória.
+
+from flask import request, jsonify
+from .streaming import stream_format, stream_query
+from datetime import date, datetime
+from decimal import Decimal
+import base64
+import json
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+
+def parse_limit(default=DEFAULT_LIMIT, maximum=MAX_LIMIT):
+    """Lê ?limit= da query string, sempre entre 1 e 'maximum'."""
+    limit = request.args.get('limit', default, type=int) or default
+    return max(1, min(limit, maximum))
+
+
+def _to_jsonable(value):
+    if isinstance(value, datetime):
+        return value.isoformat(sep=' ')
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def encode_cursor(values):
+    """Codifica os valores da chave de ordenação da última linha num token opaco."""
+    raw = json.dumps([_to_jsonable(v) for v in values], ensure_ascii=False)
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token, size):
+    """Descodifica um token criado por encode_cursor. Lança ValueError se for inválido."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+    except Exception:
+        raise ValueError('Cursor inválido')
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError('Cursor inválido')
+    return values
+
+
+def keyset_page(rows, limit, key_fields):
+    """
+    Recebe até limit+1 linhas (a consulta pede uma a mais para saber se há página seguinte)
+    e devolve (itens da página, próximo cursor ou None).
+    """
+    has_more = len(rows) > limit
+    items = rows[:limit]
+    next_cursor = None
+    if has_more and items:
+        last = items[-1]
+        next_cursor = encode_cursor([last[field] for field in key_fields])
+    return items, next_cursor
+
+
+def build_where(filters, args):
+    """
+    Constrói (cláusula WHERE, parâmetros) a partir da query string, com filtros no
+    formato de ListingSpec.filters. Partilhado pelas listagens e pelos relatórios.
+    """
+    clauses, params = [], []
+    for name, (expression, operator) in filters.items():
+        value = args.get(name)
+        if value is None or value == '':
+            continue
+        if operator == 'eq':
+            values = [v for v in value.split(',') if v != '']
+            if len(values) == 1:
+                clauses.append(f"{expression} = %s")
+            else:
+                clauses.append(f"{expression} IN ({','.join(['%s'] * len(values))})")
+            params.extend(values)
+        elif operator == 'gte':
+            clauses.append(f"{expression} >= %s"); params.append(value)
+        elif operator == 'lte':
+            clauses.append(f"{expression} <= %s"); params.append(value)
+        elif operator == 'like':
+            columns = expression if isinstance(expression, (list, tuple)) else [expression]
+            clauses.append('(' + ' OR '.join(f"{column} LIKE %s" for column in columns) + ')')
+            params.extend([f"%{value}%"] * len(columns))
+    return ('WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+
+class ListingSpec:
+    """
+    Descreve uma listagem paginável de um blueprint:
+    - select: lista de colunas do SELECT (com aliases da resposta);
+    - from_sql: FROM + JOINs;
+    - sortable: {nome na API: expressão SQL} (só estes podem ser usados em ?sort=);
+    - filters: {parâmetro: (expressão SQL, operador)} com operador em
+      'eq' (aceita vários valores separados por vírgula), 'gte', 'lte' ou
+      'like' (expressão pode ser uma lista de colunas, pesquisadas com OR);
+    - default_sort / default_direction: ordenação quando ?sort= não vem;
+    - id_column: desempate da ordenação, para páginas estáveis.
+    """
+
+    def __init__(self, select, from_sql, sortable, filters, default_sort,
+                 default_direction='asc', id_column='id'):
+        self.select = select
+        self.from_sql = from_sql
+        self.sortable = sortable
+        self.filters = filters
+        self.default_sort = default_sort
+        self.default_direction = default_direction
+        self.id_column = id_column
+
+    def where(self, args):
+        """Constrói (cláusula WHERE, parâmetros) a partir dos filtros da query string."""
+        return build_where(self.filters, args)
+
+    def order_by(self, args):
+        sort = args.get('sort', self.default_sort)
+        if sort not in self.sortable:
+            sort = self.default_sort
+        direction = args.get('direction', self.default_direction).lower()
+        if direction not in ('asc', 'desc'):
+            direction = self.default_direction
+        return f"ORDER BY {self.sortable[sort]} {direction}, {self.id_column} {direction}", sort, direction
+
+
+def wants_page():
+    """As listagens devolvem o envelope paginado quando o cliente pede page ou limit."""
+    return 'page' in request.args or 'limit' in request.args
+
+
+def run_listing(spec, cursor, transform=None, default_limit=DEFAULT_LIMIT):
+    """
+    Executa a listagem descrita por 'spec' com os filtros/ordenação da query string.
+    Com page/limit devolve o envelope {items, total, page, limit, sort, direction};
+    sem eles devolve a lista completa (só para clientes antigos; ver o topo do ficheiro).
+    """
+    where_sql, params = spec.where(request.args)
+    order_sql, sort, direction = spec.order_by(request.args)
+    sql = f"SELECT {spec.select} {spec.from_sql} {where_sql} {order_sql}"
+
+    if not wants_page():
+        cursor.execute(sql, tuple(params))
+        rows = cursor.fetchall()
+        return [transform(row) for row in rows] if transform else rows
+
+    limit = parse_limit(default_limit)
+    page = max(1, request.args.get('page', 1, type=int) or 1)
+    cursor.execute(sql + " LIMIT %s OFFSET %s", tuple(params + [limit, (page - 1) * limit]))
+    rows = cursor.fetchall()
+    items = [transform(row) for row in rows] if transform else rows
+
+    cursor.execute(f"SELECT COUNT(*) AS total {spec.from_sql} {where_sql}", tuple(params))
+    total = cursor.fetchone()['total']
+    return {'items': items, 'total': total, 'page': page, 'limit': limit, 'sort': sort, 'direction': direction}
+
+
+def listing_response(spec, cursor, transform=None, default_limit=DEFAULT_LIMIT):
+    """
+    Resposta HTTP de uma listagem: com ?stream=json|ndjson devolve todas as linhas
+    filtradas/ordenadas em streaming; senão o mesmo que jsonify(run_listing(...)).
+    """
+    fmt = stream_format()
+    if fmt:
+        where_sql, params = spec.where(request.args)
+        order_sql, _, _ = spec.order_by(request.args)
+        return stream_query(f"SELECT {spec.select} {spec.from_sql} {where_sql} {order_sql}",
+                            params, fmt, transform)
+    return jsonify(run_listing(spec, cursor, transform, default_limit))
@@ -0,0 +1,113 @@
+# SMARTCONTROL/routes/records_read_model.py
+# Modelo de leitura dos termos (tabela registros_leitura, migração V008).
+#
+# Cada linha é uma cópia de registros + nome/matrícula do funcionário + modelo/IMEI
+# do aparelho + número da linha, para que a listagem de termos (ordenação por
+# employeeName/deviceModel, filtros, exportação) leia uma única tabela indexada
+# em vez de juntar quatro.
+#
+# As escritas mantêm-no na mesma transação:
+# - termos: sync_record (INSERT ... SELECT ... ON DUPLICATE KEY UPDATE); a exclusão
+#   é feita pela FK com ON DELETE CASCADE;
+# - funcionários, aparelhos e linhas: sync_employee / sync_device / detach_line,
+#   chamadas ANTES da escrita principal (as rotas verificam o rowcount dessa escrita);
+# - sincronização de funcionários em massa: sync_employee_names.
+# 'flask records-rebuild' (rebuild) reconstrói tudo se a cópia se desviar.
+#
+# RECORDS_READ_MODEL=0 volta a ler com os JOINs (a tabela continua a ser mantida).
+
+import logging
+import os
+
+logger = logging.getLogger('flask.app')
+
+RECORDS_READ_MODEL = os.environ.get('RECORDS_READ_MODEL', '1').lower() in ('1', 'true', 'yes')
+RECORDS_REBUILD_CHUNK = int(os.environ.get('RECORDS_REBUILD_CHUNK', 5000))
+
+_UPSERT_SQL = """
+    INSERT INTO registros_leitura (
+        id, data_entrega, data_devolucao, status, termo_entrega_url, termo_devolucao_url, bo_url,
+        funcionario_id, funcionario_nome, funcionario_matricula,
+        aparelho_id, aparelho_modelo, aparelho_imei1, linha_id, linha_numero
+    )
+    SELECT
+        r.id, r.data_entrega, r.data_devolucao, r.status, r.termo_entrega_url, r.termo_devolucao_url, r.bo_url,
+        f.id, f.nome, f.matricula,
+        a.id, a.modelo, a.imei1, l.id, l.numero
+    FROM registros r
+    JOIN funcionarios f ON r.funcionario_id = f.id
+    JOIN aparelhos a ON r.aparelho_id = a.id
+    LEFT JOIN linhas l ON a.linha_id = l.id
+    {where}
+    ON DUPLICATE KEY UPDATE
+        data_entrega = VALUES(data_entrega), data_devolucao = VALUES(data_devolucao),
+        status = VALUES(status), termo_entrega_url = VALUES(termo_entrega_url),
+        termo_devolucao_url = VALUES(termo_devolucao_url), bo_url = VALUES(bo_url),
+        funcionario_id = VALUES(funcionario_id), funcionario_nome = VALUES(funcionario_nome),
+        funcionario_matricula = VALUES(funcionario_matricula),
+        aparelho_id = VALUES(aparelho_id), aparelho_modelo = VALUES(aparelho_modelo),
+        aparelho_imei1 = VALUES(aparelho_imei1), linha_id = VALUES(linha_id), linha_numero = VALUES(linha_numero)
+"""
+
+
+def sync_record(cursor, record_id):
+    """Insere ou atualiza a cópia de um termo (depois de o criar ou alterar)."""
+    cursor.execute(_UPSERT_SQL.format(where="WHERE r.id = %s"), (record_id,))
+
+
+def sync_employee(cursor, employee_id, nome, matricula):
+    """Novo nome/matrícula de um funcionário nos seus termos."""
+    cursor.execute(
+        "UPDATE registros_leitura SET funcionario_nome = %s, funcionario_matricula = %s WHERE funcionario_id = %s",
+        (nome, matricula, employee_id)
+    )
+
+
+def sync_employee_names(cursor):
+    """Depois de uma sincronização em massa: corrige só os termos cujo funcionário mudou."""
+    cursor.execute("""
+        UPDATE registros_leitura rl
+        JOIN funcionarios f ON f.id = rl.funcionario_id
+        SET rl.funcionario_nome = f.nome, rl.funcionario_matricula = f.matricula
+        WHERE rl.funcionario_nome <> f.nome OR rl.funcionario_matricula <> f.matricula
+    """)
+
+
+def sync_device(cursor, device_id, modelo, linha_id):
+    """Novo modelo/linha de um aparelho nos seus termos (o número vem da tabela linhas)."""
+    cursor.execute("""
+        UPDATE registros_leitura rl
+        LEFT JOIN linhas l ON l.id = %s
+        SET rl.aparelho_modelo = %s, rl.linha_id = l.id, rl.linha_numero = l.numero
+        WHERE rl.aparelho_id = %s
+    """, (linha_id, modelo, device_id))
+
+
+def detach_line(cursor, line_id):
+    """A linha vai ser excluída (aparelhos.linha_id fica NULL pela FK)."""
+    cursor.execute("UPDATE registros_leitura SET linha_id = NULL, linha_numero = NULL WHERE linha_id = %s", (line_id,))
+
+
+def rebuild(conn, chunk=RECORDS_REBUILD_CHUNK, log=None):
+    """
+    Reconstrói registros_leitura a partir das tabelas de origem, por intervalos de
+    ids (um commit por intervalo, sem bloquear a tabela inteira). Devolve o número
+    de termos processados.
+    """
+    log = log or logger.info
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute("SELECT COALESCE(MIN(id), 0) AS first_id, COALESCE(MAX(id), 0) AS last_id, COUNT(*) AS total FROM registros")
+        bounds = cursor.fetchone()
+        start = bounds['first_id']
+        while bounds['total'] and start <= bounds['last_id']:
+            cursor.execute(_UPSERT_SQL.format(where="WHERE r.id BETWEEN %s AND %s"), (start, start + chunk - 1))
+            conn.commit()
+            log(f"registros_leitura: termos {start}-{min(start + chunk - 1, bounds['last_id'])} reconstruídos.")
+            start += chunk
+        return bounds['total']
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
@@ -2,73 +2,196 @@ from flask import Blueprint, jsonify, request, g, current_app
 import json
 from .audit_helper import log_change
 from .decorators import require_permission # Importe o decorador
+from .cache import get_cache, invalidate_after_commit
+from .pagination import ListingSpec, decode_cursor, keyset_page
+from .streaming import stream_format, stream_query
+from .records_read_model import RECORDS_READ_MODEL, sync_record
 
 records_bp = Blueprint('records', __name__)
 
-# Rota GET para listar todos os registos (sem alterações)
+# Origem das listagens: o modelo de leitura (uma tabela, ver records_read_model.py)
+# ou os JOINs com funcionarios/aparelhos/linhas. Em ambos os casos o termo é 'r'.
+if RECORDS_READ_MODEL:
+    RECORDS_FROM_SQL = "FROM registros_leitura r"
+    # Nome na resposta -> expressão SQL dos dados do funcionário/aparelho/linha
+    PARTY_COLUMNS = {
+        'employeeName': 'r.funcionario_nome',
+        'employeeMatricula': 'r.funcionario_matricula',
+        'deviceModel': 'r.aparelho_modelo',
+        'deviceImei': 'r.aparelho_imei1',
+        'deviceLine': 'r.linha_numero',
+    }
+else:
+    RECORDS_FROM_SQL = """
+        FROM registros r
+        JOIN funcionarios f ON r.funcionario_id = f.id
+        JOIN aparelhos a ON r.aparelho_id = a.id
+        LEFT JOIN linhas l ON a.linha_id = l.id
+    """
+    PARTY_COLUMNS = {
+        'employeeName': 'f.nome',
+        'employeeMatricula': 'f.matricula',
+        'deviceModel': 'a.modelo',
+        'deviceImei': 'a.imei1',
+        'deviceLine': 'l.numero',
+    }
+PARTY_SELECT = ', '.join(f"{expression} AS {name}" for name, expression in PARTY_COLUMNS.items())
+
+# Colunas ordenáveis: nome na resposta -> expressão SQL.
+# Todas são colunas guardadas, para que o ORDER BY e o predicado keyset usem o índice.
+SORTABLE_COLUMNS = {
+    'employeeName': PARTY_COLUMNS['employeeName'],
+    'deviceModel': PARTY_COLUMNS['deviceModel'],
+    'deliveryDate': 'r.data_entrega',
+    'status': 'r.status'
+}
+
+# status é um ENUM: o ORDER BY segue a ordem da definição ('Em Uso' antes de 'Devolvido'),
+# mas status < 'x' compararia strings. O keyset usa esta ordem (ver _keyset_after).
+RECORD_STATUSES = ('Em Uso', 'Devolvido')
+
+
+def _keyset_after(column, sort_column, direction, last_value, last_id):
+    """
+    Predicado "depois da última linha vista" como col < v OR (col = v AND id < i),
+    que o MySQL resolve com um range scan no índice (col, id). Para o status, a parte
+    "col < v" é a lista dos valores que vêm antes/depois de v na ordem do ENUM.
+    """
+    operator = '<' if direction == 'desc' else '>'
+    tie = f"({column} = %s AND r.id {operator} %s)"
+    if sort_column != 'status':
+        return f"({column} {operator} %s OR {tie})", [last_value, last_value, last_id]
+    if last_value not in RECORD_STATUSES:
+        raise ValueError('Cursor inválido')
+    position = RECORD_STATUSES.index(last_value)
+    after = RECORD_STATUSES[:position] if direction == 'desc' else RECORD_STATUSES[position + 1:]
+    if not after:
+        return tie, [last_value, last_id]
+    placeholders = ', '.join(['%s'] * len(after))
+    return f"({column} IN ({placeholders}) OR {tie})", [*after, last_value, last_id]
+
+# Mesmas colunas do listing, no formato ListingSpec (usado pelas exportações)
+RECORD_LISTING = ListingSpec(
+    select=f"""
+        r.id, r.data_entrega AS deliveryDate, r.data_devolucao AS returnDate, r.status,
+        {PARTY_SELECT}
+    """,
+    from_sql=RECORDS_FROM_SQL,
+    sortable=SORTABLE_COLUMNS,
+    filters={'status': ('r.status', 'eq'), 'matricula': (PARTY_COLUMNS['employeeMatricula'], 'eq'),
+             'date_from': ('r.data_entrega', 'gte'), 'date_to': ('r.data_entrega', 'lte'),
+             'q': ([PARTY_COLUMNS[name] for name in ('employeeName', 'employeeMatricula', 'deviceModel', 'deviceImei')],
+                   'like')},
+    default_sort='deliveryDate',
+    default_direction='desc',
+    id_column='r.id',
+)
+
+
+def _count_records(filter_status):
+    """
+    Total de registos para o filtro. As junções do listing são todas obrigatórias (FKs),
+    por isso basta contar em 'registros'. O resultado fica em cache até à próxima escrita.
+    """
+    def compute():
+        if filter_status != 'Todos':
+            g.db_cursor.execute("SELECT COUNT(*) AS total FROM registros WHERE status = %s", (filter_status,))
+        else:
+            g.db_cursor.execute("SELECT COUNT(*) AS total FROM registros")
+        return g.db_cursor.fetchone()['total']
+    return get_cache('records_count').get_or_compute(filter_status, compute)
+
+
+# Rota GET para listar todos os registos
 @records_bp.route('/', methods=['GET'])
 def get_records():
+    """
+    Lista paginada de termos. Dois modos:
+    - page/limit (OFFSET), como sempre;
+    - ?cursor= (keyset pela coluna de ordenação + id): passe cursor vazio na primeira
+      página e depois o 'nextCursor' devolvido. A página N custa o mesmo que a página 1.
+    O 'total' vem de uma contagem em cache, invalidada pelas escritas de termos.
+    Com ?stream=json|ndjson devolve todos os termos do filtro em streaming.
+    """
     try:
         page = request.args.get('page', 1, type=int)
         limit = request.args.get('limit', 10, type=int)
         filter_status = request.args.get('filter', 'Todos', type=str)
         sort_column = request.args.get('sort_column', 'deliveryDate', type=str)
         sort_direction = request.args.get('sort_direction', 'desc', type=str)
+        cursor_token = request.args.get('cursor')
 
         if not g.db_cursor:
              return jsonify({'message': 'Erro interno: Falha na conexão com a base de dados'}), 500
         
         offset = (page - 1) * limit
 
-        base_sql = """
-            FROM registros r
-            JOIN funcionarios f ON r.funcionario_id = f.id
-            JOIN aparelhos a ON r.aparelho_id = a.id
-            LEFT JOIN linhas l ON a.linha_id = l.id
-        """
+        base_sql = RECORDS_FROM_SQL
         where_clause = "WHERE 1=1"
         params = []
         if filter_status != 'Todos':
             where_clause += " AND r.status = %s"
             params.append(filter_status)
 
-        sortable_columns = {
-            'employeeName': 'f.nome',
-            'deviceModel': 'a.modelo',
-            'deliveryDate': 'r.data_entrega',
-            'status': 'r.status'
-        }
-        db_sort_column = sortable_columns.get(sort_column, 'r.data_entrega')
+        if sort_column not in SORTABLE_COLUMNS:
+            sort_column = 'deliveryDate'
+        db_sort_column = SORTABLE_COLUMNS[sort_column]
         
         if sort_direction.lower() not in ['asc', 'desc']:
             sort_direction = 'desc'
 
+        fmt = stream_format()
+        if fmt:
+            # Todos os termos do filtro, em streaming (ignora page/limit/cursor)
+            return stream_query(f"""
+                SELECT
+                    r.id, r.data_entrega AS deliveryDate, r.status,
+                    r.termo_entrega_url, r.termo_devolucao_url, r.bo_url,
+                    {PARTY_SELECT}
+                {base_sql}
+                {where_clause}
+                ORDER BY {db_sort_column} {sort_direction}, r.id {sort_direction}
+            """, params, fmt)
+
+        page_params = []
+        if cursor_token is not None:
+            # Modo keyset: (coluna, id) estritamente depois da última linha vista
+            if cursor_token:
+                last_value, last_id = decode_cursor(cursor_token, 2)
+                predicate, predicate_params = _keyset_after(db_sort_column, sort_column, sort_direction.lower(),
+                                                            last_value, last_id)
+                where_clause += f" AND {predicate}"
+                params.extend(predicate_params)
+            limit_clause = "LIMIT %s"
+            page_params = [limit + 1]
+        else:
+            limit_clause = "LIMIT %s OFFSET %s"
+            page_params = [limit, offset]
+
         sql = f"""
             SELECT
                 r.id, r.data_entrega AS deliveryDate, r.status,
                 r.termo_entrega_url, r.termo_devolucao_url, r.bo_url,
-                f.nome AS employeeName, f.matricula AS employeeMatricula,
-                a.modelo AS deviceModel, a.imei1 AS deviceImei,
-                l.numero AS deviceLine
+                {PARTY_SELECT}
             {base_sql}
             {where_clause}
-            ORDER BY {db_sort_column} {sort_direction}
-            LIMIT %s OFFSET %s
+            ORDER BY {db_sort_column} {sort_direction}, r.id {sort_direction}
+            {limit_clause}
         """
         
-        final_params = params + [limit, offset]
+        final_params = params + page_params
         g.db_cursor.execute(sql, tuple(final_params))
         records = g.db_cursor.fetchall()
 
-        count_sql = f"SELECT COUNT(r.id) as total {base_sql} {where_clause}"
-        g.db_cursor.execute(count_sql, tuple(params))
-        total_records = g.db_cursor.fetchone()['total']
+        response = {'total': _count_records(filter_status)}
+        if cursor_token is not None:
+            records, response['nextCursor'] = keyset_page(records, limit, (sort_column, 'id'))
+        response['records'] = records
 
-        return jsonify({
-            'total': total_records,
-            'records': records
-        })
+        return jsonify(response)
 
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
         current_app.logger.error(f"Erro ao buscar registros: {e}", exc_info=True)
         return jsonify({'message': 'Erro ao buscar registros'}), 500
@@ -83,14 +206,25 @@ def get_record_by_id(record_id):
         if not g.db_cursor:
              return jsonify({'message': 'Erro interno: Falha na conexão com a base de dados'}), 500
              
-        sql = """SELECT r.*, f.matricula AS employeeMatricula, a.imei1 AS deviceImei,
-                   a.modelo AS deviceModel, l.numero AS deviceLine
-            FROM registros r
-            JOIN funcionarios f ON r.funcionario_id = f.id
-            JOIN aparelhos a ON r.aparelho_id = a.id
-            LEFT JOIN linhas l ON a.linha_id = l.id
-            WHERE r.id = %s
-        """
+        if RECORDS_READ_MODEL:
+            sql = """SELECT r.*, rl.funcionario_nome AS employeeName, rl.funcionario_matricula AS employeeMatricula,
+                       f.cargo AS employeePosition, rl.aparelho_imei1 AS deviceImei,
+                       rl.aparelho_modelo AS deviceModel, rl.linha_numero AS deviceLine
+                FROM registros r
+                JOIN registros_leitura rl ON rl.id = r.id
+                JOIN funcionarios f ON f.id = r.funcionario_id
+                WHERE r.id = %s
+            """
+        else:
+            sql = """SELECT r.*, f.nome AS employeeName, f.matricula AS employeeMatricula,
+                       f.cargo AS employeePosition, a.imei1 AS deviceImei,
+                       a.modelo AS deviceModel, l.numero AS deviceLine
+                FROM registros r
+                JOIN funcionarios f ON r.funcionario_id = f.id
+                JOIN aparelhos a ON r.aparelho_id = a.id
+                LEFT JOIN linhas l ON a.linha_id = l.id
+                WHERE r.id = %s
+            """
         g.db_cursor.execute(sql, (record_id, ))
         record = g.db_cursor.fetchone()
         if not record:
@@ -153,7 +287,13 @@ def update_record(record_id):
             g.db_conn.rollback()
             return jsonify({'message': 'Registro não encontrado ou nenhum dado alterado'}), 404
 
+        if data_devolucao:
+            # Devolução: o aparelho fica disponível (na mesma transação da atualização do termo)
+            g.db_cursor.execute("UPDATE aparelhos SET registro_atual_id = NULL WHERE registro_atual_id = %s", (record_id,))
+        sync_record(g.db_cursor, record_id)
+
         g.db_conn.commit()
+        invalidate_after_commit('dashboard', 'records_count', 'reports')
 
         log_change(
             user_id=user_id, username=username, action_type='UPDATE', target_resource='Record',
@@ -190,19 +330,17 @@ def create_record():
         if not g.db_cursor:
              return jsonify({'message': 'Erro interno: Falha na conexão com a base de dados'}), 500
 
-        g.db_cursor.execute("SELECT id, modelo FROM aparelhos WHERE imei1 = %s", (imei,))
+        # FOR UPDATE: duas entregas simultâneas do mesmo aparelho ficam em fila nesta linha
+        g.db_cursor.execute(
+            "SELECT id, modelo, registro_atual_id FROM aparelhos WHERE imei1 = %s FOR UPDATE", (imei,)
+        )
         aparelho = g.db_cursor.fetchone()
         if not aparelho:
             return jsonify({'message': 'Aparelho não encontrado'}), 404
         aparelho_id = aparelho['id']
 
-        g.db_cursor.execute(
-            "SELECT id FROM registros WHERE aparelho_id = %s AND status = 'Em Uso'",
-            (aparelho_id,)
-        )
-        existing_record = g.db_cursor.fetchone()
-        if existing_record:
-            return jsonify({'message': f'Este aparelho já está associado ao termo Nº {existing_record["id"]}.'}), 409
+        if aparelho['registro_atual_id']:
+            return jsonify({'message': f'Este aparelho já está associado ao termo Nº {aparelho["registro_atual_id"]}.'}), 409
 
         g.db_cursor.execute("SELECT id, nome, cargo FROM funcionarios WHERE matricula = %s", (matricula,))
         func = g.db_cursor.fetchone()
@@ -215,7 +353,16 @@ def create_record():
             (funcionario_id, aparelho_id, data.get('deliveryDate'), data.get('deliveryCondition'), data.get('deliveryNotes'), json.dumps(data.get('accessories', [])), termo_entrega_url, delivery_checker)
         )
         new_record_id = g.db_cursor.lastrowid
+        g.db_cursor.execute(
+            "UPDATE aparelhos SET registro_atual_id = %s WHERE id = %s AND registro_atual_id IS NULL",
+            (new_record_id, aparelho_id)
+        )
+        if g.db_cursor.rowcount == 0:
+            g.db_conn.rollback()
+            return jsonify({'message': 'Este aparelho já está associado a outro termo.'}), 409
+        sync_record(g.db_cursor, new_record_id)
         g.db_conn.commit()
+        invalidate_after_commit('dashboard', 'records_count', 'reports')
 
         log_change(
             user_id=user_id, username=username, action_type='CREATE', target_resource='Record',
@@ -236,6 +383,9 @@ def create_record():
         return jsonify({'message': 'Termo criado com sucesso', 'newRecord': new_record_object}), 201
     except Exception as e:
         if g.db_conn: g.db_conn.rollback()
+        # uq_registros_aparelho_em_uso: o aparelho já tem um termo "Em Uso"
+        if 'Duplicate entry' in str(e):
+            return jsonify({'message': 'Este aparelho já está associado a outro termo.'}), 409
         current_app.logger.error(f"Erro ao criar registro: {e}", exc_info=True)
         return jsonify({'message': 'Erro ao criar registro'}), 500
 
@@ -254,6 +404,7 @@ def delete_record(record_id):
 
         g.db_cursor.execute("DELETE FROM registros WHERE id = %s", (record_id,))
         g.db_conn.commit()
+        invalidate_after_commit('dashboard', 'records_count', 'reports')
 
         if g.db_cursor.rowcount == 0:
             return jsonify({'message': 'Registro não encontrado'}), 404
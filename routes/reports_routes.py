@@ -0,0 +1,190 @@
+# SMARTCONTROL/routes/reports_routes.py
+# Relatórios agregados no servidor: os números dos relatórios (em uso, disponíveis,
+# linhas ativas/vinculadas, custo de manutenção...) são calculados em SQL com
+# GROUP BY, em vez de o browser descarregar todas as tabelas e somar em JavaScript.
+#
+# Os resultados ficam na cache 'reports' (routes/cache.py) por combinação de
+# parâmetros, até à próxima escrita em aparelhos, linhas, manutenções ou termos.
+
+from flask import Blueprint, jsonify, request, g, current_app
+from decimal import Decimal
+from .cache import get_cache
+from .dashboard_routes import UNAVAILABLE_CONDITIONS
+from .pagination import build_where
+
+reports_bp = Blueprint('reports', __name__)
+
+_UNAVAILABLE_SQL = ', '.join(f"'{condition}'" for condition in UNAVAILABLE_CONDITIONS)
+# aparelhos.registro_atual_id aponta para o termo "Em Uso" (mantido por records_routes)
+_DEVICE_IN_USE_SQL = "a.registro_atual_id IS NOT NULL"
+
+
+class ReportSpec:
+    """
+    Um relatório agregado:
+    - from_sql: FROM + JOINs;
+    - dimensions: {nome em ?group_by=: expressão SQL};
+    - metrics: {nome na resposta: expressão de agregação};
+    - filters: no formato de ListingSpec.filters;
+    - summable: métricas que podem ser somadas para a linha de totais.
+    """
+
+    def __init__(self, from_sql, dimensions, metrics, filters, summable):
+        self.from_sql = from_sql
+        self.dimensions = dimensions
+        self.metrics = metrics
+        self.filters = filters
+        self.summable = summable
+
+
+REPORTS = {
+    'devices': ReportSpec(
+        from_sql="FROM aparelhos a LEFT JOIN linhas l ON a.linha_id = l.id",
+        dimensions={'model': 'a.modelo', 'condition': 'a.condicao', 'operator': 'l.operadora'},
+        metrics={
+            'total': 'COUNT(*)',
+            'inUse': f'SUM({_DEVICE_IN_USE_SQL})',
+            'unavailable': f'SUM(a.condicao IN ({_UNAVAILABLE_SQL}) AND a.registro_atual_id IS NULL)',
+        },
+        filters={'condition': ('a.condicao', 'eq'), 'operator': ('l.operadora', 'eq'), 'model': ('a.modelo', 'eq')},
+        summable=('total', 'inUse', 'unavailable'),
+    ),
+    'lines': ReportSpec(
+        from_sql="FROM linhas l",
+        dimensions={'operator': 'l.operadora', 'status': 'l.status', 'plan': 'l.plano'},
+        metrics={
+            'total': 'COUNT(*)',
+            'active': "SUM(l.status = 'Ativa')",
+            'linked': 'SUM(EXISTS (SELECT 1 FROM aparelhos a WHERE a.linha_id = l.id))',
+        },
+        filters={'operator': ('l.operadora', 'eq'), 'status': ('l.status', 'eq')},
+        summable=('total', 'active', 'linked'),
+    ),
+    'maintenance': ReportSpec(
+        from_sql="FROM manutencoes m LEFT JOIN aparelhos a ON a.id = m.aparelho_id",
+        dimensions={'supplier': 'm.fornecedor', 'status': 'm.status', 'model': 'a.modelo',
+                    'month': "DATE_FORMAT(m.data_envio, '%Y-%m')"},
+        metrics={
+            'total': 'COUNT(*)',
+            'open': "SUM(m.status = 'Em manutenção')",
+            'totalCost': 'COALESCE(SUM(m.custo), 0)',
+            'averageCost': 'AVG(m.custo)',
+        },
+        filters={'status': ('m.status', 'eq'), 'supplier': ('m.fornecedor', 'eq'),
+                 'date_from': ('m.data_envio', 'gte'), 'date_to': ('m.data_envio', 'lte')},
+        summable=('total', 'open', 'totalCost'),
+    ),
+    'records': ReportSpec(
+        from_sql="FROM registros r JOIN aparelhos a ON r.aparelho_id = a.id",
+        dimensions={'month': "DATE_FORMAT(r.data_entrega, '%Y-%m')", 'status': 'r.status', 'model': 'a.modelo'},
+        metrics={
+            'total': 'COUNT(*)',
+            'inUse': "SUM(r.status = 'Em Uso')",
+            'returned': "SUM(r.status = 'Devolvido')",
+        },
+        filters={'status': ('r.status', 'eq'), 'date_from': ('r.data_entrega', 'gte'),
+                 'date_to': ('r.data_entrega', 'lte')},
+        summable=('total', 'inUse', 'returned'),
+    ),
+}
+
+# Os números dos cabeçalhos dos relatórios impressos, numa só consulta
+SUMMARY_SQL = f"""
+    SELECT
+        (SELECT COUNT(*) FROM registros) AS records_total,
+        (SELECT COUNT(*) FROM registros WHERE status = 'Em Uso') AS records_in_use,
+        (SELECT COUNT(*) FROM aparelhos) AS devices_total,
+        (SELECT COUNT(*) FROM aparelhos a WHERE {_DEVICE_IN_USE_SQL}) AS devices_in_use,
+        (SELECT COUNT(*) FROM aparelhos a
+         WHERE a.condicao IN ({_UNAVAILABLE_SQL}) AND a.registro_atual_id IS NULL) AS devices_unavailable,
+        (SELECT COUNT(*) FROM linhas) AS lines_total,
+        (SELECT COUNT(*) FROM linhas WHERE status = 'Ativa') AS lines_active,
+        (SELECT COUNT(DISTINCT linha_id) FROM aparelhos WHERE linha_id IS NOT NULL) AS lines_linked,
+        (SELECT COUNT(*) FROM manutencoes) AS maintenance_total,
+        (SELECT COUNT(*) FROM manutencoes WHERE status = 'Em manutenção') AS maintenance_open,
+        (SELECT COALESCE(SUM(custo), 0) FROM manutencoes) AS maintenance_cost
+"""
+
+
+def _number(value):
+    """SUM/AVG do MySQL vêm como Decimal: inteiros ficam int, o resto float."""
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    return value
+
+
+def _cache_key(name):
+    return (name,) + tuple(sorted(request.args.items()))
+
+
+def _compute_report(spec, group_by):
+    where_sql, params = build_where(spec.filters, request.args)
+    keys = [(name, spec.dimensions[name]) for name in group_by]
+    select = ', '.join([f"{expression} AS `{name}`" for name, expression in keys]
+                       + [f"{expression} AS `{name}`" for name, expression in spec.metrics.items()])
+    group_sql = ', '.join(expression for _, expression in keys)
+    g.db_cursor.execute(
+        f"SELECT {select} {spec.from_sql} {where_sql} GROUP BY {group_sql} ORDER BY {group_sql}",
+        tuple(params)
+    )
+    rows = [{key: _number(value) for key, value in row.items()} for row in g.db_cursor.fetchall()]
+    totals = {metric: sum(row[metric] or 0 for row in rows) for metric in spec.summable}
+    return {'groupBy': group_by, 'rows': rows, 'totals': totals}
+
+
+def _compute_summary():
+    g.db_cursor.execute(SUMMARY_SQL)
+    row = {key: _number(value) for key, value in g.db_cursor.fetchone().items()}
+    return {
+        'records': {'total': row['records_total'], 'inUse': row['records_in_use']},
+        'devices': {
+            'total': row['devices_total'],
+            'inUse': row['devices_in_use'],
+            'unavailable': row['devices_unavailable'],
+            'available': row['devices_total'] - row['devices_in_use'] - row['devices_unavailable'],
+        },
+        'lines': {'total': row['lines_total'], 'active': row['lines_active'], 'linked': row['lines_linked']},
+        'maintenance': {
+            'total': row['maintenance_total'],
+            'open': row['maintenance_open'],
+            'totalCost': row['maintenance_cost'],
+        },
+    }
+
+
+@reports_bp.route('/summary', methods=['GET'])
+def get_reports_summary():
+    """Totais usados nos cabeçalhos dos relatórios (aparelhos, linhas, manutenções, termos)."""
+    try:
+        if not g.db_cursor:
+             return jsonify({'message': 'Erro interno: Falha na conexão com a base de dados'}), 500
+        return jsonify(get_cache('reports').get_or_compute(('summary',), _compute_summary))
+    except Exception as e:
+        current_app.logger.error(f"Erro ao calcular o resumo dos relatórios: {e}", exc_info=True)
+        return jsonify({'message': 'Erro ao calcular o resumo dos relatórios'}), 500
+
+
+@reports_bp.route('/<string:name>', methods=['GET'])
+def get_report(name):
+    """
+    Relatório agregado de devices, lines, maintenance ou records.
+    ?group_by= uma ou mais dimensões separadas por vírgula
+    (ex: /api/reports/maintenance?group_by=month,supplier&date_from=2026-01-01).
+    """
+    spec = REPORTS.get(name)
+    if spec is None:
+        return jsonify({'message': 'Relatório desconhecido'}), 404
+
+    group_by = [d for d in request.args.get('group_by', next(iter(spec.dimensions))).split(',') if d]
+    invalid = [d for d in group_by if d not in spec.dimensions]
+    if invalid or not group_by:
+        return jsonify({'message': f"group_by inválido. Use: {', '.join(spec.dimensions)}"}), 400
+
+    try:
+        if not g.db_cursor:
+             return jsonify({'message': 'Erro interno: Falha na conexão com a base de dados'}), 500
+        report = get_cache('reports').get_or_compute(_cache_key(name), lambda: _compute_report(spec, group_by))
+        return jsonify({'report': name, **report})
+    except Exception as e:
+        current_app.logger.error(f"Erro ao calcular o relatório {name}: {e}", exc_info=True)
+        return jsonify({'message': 'Erro ao calcular o relatório'}), 500
@@ -0,0 +1,144 @@
+# SMARTCONTROL/routes/search_routes.py
+# Pesquisa unificada de aparelhos, funcionários e linhas (GET /api/search?q=).
+#
+# - Identificadores (imei1, imei2, linhas.numero, matricula): pesquisa por prefixo
+#   (LIKE 'xxx%'), que usa os índices UNIQUE / idx_aparelhos_imei2 como range scan.
+# - Texto (modelo, observacoes, funcionarios.nome): FULLTEXT em modo booleano,
+#   com cada palavra como prefixo obrigatório ('+palavra*').
+# Tudo numa única consulta UNION ALL, com LIMIT em cada ramo.
+
+from flask import Blueprint, jsonify, request, g, current_app
+from .dashboard_routes import UNAVAILABLE_CONDITIONS
+import os
+import re
+
+search_bp = Blueprint('search', __name__)
+
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+SEARCH_MIN_LENGTH = 2
+# Igual a innodb_ft_min_token_size (palavras mais curtas não estão no índice FULLTEXT)
+FT_MIN_TOKEN = int(os.environ.get('SEARCH_FT_MIN_TOKEN', 3))
+
+# Pontuação: correspondência exata > prefixo > relevância do FULLTEXT
+EXACT_SCORE = 1000
+PREFIX_SCORE = 500
+
+# Disponibilidade de cada tipo (?available=1 e campo 'available' dos resultados):
+# aparelho sem termo "Em Uso" e utilizável, funcionário ativo, linha ativa sem aparelho
+_AVAILABLE_SQL = {
+    'device': "(registro_atual_id IS NULL AND condicao NOT IN ("
+              + ', '.join(f"'{condition}'" for condition in UNAVAILABLE_CONDITIONS) + "))",
+    'employee': "(ativo = 1)",
+    'line': "(status = 'Ativa' AND NOT EXISTS (SELECT 1 FROM aparelhos a WHERE a.linha_id = linhas.id))",
+}
+
+# tipo -> [SQL de cada ramo por prefixo]; cada ramo recebe (q, prefixo, limit).
+# 'value' é a chave natural que os formulários enviam (imei1, matrícula, número).
+_PREFIX_BRANCHES = {
+    'device': [
+        "SELECT 'device' AS type, id, modelo AS label, imei1 AS detail, 'imei1' AS field, imei1 AS `value`, "
+        "{available} AS available, IF(imei1 = %s, {exact}, {prefix}) AS score FROM aparelhos "
+        "WHERE imei1 LIKE %s {available_filter} LIMIT %s",
+        "SELECT 'device' AS type, id, modelo AS label, imei2 AS detail, 'imei2' AS field, imei1 AS `value`, "
+        "{available} AS available, IF(imei2 = %s, {exact}, {prefix}) AS score FROM aparelhos "
+        "WHERE imei2 LIKE %s {available_filter} LIMIT %s",
+    ],
+    'line': [
+        "SELECT 'line' AS type, id, numero AS label, operadora AS detail, 'numero' AS field, numero AS `value`, "
+        "{available} AS available, IF(numero = %s, {exact}, {prefix}) AS score FROM linhas "
+        "WHERE numero LIKE %s {available_filter} LIMIT %s",
+    ],
+    'employee': [
+        "SELECT 'employee' AS type, id, nome AS label, matricula AS detail, 'matricula' AS field, matricula AS `value`, "
+        "{available} AS available, IF(matricula = %s, {exact}, {prefix}) AS score FROM funcionarios "
+        "WHERE matricula LIKE %s {available_filter} LIMIT %s",
+    ],
+}
+
+# tipo -> SQL do ramo FULLTEXT; recebe (termos, termos, limit)
+_FULLTEXT_BRANCHES = {
+    'device': "SELECT 'device' AS type, id, modelo AS label, imei1 AS detail, 'modelo' AS field, imei1 AS `value`, "
+              "{available} AS available, MATCH(modelo, observacoes) AGAINST (%s IN BOOLEAN MODE) AS score "
+              "FROM aparelhos WHERE MATCH(modelo, observacoes) AGAINST (%s IN BOOLEAN MODE) {available_filter} LIMIT %s",
+    'employee': "SELECT 'employee' AS type, id, nome AS label, matricula AS detail, 'nome' AS field, matricula AS `value`, "
+                "{available} AS available, MATCH(nome) AGAINST (%s IN BOOLEAN MODE) AS score "
+                "FROM funcionarios WHERE MATCH(nome) AGAINST (%s IN BOOLEAN MODE) {available_filter} LIMIT %s",
+}
+
+
+def _branch_sql(sql, search_type, only_available):
+    available = _AVAILABLE_SQL[search_type]
+    return '(' + sql.format(exact=EXACT_SCORE, prefix=PREFIX_SCORE, available=available,
+                            available_filter=f"AND {available}" if only_available else '') + ')'
+
+
+def _like_prefix(value):
+    """Escapa os caracteres especiais do LIKE e acrescenta o '%' final."""
+    return re.sub(r'([\\%_])', r'\\\1', value) + '%'
+
+
+def _fulltext_terms(value):
+    """'galaxy s2' -> '+galaxy*' (palavras abaixo do tamanho mínimo do índice são ignoradas)."""
+    tokens = [t for t in re.findall(r'\w+', value) if len(t) >= FT_MIN_TOKEN]
+    return ' '.join(f'+{t}*' for t in tokens)
+
+
+def build_search_sql(q, types, limit, only_available=False):
+    """Monta a consulta UNION ALL e os parâmetros para os tipos pedidos."""
+    branches, params = [], []
+    prefix = _like_prefix(q)
+    for search_type in types:
+        for sql in _PREFIX_BRANCHES.get(search_type, []):
+            branches.append(_branch_sql(sql, search_type, only_available))
+            params.extend([q, prefix, limit])
+
+    terms = _fulltext_terms(q)
+    if terms:
+        for search_type in types:
+            sql = _FULLTEXT_BRANCHES.get(search_type)
+            if sql:
+                branches.append(_branch_sql(sql, search_type, only_available))
+                params.extend([terms, terms, limit])
+    return ' UNION ALL '.join(branches), params
+
+
+@search_bp.route('/', methods=['GET'])
+def search():
+    """
+    ?q= texto a pesquisar; ?types=device,employee,line (por omissão todos); ?limit= (máx. 100);
+    ?available=1 só devolve aparelhos/linhas livres e funcionários ativos.
+    Devolve {query, results: [{type, id, label, detail, field, value, available, score}]}
+    ordenado por relevância; cada registo aparece uma vez, com a melhor correspondência.
+    """
+    q = (request.args.get('q') or '').strip()
+    if len(q) < SEARCH_MIN_LENGTH:
+        return jsonify({'query': q, 'results': []})
+
+    limit = request.args.get('limit', SEARCH_DEFAULT_LIMIT, type=int) or SEARCH_DEFAULT_LIMIT
+    limit = max(1, min(limit, SEARCH_MAX_LIMIT))
+    requested = request.args.get('types')
+    types = [t for t in requested.split(',') if t in _PREFIX_BRANCHES] if requested else list(_PREFIX_BRANCHES)
+    if not types:
+        return jsonify({'message': f"types inválido. Use: {', '.join(_PREFIX_BRANCHES)}"}), 400
+
+    try:
+        if not g.db_cursor:
+             return jsonify({'message': 'Erro interno: Falha na conexão com a base de dados'}), 500
+
+        only_available = request.args.get('available') in ('1', 'true')
+        sql, params = build_search_sql(q, types, limit, only_available)
+        g.db_cursor.execute(sql, tuple(params))
+
+        best = {}
+        for row in g.db_cursor.fetchall():
+            row['score'] = float(row['score'] or 0)
+            row['available'] = bool(row['available'])
+            key = (row['type'], row['id'])
+            if key not in best or row['score'] > best[key]['score']:
+                best[key] = row
+        results = sorted(best.values(), key=lambda r: (-r['score'], r['type'], str(r['label'])))[:limit]
+        return jsonify({'query': q, 'results': results})
+    except Exception as e:
+        current_app.logger.error(f"Erro na pesquisa '{q}': {e}", exc_info=True)
+        return jsonify({'message': 'Erro ao pesquisar'}), 500
@@ -0,0 +1,138 @@
+# SMARTCONTROL/routes/streaming.py
+# Respostas JSON e CSV em streaming: as linhas são lidas do cursor aos blocos (fetchmany)
+# e enviadas à medida que são serializadas, sem materializar a lista completa
+# nem a string JSON inteira na memória do worker.
+#
+# O streaming usa uma conexão própria do pool, e não a da requisição (g.db_conn):
+# o gerador só lê as linhas depois de after_request, e em modo unit of work
+# (DB_UNIT_OF_WORK=true) o finish() da requisição faria rollback nessa conexão,
+# o que no mysql-connector consome (e perde) o resultado ainda por ler.
+
+from flask import Response, current_app, g, request, stream_with_context
+from config.database import RecordingCursor, get_connection
+from datetime import date, datetime
+from decimal import Decimal
+import csv
+import io
+
+STREAM_BATCH_SIZE = 500
+
+
+def stream_format():
+    """'json' (array) ou 'ndjson' (uma linha por objeto) se o cliente pediu ?stream=; senão None."""
+    value = (request.args.get('stream') or '').lower()
+    if value in ('1', 'true', 'json'):
+        return 'json'
+    if value == 'ndjson':
+        return 'ndjson'
+    return None
+
+
+class StreamCursor:
+    """Cursor (não bufferizado) numa conexão do pool só para ele; close() fecha os dois."""
+
+    def __init__(self, conn, cursor):
+        self._conn = conn
+        self._cursor = cursor
+
+    def fetchmany(self, size):
+        return self._cursor.fetchmany(size)
+
+    def close(self):
+        try:
+            self._cursor.close()
+        finally:
+            self._conn.close()  # devolve ao pool (que faz o reset da sessão)
+
+
+def open_stream_cursor(sql, params=()):
+    """
+    Executa a consulta num cursor próprio, numa conexão própria do pool, para ser
+    lido aos blocos (fechar com close()). A consulta corre já aqui, para que erros
+    de SQL ainda resultem num 500 normal em vez de uma resposta cortada.
+    """
+    conn = get_connection()
+    if conn is None:
+        raise ConnectionError('Falha na conexão com a base de dados')
+    try:
+        cursor = conn.cursor(dictionary=True)
+        listener = getattr(g.get('db_conn'), 'on_statement', None)
+        if listener:
+            cursor = RecordingCursor(cursor, listener)
+        cursor.execute(sql, tuple(params))
+    except Exception:
+        conn.close()
+        raise
+    return StreamCursor(conn, cursor)
+
+
+def stream_query(sql, params=(), fmt='json', transform=None, batch_size=STREAM_BATCH_SIZE):
+    """Devolve uma Response que vai produzindo o JSON (array ou NDJSON) por blocos."""
+    cursor = open_stream_cursor(sql, params)
+
+    dumps = current_app.json.dumps
+
+    def generate():
+        try:
+            first = True
+            if fmt == 'json':
+                yield '['
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                parts = []
+                for row in rows:
+                    item = dumps(transform(row) if transform else row)
+                    if fmt == 'ndjson':
+                        parts.append(item + '\n')
+                    else:
+                        parts.append(item if first else ',' + item)
+                        first = False
+                yield ''.join(parts)
+            if fmt == 'json':
+                yield ']'
+        finally:
+            cursor.close()
+
+    mimetype = 'application/x-ndjson' if fmt == 'ndjson' else 'application/json'
+    return Response(stream_with_context(generate()), mimetype=mimetype)
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def stream_csv(sql, params, columns, filename, batch_size=STREAM_BATCH_SIZE):
+    """
+    Exporta a consulta em CSV por blocos. columns = [(chave da linha, cabeçalho)].
+    Começa com BOM UTF-8 para o Excel reconhecer os acentos.
+    """
+    cursor = open_stream_cursor(sql, params)
+
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        try:
+            writer.writerow([header for _, header in columns])
+            yield '\ufeff' + buffer.getvalue()
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                buffer.seek(0)
+                buffer.truncate()
+                for row in rows:
+                    writer.writerow([_csv_value(row.get(key)) for key, _ in columns])
+                yield buffer.getvalue()
+        finally:
+            cursor.close()
+
+    return Response(stream_with_context(generate()), mimetype='text/csv',
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"'})
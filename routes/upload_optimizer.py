@@ -0,0 +1,203 @@
+# SMARTCONTROL/routes/upload_optimizer.py
+# Otimização dos uploads depois de gravados (fotos de telemóvel e PDFs digitalizados).
+#
+# Cada ficheiro novo do store (upload_store.py) é entregue a um pool de processos
+# (UPLOAD_OPTIMIZE_WORKERS; o trabalho é CPU puro e não deve competir com o GIL dos
+# workers da aplicação), que grava ao lado do original:
+# - <hash>.opt.<ext>: JPEG/PNG recomprimido e limitado a UPLOAD_IMAGE_MAX_SIDE px;
+#   PDF linearizado ("fast web view") e com object streams; só se ficar mais pequeno;
+# - <hash>.thumb.jpg: miniatura para as listagens (só imagens);
+# - <hash>.done.<ext>: marcador vazio, criado quando a otimização termina (mesmo que
+#   não tenha gerado versão mais pequena ou tenha falhado). A partir daí o URL já não
+#   muda de conteúdo e o original pode ser servido com cache longa.
+# Cada variante é escrita num temporário e movida com os.replace: enquanto não
+# existe, continua a ser servido o original (os termos guardam sempre o URL original).
+# Pillow e pikepdf são opcionais; sem eles o respetivo tipo não é otimizado.
+#
+# Os processos do pool são criados com 'forkserver' (UPLOAD_OPTIMIZE_START_METHOD;
+# 'spawn' onde não existe): um fork do worker da aplicação copiaria as ligações
+# do pool MySQL, locks e threads a meio. O pool é fechado à saída (atexit).
+
+from concurrent.futures import ProcessPoolExecutor
+import atexit
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+try:
+    import pikepdf
+except ImportError:
+    pikepdf = None
+
+logger = logging.getLogger('flask.app')
+
+UPLOAD_OPTIMIZE_WORKERS = int(os.environ.get('UPLOAD_OPTIMIZE_WORKERS', 2))  # 0 = desativado
+UPLOAD_IMAGE_MAX_SIDE = int(os.environ.get('UPLOAD_IMAGE_MAX_SIDE', 2480))  # ~A4 a 300 dpi
+UPLOAD_JPEG_QUALITY = int(os.environ.get('UPLOAD_JPEG_QUALITY', 80))
+UPLOAD_THUMBNAIL_SIDE = int(os.environ.get('UPLOAD_THUMBNAIL_SIDE', 320))
+UPLOAD_OPTIMIZE_START_METHOD = os.environ.get('UPLOAD_OPTIMIZE_START_METHOD', 'forkserver')
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _mp_context():
+    method = UPLOAD_OPTIMIZE_START_METHOD
+    if method not in multiprocessing.get_all_start_methods():
+        method = 'spawn'  # Windows/macOS sem forkserver
+    return multiprocessing.get_context(method)
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=UPLOAD_OPTIMIZE_WORKERS, mp_context=_mp_context())
+            atexit.register(shutdown)
+        return _executor
+
+
+def shutdown(wait=True):
+    """Fecha o pool (chamado à saída do processo); as otimizações pendentes são descartadas."""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=wait, cancel_futures=True)
+
+
+def variant_path(path, variant):
+    """'<pasta>/<hash>.pdf' -> '<pasta>/<hash>.opt.pdf' (variant='opt') ou '<hash>.thumb.jpg'."""
+    base, extension = os.path.splitext(path)
+    return f"{base}.thumb.jpg" if variant == 'thumb' else f"{base}.{variant}{extension}"
+
+
+def _write_atomic(final_path, write, keep=None):
+    """
+    Chama write(caminho_temporário) e publica o resultado de uma vez com os.replace.
+    Com keep(caminho_temporário) falso o resultado é descartado. Devolve se publicou.
+    """
+    fd, temp_path = tempfile.mkstemp(prefix='.opt_', dir=os.path.dirname(final_path))
+    os.close(fd)
+    try:
+        write(temp_path)
+        if keep and not keep(temp_path):
+            return False
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, final_path)
+        return True
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def _save_jpeg(image, path, quality):
+    if image.mode not in ('RGB', 'L'):
+        # Transparência (PNG) sobre fundo branco, como no papel
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.convert('RGBA').split()[-1])
+        image = background
+    image.save(path, format='JPEG', quality=quality, optimize=True, progressive=True)
+
+
+def _optimize_image(path, extension):
+    created = []
+    with Image.open(path) as original:
+        image = ImageOps.exif_transpose(original)  # fotos de telemóvel: aplica a rotação do EXIF
+        image.thumbnail((UPLOAD_IMAGE_MAX_SIDE, UPLOAD_IMAGE_MAX_SIDE))
+
+        def write(temp_path):
+            if extension == 'jpg':
+                _save_jpeg(image, temp_path, UPLOAD_JPEG_QUALITY)
+            else:
+                image.save(temp_path, format='PNG', optimize=True)
+
+        optimized_path = variant_path(path, 'opt')
+        original_size = os.path.getsize(path)
+        if _write_atomic(optimized_path, write, keep=lambda temp: os.path.getsize(temp) < original_size):
+            created.append(optimized_path)
+
+        thumbnail = image.copy()
+        thumbnail.thumbnail((UPLOAD_THUMBNAIL_SIDE, UPLOAD_THUMBNAIL_SIDE))
+        thumbnail_path = variant_path(path, 'thumb')
+        _write_atomic(thumbnail_path, lambda temp: _save_jpeg(thumbnail, temp, 70))
+        created.append(thumbnail_path)
+    return created
+
+
+def _optimize_pdf(path):
+    optimized_path = variant_path(path, 'opt')
+
+    def write(temp_path):
+        with pikepdf.open(path) as pdf:
+            pdf.save(temp_path, linearize=True, compress_streams=True,
+                     object_stream_mode=pikepdf.ObjectStreamMode.generate)
+
+    # Um PDF já comprimido pode crescer com a linearização: nesse caso fica o original
+    original_size = os.path.getsize(path)
+    if _write_atomic(optimized_path, write, keep=lambda temp: os.path.getsize(temp) < original_size):
+        return [optimized_path]
+    return []
+
+
+def optimize_file(path, extension):
+    """
+    Corre no processo do pool: gera as variantes de 'path' e devolve os caminhos
+    criados. Não usa a aplicação Flask nem a base de dados.
+    """
+    if extension in ('jpg', 'png') and Image is not None:
+        return _optimize_image(path, extension)
+    if extension == 'pdf' and pikepdf is not None:
+        return _optimize_pdf(path)
+    return []
+
+
+def _optimizable(extension):
+    if UPLOAD_OPTIMIZE_WORKERS <= 0:
+        return False
+    return (extension in ('jpg', 'png') and Image is not None) or (extension == 'pdf' and pikepdf is not None)
+
+
+def optimization_finished(path, extension):
+    """
+    Verdadeiro quando já não vai aparecer uma versão otimizada de 'path': a otimização
+    terminou (marcador 'done') ou este tipo de ficheiro não é otimizado.
+    """
+    return not _optimizable(extension) or os.path.exists(variant_path(path, 'done'))
+
+
+def _mark_done(path):
+    with open(variant_path(path, 'done'), 'wb'):
+        pass
+
+
+def _log_result(future, path):
+    if future.cancelled():
+        # Pool fechado antes de chegar a este ficheiro: fica por otimizar (servido sem cache longa)
+        logger.warning(f"Otimização de {path} cancelada.")
+        return
+    error = future.exception()
+    if error:
+        logger.error(f"Otimização de {path} falhou (fica o original): {error}")
+    else:
+        logger.info(f"Otimização de {path}: {len(future.result())} variante(s) criada(s).")
+    try:
+        _mark_done(path)
+    except OSError as e:
+        logger.error(f"Não foi possível marcar a otimização de {path} como terminada: {e}")
+
+
+def submit_optimization(path, extension):
+    """Agenda a otimização de um ficheiro novo do store. Devolve False se estiver desativada."""
+    if not _optimizable(extension):
+        return False
+    future = _get_executor().submit(optimize_file, path, extension)
+    future.add_done_callback(lambda f: _log_result(f, path))
+    return True
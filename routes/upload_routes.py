@@ -1,55 +1,112 @@
 # SMARTCONTROL/routes/upload_routes.py
 # (FICHEIRO COMPLETO E CORRIGIDO)
+#
+# Os uploads vão para o store endereçado pelo conteúdo (upload_store.py) e são
+# servidos por GET /api/upload/files/<hash>.<ext> com send_file: pedidos
+# condicionais (ETag = hash), Range (PDFs grandes abrem por partes) e cache longa,
+# já que o conteúdo de um URL nunca muda. Com USE_X_SENDFILE=true o envio passa
+# para o servidor web (X-Sendfile); senão o servidor WSGI usa o file_wrapper
+# (sendfile do sistema operativo, quando disponível).
+# Os ficheiros antigos em static/uploads continuam acessíveis pelos URLs que já tinham.
+#
+# Os ficheiros novos são otimizados em background (upload_optimizer.py). O URL
+# guardado no termo é sempre o do original; esta rota serve a versão otimizada
+# assim que existir (?original=1 força o original) e a miniatura em /thumbnail.
+# Só enquanto a otimização está pendente é que o URL é servido sem cache longa
+# (max_age=0): depois disso, com ou sem versão otimizada, o conteúdo já não muda.
 
+from flask import Blueprint, jsonify, request, url_for, current_app, send_file
+from . import upload_store
+from .upload_optimizer import optimization_finished, submit_optimization, variant_path
 import os
-from flask import Blueprint, jsonify, request, url_for, current_app
-from werkzeug.utils import secure_filename
 
 upload_bp = Blueprint('upload', __name__)
 
-# Define a pasta onde os uploads serão guardados
-UPLOAD_FOLDER = 'static/uploads'
-# Garante que a pasta de uploads existe
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+UPLOAD_MAX_AGE = 365 * 24 * 3600
 
-# --- CORREÇÃO DE SEGURANÇA ---
-ALLOWED_EXTENSIONS = {'pdf', 'png', 'jpg', 'jpeg'}
+_MIMETYPES = {'pdf': 'application/pdf', 'png': 'image/png', 'jpg': 'image/jpeg'}
 
-def allowed_file(filename):
-    return '.' in filename and \
-           filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
-# --- FIM DA CORREÇÃO ---
 
 @upload_bp.route('/', methods=['POST'])
 def upload_file():
     if 'file' not in request.files:
         return jsonify({'message': 'Nenhum ficheiro enviado'}), 400
-    
+
     file = request.files['file']
-    
+
     if file.filename == '':
         return jsonify({'message': 'Nenhum ficheiro selecionado'}), 400
-        
+
     # --- CORREÇÃO DE SEGURANÇA ---
-    if not allowed_file(file.filename):
+    extension = upload_store.stored_extension(file.filename)
+    if not extension:
         current_app.logger.warning(f"Tentativa de upload de ficheiro inválido: {file.filename}")
         return jsonify({'message': 'Tipo de ficheiro não permitido'}), 400
     # --- FIM DA CORREÇÃO ---
 
-    if file:
-        try:
-            filename = secure_filename(file.filename)
-            file_path = os.path.join(UPLOAD_FOLDER, filename)
-            file.save(file_path)
-            
-            # Gera a URL completa para o ficheiro guardado
-            file_url = url_for('static', filename=f'uploads/{filename}', _external=True)
-            
-            current_app.logger.info(f"Upload bem-sucedido: {filename}")
-            return jsonify({'message': 'Upload bem-sucedido!', 'fileUrl': file_url}), 201
-        
-        except Exception as e:
-            current_app.logger.error(f"Erro durante o upload do ficheiro {file.filename}: {e}", exc_info=True)
-            return jsonify({'message': 'Erro ao guardar o ficheiro'}), 500
-
-    return jsonify({'message': 'Erro desconhecido no upload'}), 500
\ No newline at end of file
+    try:
+        name, size, created = upload_store.store(file.stream, extension)
+        file_url = url_for('upload.get_uploaded_file', name=name, _external=True)
+
+        if created:
+            current_app.logger.info(f"Upload bem-sucedido: {file.filename} -> {name} ({size} bytes)")
+            submit_optimization(os.path.abspath(upload_store.resolve(name)), extension)
+        else:
+            current_app.logger.info(f"Upload repetido: {file.filename} já existe como {name}")
+
+        result = {'message': 'Upload bem-sucedido!', 'fileUrl': file_url}
+        if extension != 'pdf':
+            # Disponível quando a otimização terminar (até lá responde 404)
+            result['thumbnailUrl'] = url_for('upload.get_uploaded_thumbnail', name=name, _external=True)
+        return jsonify(result), 201
+
+    except Exception as e:
+        current_app.logger.error(f"Erro durante o upload do ficheiro {file.filename}: {e}", exc_info=True)
+        return jsonify({'message': 'Erro ao guardar o ficheiro'}), 500
+
+
+def _send_stored(path, mimetype, etag, max_age=UPLOAD_MAX_AGE):
+    try:
+        response = send_file(
+            os.path.abspath(path),  # relativo à pasta de trabalho, como na escrita
+            mimetype=mimetype,
+            conditional=True,
+            etag=etag,
+            max_age=max_age,
+        )
+        if max_age:
+            response.cache_control.immutable = True  # o conteúdo de um URL do store nunca muda
+        return response
+    except FileNotFoundError:
+        return jsonify({'message': 'Ficheiro não encontrado'}), 404
+
+
+@upload_bp.route('/files/<string:name>', methods=['GET'])
+def get_uploaded_file(name):
+    """
+    Serve um ficheiro do store (suporta If-None-Match, If-Modified-Since e Range):
+    a versão otimizada, se já existir, senão o original.
+    """
+    path = upload_store.resolve(name)
+    if not path:
+        return jsonify({'message': 'Ficheiro não encontrado'}), 404
+    digest, extension = name.split('.', 1)
+    if request.args.get('original') == '1':
+        return _send_stored(path, _MIMETYPES[extension], digest)
+    optimized = variant_path(path, 'opt')
+    if os.path.exists(optimized):
+        return _send_stored(optimized, _MIMETYPES[extension], f"{digest}-opt")
+    if optimization_finished(path, extension):
+        # Otimização terminada sem versão mais pequena (ou tipo não otimizado): o original é definitivo
+        return _send_stored(path, _MIMETYPES[extension], digest)
+    # Otimização pendente: o browser revalida (304 pelo ETag) em vez de guardar o original um ano
+    return _send_stored(path, _MIMETYPES[extension], digest, max_age=0)
+
+
+@upload_bp.route('/files/<string:name>/thumbnail', methods=['GET'])
+def get_uploaded_thumbnail(name):
+    """Miniatura JPEG de uma imagem do store (404 enquanto não for gerada, e para PDFs)."""
+    path = upload_store.resolve(name)
+    if not path:
+        return jsonify({'message': 'Ficheiro não encontrado'}), 404
+    return _send_stored(variant_path(path, 'thumb'), 'image/jpeg', name.split('.', 1)[0] + '-thumb')
@@ -0,0 +1,75 @@
+# SMARTCONTROL/routes/upload_store.py
+# Armazenamento dos uploads (termos, B.O.) endereçado pelo conteúdo.
+#
+# O ficheiro é escrito em blocos para um temporário na própria pasta do store,
+# calculando o SHA-256 ao mesmo tempo; depois é movido (os.replace, atómico) para
+#   <UPLOAD_STORE_DIR>/<h[0:2]>/<h[2:4]>/<h>.<ext>
+# Dois níveis de subpastas mantêm cada pasta pequena (65 536 pastas folha).
+# Se o ficheiro já existe, o temporário é apagado: reenviar o mesmo PDF não ocupa
+# espaço nem muda o URL. Como o nome é o hash, o conteúdo de um URL nunca muda.
+
+import hashlib
+import os
+import re
+import tempfile
+
+UPLOAD_STORE_DIR = os.environ.get('UPLOAD_STORE_DIR', 'storage/uploads')
+UPLOAD_CHUNK_SIZE = int(os.environ.get('UPLOAD_CHUNK_SIZE', 64 * 1024))
+
+# Extensão aceite -> extensão gravada (jpeg e jpg são o mesmo ficheiro)
+EXTENSIONS = {'pdf': 'pdf', 'png': 'png', 'jpg': 'jpg', 'jpeg': 'jpg'}
+
+_NAME_RE = re.compile(r'^([0-9a-f]{64})\.(pdf|png|jpg)$')
+
+
+def stored_extension(filename):
+    """Extensão normalizada para o store, ou None se o tipo não for permitido."""
+    if '.' not in filename:
+        return None
+    return EXTENSIONS.get(filename.rsplit('.', 1)[1].lower())
+
+
+def path_for(digest, extension):
+    return os.path.join(UPLOAD_STORE_DIR, digest[:2], digest[2:4], f"{digest}.{extension}")
+
+
+def resolve(name):
+    """Caminho de um nome '<hash>.<ext>' do store, ou None se o nome for inválido."""
+    match = _NAME_RE.match(name)
+    if not match:
+        return None
+    return path_for(match.group(1), match.group(2))
+
+
+def store(stream, extension):
+    """
+    Grava o conteúdo de 'stream' no store. Devolve (nome, tamanho, novo), com
+    novo=False quando o mesmo conteúdo já lá estava.
+    """
+    os.makedirs(UPLOAD_STORE_DIR, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    fd, temp_path = tempfile.mkstemp(prefix='.upload_', dir=UPLOAD_STORE_DIR)
+    try:
+        with os.fdopen(fd, 'wb') as output:
+            while True:
+                chunk = stream.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                output.write(chunk)
+                size += len(chunk)
+
+        hexdigest = digest.hexdigest()
+        final_path = path_for(hexdigest, extension)
+        if os.path.exists(final_path):
+            os.remove(temp_path)
+            return f"{hexdigest}.{extension}", size, False
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        os.chmod(temp_path, 0o644)  # mkstemp cria com 0600; o servidor web (X-Sendfile) tem de ler
+        os.replace(temp_path, final_path)
+        return f"{hexdigest}.{extension}", size, True
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
@@ -5,28 +5,39 @@ from flask import Blueprint, jsonify, request, current_app, g
 import bcrypt
 import json
 from .audit_helper import log_change
-from .decorators import require_permission
+from .decorators import require_permission, invalidate_user_permissions_after_commit
+from .pagination import ListingSpec, listing_response
 
 user_bp = Blueprint('users', __name__)
 
 def hash_password(senha):
     return bcrypt.hashpw(senha.encode('utf-8'), bcrypt.gensalt())
 
+USER_LISTING = ListingSpec(
+    select="id, nome, username, role, permissoes",
+    from_sql="FROM usuarios",
+    sortable={'id': 'id', 'nome': 'nome', 'username': 'username', 'role': 'role'},
+    filters={'role': ('role', 'eq'), 'q': (['nome', 'username'], 'like')},
+    default_sort='id',
+)
+
+def _parse_user_permissions(user):
+    permissoes_str = user.get('permissoes')
+    user['permissoes'] = json.loads(permissoes_str) if permissoes_str else {}
+    return user
+
 # GET /users - Listar todos os usuários (SEM DECORADOR PARA LEITURA)
 @user_bp.route('/', methods=['GET'])
 def get_users():
-    """Lista todos os utilizadores. Agora sem proteção para leitura."""
+    """
+    Lista os utilizadores (filtros: role, q; paginação: page/limit;
+    streaming: stream=json|ndjson). Agora sem proteção para leitura.
+    """
     try:
         if not g.db_cursor:
              return jsonify({'message': 'Erro interno: Falha na conexão com a base de dados'}), 500
              
-        g.db_cursor.execute("SELECT id, nome, username, role, permissoes FROM usuarios")
-        users = []
-        for user in g.db_cursor.fetchall():
-            permissoes_str = user.get('permissoes')
-            user['permissoes'] = json.loads(permissoes_str) if permissoes_str else {}
-            users.append(user)
-        return jsonify(users)
+        return listing_response(USER_LISTING, g.db_cursor, transform=_parse_user_permissions)
     except Exception as e:
         current_app.logger.error(f"Erro ao buscar usuários: {e}", exc_info=True)
         return jsonify({'message': 'Erro ao buscar usuários'}), 500
@@ -110,6 +121,7 @@ def update_user(user_id_to_update):
             )
         
         g.db_conn.commit()
+        invalidate_user_permissions_after_commit(user_id_to_update)
         
         if g.db_cursor.rowcount == 0:
             return jsonify({'message': 'Usuário não encontrado'}), 404
@@ -149,6 +161,7 @@ def delete_user(user_id_to_delete):
 
         g.db_cursor.execute("DELETE FROM usuarios WHERE id = %s", (user_id_to_delete,))
         g.db_conn.commit()
+        invalidate_user_permissions_after_commit(user_id_to_delete)
         
         if g.db_cursor.rowcount == 0:
             return jsonify({'message': 'Usuário não encontrado'}), 404
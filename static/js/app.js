@@ -2,6 +2,7 @@
 
 import { showToast, closeModal as closeModalFromUI } from './modules/ui.js';
 export { fetchData } from './modules/api.js'; // Re-exporta para outros módulos usarem
+import { API_URL, fetchData } from './modules/api.js';
 import { initAuthModule } from './modules/auth.js';
 import { initCompanyModule } from './modules/company.js';
 import { initEmployeesModule } from './modules/employees.js';
@@ -14,12 +15,10 @@ import { initRecordsModule } from './modules/records.js';
 import { initDashboard } from './modules/dashboard.js';
 import { initLineRecordsModule } from './modules/line_records.js';
 
+// Funcionários, aparelhos, linhas e manutenções não ficam no state: as tabelas
+// pedem cada página ao servidor (paged_list.js) e os formulários usam /api/search.
 export let state = {
     records: [],
-    employees: [],
-    devices: [],
-    lines: [],
-    maintenance: [],
     users: [],
     companyInfo: {},
     currentUser: null,
@@ -63,7 +62,7 @@ export function updateState(newState) {
 
 function displayCompanyInfoOnHeader() {
     const companyInfo = state.companyInfo || {};
-    const { nome, cnpj, logo } = companyInfo;
+    const { nome, cnpj, logoUrl } = companyInfo;
     const headerName = document.getElementById('header-company-name');
     const headerCnpj = document.getElementById('header-company-cnpj');
     const logoEl = document.getElementById('header-logo');
@@ -72,8 +71,8 @@ function displayCompanyInfoOnHeader() {
     if (headerCnpj) headerCnpj.textContent = cnpj ? `CNPJ: ${cnpj}` : 'Gerenciamento';
 
     if (logoEl) {
-        if (logo) {
-            logoEl.src = `data:image/png;base64,${logo}`;
+        if (logoUrl) {
+            logoEl.src = `${API_URL}${logoUrl}`;
             logoEl.classList.remove('hidden');
         } else {
             logoEl.classList.add('hidden');
@@ -107,12 +106,10 @@ function applyPermissions() {
 export async function fetchAllData() {
     showToast("A carregar dados do servidor...");
     try {
-        const [employees, devices, lines, users, maintenance, companyInfo] = await Promise.all([
-            fetchData('employees'), fetchData('devices'),
-            fetchData('lines'), fetchData('users'), fetchData('maintenance'), fetchData('company')
-        ]);
+        // Só os utilizadores do sistema (poucos, geridos pelo administrador) e a empresa
+        const [users, companyInfo] = await Promise.all([fetchData('users'), fetchData('company')]);
 
-        updateState({ employees, devices, lines, users, maintenance, companyInfo: companyInfo || {} });
+        updateState({ users, companyInfo: companyInfo || {} });
 
         displayCompanyInfoOnHeader(); // Atualiza o cabeçalho com os dados da empresa
         showToast("Dados carregados com sucesso!");
@@ -66,4 +66,45 @@ export async function handleFileUpload(fileInput) {
         fileInput.value = '';
         return null;
     }
-}
\ No newline at end of file
+}
+// Importação CSV em background: o upload responde logo com o id do job
+// e o progresso é consultado em /api/jobs/<id> até o job terminar (no máximo timeout ms).
+const IMPORT_JOB_TIMEOUT = 30 * 60 * 1000;
+
+export async function runImportJob(resource, formData, pollInterval = 1500, timeout = IMPORT_JOB_TIMEOUT) {
+    formData.append('background', '1');
+    const res = await fetch(`${API_URL}/api/${resource}/import`, {
+        method: 'POST',
+        body: formData,
+    });
+    const submitted = await res.json();
+    if (!res.ok) throw new Error(submitted.message);
+
+    const deadline = Date.now() + timeout;
+    while (Date.now() < deadline) {
+        await new Promise(resolve => setTimeout(resolve, pollInterval));
+        const jobRes = await fetch(`${API_URL}/api/jobs/${submitted.jobId}`);
+        const job = await jobRes.json();
+        if (!jobRes.ok) throw new Error(job.message);
+        if (job.done) {
+            if (job.status !== 'Concluído') throw new Error(job.message || 'A importação falhou.');
+            return { message: job.message, failures: job.failures };
+        }
+    }
+    throw new Error(`A importação (job ${submitted.jobId}) não terminou a tempo. Verifique os dados antes de importar novamente.`);
+}
+
+// Pesquisa no servidor (/api/search) para as caixas de seleção dos formulários.
+// available=true devolve só aparelhos/linhas livres e funcionários ativos.
+export async function searchEntities(query, types, { available = false, limit = 20 } = {}) {
+    const params = new URLSearchParams({ q: query, types, limit });
+    if (available) params.set('available', '1');
+    const data = await fetchData(`search/?${params}`);
+    return data && Array.isArray(data.results) ? data.results : [];
+}
+
+// Um registo pela sua chave natural (ex: employees?matricula=...), via listagem paginada.
+export async function fetchOneBy(endpoint, field, value) {
+    const data = await fetchData(`${endpoint}?${new URLSearchParams({ [field]: value, limit: 1 })}`);
+    return data && Array.isArray(data.items) && data.items.length > 0 ? data.items[0] : null;
+}
@@ -5,13 +5,13 @@ import { openModal, closeModal, showToast, readFileAsBase64 } from './ui.js';
 import { API_URL } from './api.js';
 
 function openCompanyInfoForm(companyInfoModal) {
-    const { nome, cnpj, logo } = state.companyInfo;
+    const { nome, cnpj, logoUrl } = state.companyInfo;
     document.getElementById('companyName').value = nome || '';
     document.getElementById('companyCnpj').value = cnpj || '';
     const preview = document.getElementById('logo-preview');
 
-    if (logo) {
-        preview.src = `data:image/png;base64,${logo}`;
+    if (logoUrl) {
+        preview.src = `${API_URL}${logoUrl}`;
         preview.classList.remove('hidden');
     } else {
         preview.classList.add('hidden');
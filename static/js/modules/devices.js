@@ -1,9 +1,19 @@
 // --- MÓDULO DE APARELHOS (DEVICES.JS) ---
 
-import { state, updateState, fetchData } from '../app.js';
-import { openModal, closeModal, showToast, formatDateForInput } from './ui.js';
-import { API_URL } from './api.js';
+import { state } from '../app.js';
+import { openModal, closeModal, showToast, formatDateForInput, bindSearchSelect } from './ui.js';
+import { API_URL, runImportJob, searchEntities } from './api.js';
 import { refreshDashboard } from './dashboard.js';
+import { createPagedList } from './paged_list.js';
+
+// Página atual da tabela (criada em initDevicesModule)
+let deviceList = null;
+// Linha já vinculada ao aparelho em edição: fica sempre entre as opções do formulário
+let currentLineOption = '';
+
+function lineBaseOptions() {
+    return '<option value="">Nenhuma</option>' + currentLineOption;
+}
 
 function getDeviceStatusClass(status) {
     const classes = { 'Em uso': 'bg-blue-100 text-blue-800', 'Disponível': 'bg-green-100 text-green-800', 'Indisponível': 'bg-yellow-100 text-yellow-800' };
@@ -15,7 +25,7 @@ function getDeviceConditionClass(condition) {
     return classes[condition] || 'bg-gray-100 text-gray-800';
 }
 
-function renderDeviceTable(deviceTableBody, noDevicesMessage, devicesToRender = state.devices) {
+function renderDeviceTable(deviceTableBody, noDevicesMessage, devicesToRender) {
     deviceTableBody.innerHTML = '';
     if (!devicesToRender || devicesToRender.length === 0) {
         noDevicesMessage.classList.remove('hidden');
@@ -50,14 +60,12 @@ function openDeviceForm(deviceFormModal, deviceForm, imei = null) {
     document.getElementById('device-id-input').value = imei || '';
     const imeiInput = document.getElementById('deviceFormImei1');
     const lineSelect = document.getElementById('deviceFormLine');
-    lineSelect.innerHTML = '<option value="">Nenhuma</option>';
-    
-    state.lines.filter(l => l.status === 'Ativa' && (!l.imeiVinculado || (imei && l.imeiVinculado === imei))).forEach(line => {
-        lineSelect.innerHTML += `<option value="${line.id}">${line.numero} (${line.operadora})</option>`;
-    });
+    const device = imei ? deviceList.find(d => d.imei1 === imei) : null;
+    // As linhas livres são escolhidas pela pesquisa (/api/search), ligada em initDevicesModule
+    currentLineOption = device && device.lineId ? `<option value="${device.lineId}">${device.currentLine}</option>` : '';
+    lineSelect.innerHTML = lineBaseOptions();
 
-    if (imei) {
-        const device = state.devices.find(d => d.imei1 === imei);
+    if (device) {
         document.getElementById('device-modal-title').textContent = "Editar Aparelho";
         imeiInput.value = device.imei1;
         imeiInput.readOnly = true;
@@ -65,8 +73,7 @@ function openDeviceForm(deviceFormModal, deviceForm, imei = null) {
         document.getElementById('deviceFormImei2').value = device.imei2 || '';
         document.getElementById('deviceFormColorNotes').value = device.colorNotes || '';
         document.getElementById('deviceFormCondition').value = device.condition;
-        const linkedLine = state.lines.find(l => l.imeiVinculado === imei);
-        if (linkedLine) lineSelect.value = linkedLine.id;
+        lineSelect.value = device.lineId || '';
     } else {
         document.getElementById('device-modal-title').textContent = "Novo Aparelho";
         imeiInput.readOnly = false;
@@ -75,7 +82,7 @@ function openDeviceForm(deviceFormModal, deviceForm, imei = null) {
 }
 
 async function showDeviceHistory(deviceHistoryModal, imei) {
-    const device = state.devices.find(d => d.imei1 === imei);
+    const device = deviceList.find(d => d.imei1 === imei);
     if (!device) return;
 
     document.getElementById('history-device-name').textContent = `${device.model} (IMEI: ${device.imei1})`;
@@ -113,8 +120,8 @@ async function showDeviceHistory(deviceHistoryModal, imei) {
         }
 
         const noAuditMsg = document.getElementById('no-device-audit-history-message');
-        const auditRes = await fetch(`${API_URL}/api/audit/device/${imei}`);
-        const auditData = await auditRes.json();
+        const auditRes = await fetch(`${API_URL}/api/audit/device/${imei}?limit=100`);
+        const auditData = (await auditRes.json()).items;
         
         auditTbody.innerHTML = '';
         if (auditData && auditData.length > 0) {
@@ -157,10 +164,27 @@ export function initDevicesModule() {
     const deviceImportInput = document.getElementById('device-import-input');
     const deviceSearchInput = document.getElementById('device-search-input');
 
+    deviceList = createPagedList({
+        endpoint: 'devices',
+        render: items => renderDeviceTable(deviceTableBody, noDevicesMessage, items),
+        paginationId: 'device-pagination',
+        searchInput: deviceSearchInput,
+    });
+
+    const lineSearchInput = document.getElementById('deviceFormLineSearch');
+    const lineSelect = document.getElementById('deviceFormLine');
+    if (lineSearchInput && lineSelect) {
+        bindSearchSelect(
+            lineSearchInput, lineSelect,
+            query => searchEntities(query, 'line', { available: true }),
+            r => `<option value="${r.id}">${r.label} (${r.detail})</option>`,
+            lineBaseOptions
+        );
+    }
+
     if (manageDevicesBtn) {
         manageDevicesBtn.addEventListener('click', () => {
-            renderDeviceTable(deviceTableBody, noDevicesMessage);
-            if (deviceSearchInput) deviceSearchInput.value = '';
+            deviceList.reset();
             openModal(deviceListModal);
         });
     }
@@ -195,13 +219,8 @@ export function initDevicesModule() {
                 if (!response.ok) throw new Error(result.message);
                 
                 showToast(result.message);
-                // Otimização: Recarrega apenas os dados de aparelhos e o dashboard.
-                const updatedDevices = await fetchData('devices');
-                updateState({ devices: updatedDevices });
-                await refreshDashboard();
-
-                // Re-renderiza a tabela com os dados atualizados do state.
-                renderDeviceTable(deviceTableBody, noDevicesMessage, updatedDevices);
+                // Recarrega só a página atual da tabela e o dashboard.
+                await Promise.all([deviceList.load(), refreshDashboard()]);
                 closeModal(deviceFormModal);
             } catch (error) {
                 showToast(`Erro: ${error.message}`, true);
@@ -230,13 +249,7 @@ export function initDevicesModule() {
                     const result = await response.json();
                     if (!response.ok) throw new Error(result.message);
                     showToast(result.message);
-                    // Otimização: Recarrega apenas os dados de aparelhos e o dashboard.
-                    const updatedDevices = await fetchData('devices');
-                    updateState({ devices: updatedDevices });
-                    await refreshDashboard();
-
-                    // Re-renderiza a tabela com os dados atualizados do state.
-                    renderDeviceTable(deviceTableBody, noDevicesMessage, updatedDevices);
+                    await Promise.all([deviceList.load(), refreshDashboard()]);
                 } catch (error) {
                     showToast(`Erro: ${error.message}`, true);
                 }
@@ -246,14 +259,10 @@ export function initDevicesModule() {
         });
     }
     
-    if (deviceSearchInput) {
-        deviceSearchInput.addEventListener('input', (e) => {
-            const searchTerm = e.target.value.toLowerCase().trim();
-            const filteredDevices = state.devices.filter(device =>
-                device.model.toLowerCase().includes(searchTerm) ||
-                device.imei1.toLowerCase().includes(searchTerm)
-            );
-            renderDeviceTable(deviceTableBody, noDevicesMessage, filteredDevices);
+    if (deviceExportBtn) {
+        // Gerado no servidor (/api/export) com a pesquisa atual
+        deviceExportBtn.addEventListener('click', () => {
+            window.location.href = deviceList.exportUrl('devices');
         });
     }
 
@@ -269,13 +278,7 @@ export function initDevicesModule() {
             formData.append('currentUser', JSON.stringify(state.currentUser));
 
             try {
-                const res = await fetch(`${API_URL}/api/devices/import`, {
-                    method: 'POST',
-                    body: formData,
-                });
-
-                const result = await res.json();
-                if (!res.ok) throw new Error(result.message);
+                const result = await runImportJob('devices', formData);
 
                 showToast(result.message, false);
                 if (result.failures && result.failures.length > 0) {
@@ -283,8 +286,7 @@ export function initDevicesModule() {
                     showToast(`${result.failures.length} aparelhos não puderam ser importados. Verifique a consola.`, true);
                 }
 
-                await fetchAllData();
-                renderDeviceTable(deviceTableBody, noDevicesMessage);
+                await Promise.all([deviceList.load(), refreshDashboard()]);
             } catch (error) {
                 showToast(`Erro na importação: ${error.message}`, true);
             } finally {
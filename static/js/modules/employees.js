@@ -1,12 +1,16 @@
 // --- MÓDULO DE FUNCIONÁRIOS (EMPLOYEES.JS) ---
 // (VERSÃO ESTÁVEL E CORRIGIDA)
 
-import { state, updateState, fetchData } from '../app.js';
+import { state } from '../app.js';
 import { openModal, closeModal, showToast, formatDateForInput } from './ui.js';
-import { API_URL } from './api.js';
+import { API_URL, runImportJob } from './api.js';
 import { refreshDashboard } from './dashboard.js';
+import { createPagedList } from './paged_list.js';
 
-function renderEmployeeTable(employeeTableBody, noEmployeesMessage, employeesToRender = state.employees) {
+// Página atual da tabela (criada em initEmployeesModule)
+let employeeList = null;
+
+function renderEmployeeTable(employeeTableBody, noEmployeesMessage, employeesToRender) {
     employeeTableBody.innerHTML = '';
     if (!employeesToRender || employeesToRender.length === 0) {
         noEmployeesMessage.classList.remove('hidden');
@@ -38,7 +42,7 @@ function openEmployeeForm(employeeForm, employeeFormModal, employeeId = null) {
     const matriculaInput = document.getElementById('employeeFormId');
 
     if (employeeId) {
-        const employee = state.employees.find(e => e.id === employeeId);
+        const employee = employeeList.find(e => e.id === employeeId);
         if (employee) {
             document.getElementById('employee-modal-title').textContent = "Editar Funcionário";
             document.getElementById('employeeFormName').value = employee.name;
@@ -55,7 +59,7 @@ function openEmployeeForm(employeeForm, employeeFormModal, employeeId = null) {
 }
 
 async function showEmployeeHistory(employeeHistoryModal, employeeId, matricula) {
-    const employee = state.employees.find(e => e.id === employeeId);
+    const employee = employeeList.find(e => e.id === employeeId);
     if (!employee) return;
 
     document.getElementById('history-employee-name').textContent = `${employee.name} (Matrícula: ${employee.matricula})`;
@@ -104,10 +108,16 @@ export function initEmployeesModule() {
     const employeeExportBtn = document.getElementById('employee-export-btn');
     const employeeImportInput = document.getElementById('employee-import-input');
 
+    employeeList = createPagedList({
+        endpoint: 'employees',
+        render: items => renderEmployeeTable(employeeTableBody, noEmployeesMessage, items),
+        paginationId: 'employee-pagination',
+        searchInput: employeeSearchInput,
+    });
+
     if (manageEmployeesBtn) {
         manageEmployeesBtn.addEventListener('click', () => {
-            renderEmployeeTable(employeeTableBody, noEmployeesMessage);
-            if(employeeSearchInput) employeeSearchInput.value = '';
+            employeeList.reset();
             openModal(employeeListModal);
         });
     }
@@ -141,11 +151,8 @@ export function initEmployeesModule() {
                 
                 showToast(result.message);
                 
-                // Otimização: Recarrega apenas os dados de funcionários e o dashboard.
-                const updatedEmployees = await fetchData('employees');
-                updateState({ employees: updatedEmployees });
-                await refreshDashboard();
-                renderEmployeeTable(employeeTableBody, noEmployeesMessage, updatedEmployees);
+                // Recarrega só a página atual da tabela e o dashboard.
+                await Promise.all([employeeList.load(), refreshDashboard()]);
                 closeModal(employeeFormModal);
             } catch (error) {
                 showToast(`Erro: ${error.message}`, true);
@@ -164,7 +171,7 @@ export function initEmployeesModule() {
             if (action === 'edit-employee') {
                 openEmployeeForm(employeeForm, employeeFormModal, employeeId);
             } else if (action === 'delete-employee') {
-                const employee = state.employees.find(e => e.id === employeeId);
+                const employee = employeeList.find(e => e.id === employeeId);
                 if (!confirm(`Tem certeza que deseja excluir o funcionário ${employee?.name || ''}?`)) return;
                 try {
                     const response = await fetch(`${API_URL}/api/employees/${employeeId}`, { 
@@ -176,11 +183,7 @@ export function initEmployeesModule() {
                     if (!response.ok) throw new Error(result.message);
                     showToast(result.message);
 
-                    // Otimização
-                    const updatedEmployees = await fetchData('employees');
-                    updateState({ employees: updatedEmployees });
-                    await refreshDashboard();
-                    renderEmployeeTable(employeeTableBody, noEmployeesMessage, updatedEmployees);
+                    await Promise.all([employeeList.load(), refreshDashboard()]);
                 } catch (error) {
                     showToast(`Erro: ${error.message}`, true);
                 }
@@ -190,36 +193,10 @@ export function initEmployeesModule() {
         });
     }
     
-    if (employeeSearchInput) {
-        employeeSearchInput.addEventListener('input', (e) => {
-            const searchTerm = e.target.value.toLowerCase().trim();
-            const filteredEmployees = state.employees.filter(employee =>
-                (employee.name && employee.name.toLowerCase().includes(searchTerm)) ||
-                (employee.matricula && String(employee.matricula).toLowerCase().includes(searchTerm))
-            );
-            renderEmployeeTable(employeeTableBody, noEmployeesMessage, filteredEmployees);
-        });
-    }
-    
     if (employeeExportBtn) {
+        // Gerado no servidor com a pesquisa atual; as colunas seguem a ordem da importação
         employeeExportBtn.addEventListener('click', () => {
-            if (!state.employees || state.employees.length === 0) {
-                showToast('Nenhum funcionário para exportar.', true);
-                return;
-            }
-            const header = 'Matricula,Nome,Cargo,E-mail\n';
-            const csvContent = state.employees.map(emp => {
-                const name = `"${(emp.name || '').replace(/"/g, '""')}"`;
-                const position = `"${(emp.position || '').replace(/"/g, '""')}"`;
-                return `${emp.matricula || ''},${name},${position},${emp.email || ''}`;
-            }).join('\n');
-            
-            const blob = new Blob([`\uFEFF${csvContent}`], { type: 'text/csv;charset=utf-8;' });
-            const link = document.createElement('a');
-            link.href = URL.createObjectURL(blob);
-            link.download = `funcionarios_${new Date().toISOString().slice(0, 10)}.csv`;
-            link.click();
-            URL.revokeObjectURL(link.href);
+            window.location.href = employeeList.exportUrl('employees');
         });
     }
 
@@ -234,13 +211,7 @@ export function initEmployeesModule() {
             formData.append('currentUser', JSON.stringify(state.currentUser)); // Envia os dados do utilizador
 
             try {
-                const res = await fetch(`${API_URL}/api/employees/import`, {
-                    method: 'POST',
-                    body: formData,
-                });
-
-                const result = await res.json();
-                if (!res.ok) throw new Error(result.message);
+                const result = await runImportJob('employees', formData);
 
                 showToast(result.message, false);
                 if (result.failures && result.failures.length > 0) {
@@ -248,11 +219,7 @@ export function initEmployeesModule() {
                     showToast(`${result.failures.length} registos não puderam ser importados. Verifique a consola.`, true);
                 }
 
-                // Otimização
-                const updatedEmployees = await fetchData('employees');
-                updateState({ employees: updatedEmployees });
-                await refreshDashboard();
-                renderEmployeeTable(employeeTableBody, noEmployeesMessage, updatedEmployees);
+                await Promise.all([employeeList.load(), refreshDashboard()]);
             } catch (error) {
                 showToast(`Erro na importação: ${error.message}`, true);
             } finally {
@@ -2,8 +2,8 @@
 // VERSÃO CORRIGIDA - Substitua TODO o conteúdo do arquivo por este código
 
 import { state } from '../app.js';
-import { openModal, closeModal, showToast, formatDateForInput, setLoading, unsetLoading } from './ui.js';
-import { API_URL } from './api.js';
+import { openModal, closeModal, showToast, formatDateForInput, setLoading, unsetLoading, bindSearchSelect } from './ui.js';
+import { API_URL, searchEntities } from './api.js';
 import { getReportHeader, printContent, renderTemplate } from './reports.js';
 
 function printLineTerm(recordData) {
@@ -35,13 +35,9 @@ window.openLineTermForm = (lineId, lineNumber) => {
     document.getElementById('line-term-number-display').value = lineNumber;
     document.getElementById('line-term-delivery-date').value = formatDateForInput(new Date());
 
-    const employeeSelect = document.getElementById('line-term-employee-select');
-    const options = ['<option value="">Selecione...</option>'];
-    state.employees.forEach(e => {
-        options.push(`<option value="${e.matricula}">${e.name} (${e.matricula})</option>`);
-    });
-    // Define o HTML uma única vez, o que é muito mais eficiente.
-    employeeSelect.innerHTML = options.join('');
+    // O funcionário é escolhido pela pesquisa (/api/search), ligada em initLineRecordsModule
+    document.getElementById('line-term-employee-search').value = '';
+    document.getElementById('line-term-employee-select').innerHTML = '<option value="">Pesquise o funcionário acima...</option>';
 
     openModal(modal);
 }
@@ -50,6 +46,13 @@ export function initLineRecordsModule() {
     const form = document.getElementById('line-term-form');
     if (!form) return;
 
+    bindSearchSelect(
+        document.getElementById('line-term-employee-search'),
+        document.getElementById('line-term-employee-select'),
+        query => searchEntities(query, 'employee', { available: true }),
+        r => `<option value="${r.value}">${r.label} (${r.value})</option>`
+    );
+
     form.addEventListener('submit', async (e) => {
         e.preventDefault();
         const saveButton = form.querySelector('button[type="submit"]');
@@ -1,11 +1,15 @@
 // --- MÓDULO DE LINHAS (LINES.JS) ---
 
-import { state, updateState, fetchData } from '../app.js';
+import { state } from '../app.js';
 import { openModal, closeModal, showToast, formatDateForInput } from './ui.js';
-import { API_URL } from './api.js';
+import { API_URL, runImportJob } from './api.js';
 import { refreshDashboard } from './dashboard.js';
+import { createPagedList } from './paged_list.js';
 
-function renderLineTable(lineTableBody, noLinesMessage, linesToRender = state.lines) {
+// Página atual da tabela (criada em initLinesModule)
+let lineList = null;
+
+function renderLineTable(lineTableBody, noLinesMessage, linesToRender) {
     if (!lineTableBody || !noLinesMessage) return;
     lineTableBody.innerHTML = '';
 
@@ -40,7 +44,7 @@ function openLineForm(lineForm, lineFormModal, lineId = null) {
     const numberInput = document.getElementById('lineFormNumber');
     document.getElementById('line-id-input').value = lineId || '';
     if (lineId) {
-        const line = state.lines.find(l => l.id === lineId);
+        const line = lineList.find(l => l.id === lineId);
         document.getElementById('line-modal-title').textContent = "Editar Linha";
         numberInput.value = line.numero;
         numberInput.readOnly = true;
@@ -55,7 +59,7 @@ function openLineForm(lineForm, lineFormModal, lineId = null) {
 }
 
 async function showLineHistory(lineHistoryModal, lineId) {
-    const line = state.lines.find(l => l.id === lineId);
+    const line = lineList.find(l => l.id === lineId);
     if (!line) return;
 
     document.getElementById('history-line-number').textContent = `${line.numero} (${line.operadora})`;
@@ -104,10 +108,16 @@ export function initLinesModule() {
     const lineImportInput = document.getElementById('line-import-input');
 
     
+    lineList = createPagedList({
+        endpoint: 'lines',
+        render: items => renderLineTable(lineTableBody, noLinesMessage, items),
+        paginationId: 'line-pagination',
+        searchInput: lineSearchInput,
+    });
+
     if (manageLinesBtn) {
         manageLinesBtn.addEventListener('click', () => { 
-            renderLineTable(lineTableBody, noLinesMessage); 
-            if (lineSearchInput) lineSearchInput.value = '';
+            lineList.reset();
             openModal(lineListModal); 
         });
     }
@@ -137,12 +147,9 @@ export function initLinesModule() {
                 if (!res.ok) throw new Error(result.message);
                 showToast(result.message);
 
-                // Otimização: Recarrega apenas os dados de linhas e o dashboard.
-                const updatedLines = await fetchData('lines');
-                updateState({ lines: updatedLines });
-                await refreshDashboard();
+                // Recarrega só a página atual da tabela e o dashboard.
+                await Promise.all([lineList.load(), refreshDashboard()]);
                 closeModal(lineFormModal);
-                renderLineTable(lineTableBody, noLinesMessage, updatedLines);
             } catch (error) {
                 showToast(`Erro: ${error.message}`, true);
             }
@@ -173,11 +180,7 @@ export function initLinesModule() {
                     if (!res.ok) throw new Error(result.message);
                     showToast(result.message);
 
-                    // Otimização
-                    const updatedLines = await fetchData('lines');
-                    updateState({ lines: updatedLines });
-                    await refreshDashboard();
-                    renderLineTable(lineTableBody, noLinesMessage, updatedLines);
+                    await Promise.all([lineList.load(), refreshDashboard()]);
                 } catch (error) {
                     showToast(`Erro: ${error.message}`, true);
                 }
@@ -187,34 +190,10 @@ export function initLinesModule() {
         });
     }
 
-    if (lineSearchInput) {
-        lineSearchInput.addEventListener('input', (e) => {
-            const searchTerm = e.target.value.toLowerCase().trim();
-            const filteredLines = state.lines.filter(line =>
-                line.numero.toLowerCase().includes(searchTerm) ||
-                line.operadora.toLowerCase().includes(searchTerm)
-            );
-            renderLineTable(lineTableBody, noLinesMessage, filteredLines);
-        });
-    }
-    
     if (lineExportBtn) {
+        // Gerado no servidor (/api/export) com a pesquisa atual
         lineExportBtn.addEventListener('click', () => {
-             if (!state.lines || state.lines.length === 0) {
-                showToast('Nenhuma linha para exportar.', true);
-                return;
-            }
-            const header = 'Numero,Operadora,Plano,Status,IMEI Vinculado\n';
-            const csvContent = state.lines.map(line => {
-                return `${line.numero},${line.operadora},${line.plano || ''},${line.status},${line.imeiVinculado || ''}`;
-            }).join('\n');
-            
-            const blob = new Blob([`\uFEFF${csvContent}`], { type: 'text/csv;charset=utf-8;' });
-            const link = document.createElement('a');
-            link.href = URL.createObjectURL(blob);
-            link.download = `linhas_${new Date().toISOString().slice(0, 10)}.csv`;
-            link.click();
-            URL.revokeObjectURL(link.href);
+            window.location.href = lineList.exportUrl('lines');
         });
     }
     
@@ -229,13 +208,7 @@ export function initLinesModule() {
             formData.append('currentUser', JSON.stringify(state.currentUser));
 
             try {
-                const res = await fetch(`${API_URL}/api/lines/import`, {
-                    method: 'POST',
-                    body: formData,
-                });
-
-                const result = await res.json();
-                if (!res.ok) throw new Error(result.message);
+                const result = await runImportJob('lines', formData);
 
                 showToast(result.message, false);
                 if (result.failures && result.failures.length > 0) {
@@ -243,18 +216,7 @@ export function initLinesModule() {
                     showToast(`${result.failures.length} linhas não puderam ser importadas. Verifique a consola.`, true);
                 }
 
-                await fetchAllData();
-                
-                const searchTerm = lineSearchInput ? lineSearchInput.value.toLowerCase().trim() : '';
-                if (searchTerm) {
-                    const filteredLines = state.lines.filter(line =>
-                        line.numero.toLowerCase().includes(searchTerm) ||
-                        line.operadora.toLowerCase().includes(searchTerm)
-                    );
-                    renderLineTable(lineTableBody, noLinesMessage, filteredLines);
-                } else {
-                    renderLineTable(lineTableBody, noLinesMessage, state.lines);
-                }
+                await Promise.all([lineList.load(), refreshDashboard()]);
 
             } catch (error) {
                 showToast(`Erro na importação: ${error.message}`, true);
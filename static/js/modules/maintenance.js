@@ -1,19 +1,24 @@
 // SMARTCONTROL/static/js/modules/maintenance.js
-import { state, fetchAllData, fetchData } from '../app.js';
+import { state } from '../app.js';
 import { openModal, closeModal, showToast, formatDateForInput } from './ui.js';
 import { API_URL } from './api.js';
 import { getReportHeader, printContent, renderTemplate } from './reports.js';
+import { refreshDashboard } from './dashboard.js';
+import { createPagedList } from './paged_list.js';
 
-function renderMaintenanceTable(maintenanceTableBody, noMaintenanceMessage) {
+// Página atual da tabela (criada em initMaintenanceModule)
+let maintenanceList = null;
+
+function renderMaintenanceTable(maintenanceTableBody, noMaintenanceMessage, items) {
     if (!maintenanceTableBody || !noMaintenanceMessage) return;
     maintenanceTableBody.innerHTML = "";
-    if (!state.maintenance || state.maintenance.length === 0) {
+    if (!items || items.length === 0) {
         noMaintenanceMessage.classList.remove('hidden');
         return;
     }
     noMaintenanceMessage.classList.add('hidden');
 
-    state.maintenance.forEach(item => {
+    items.forEach(item => {
         const tr = document.createElement('tr');
         tr.className = 'border-b';
         
@@ -49,17 +54,12 @@ async function openMaintenanceForm(maintenanceForm, maintenanceFormModal, maintI
     if (maintId) {
         // MODO EDIÇÃO
         try {
-            deviceSelect.innerHTML = '<option value="">-- selecione --</option>';
-            state.devices.forEach(d => {
-                const opt = document.createElement('option');
-                opt.value = d.id;
-                opt.textContent = `${d.model} (${d.imei1 || '-'})`;
-                deviceSelect.appendChild(opt);
-            });
-
             const data = await fetch(`${API_URL}/api/maintenance/${maintId}`).then(res => res.json());
             if(!data) throw new Error('Falha ao obter registo');
 
+            // O aparelho não muda na edição: basta a opção do próprio registo
+            deviceSelect.innerHTML = `<option value="${data.aparelho_id}">${data.modelo || 'N/A'} (${data.imei1 || '-'})</option>`;
+
             document.getElementById('maintenance-modal-title').textContent = `Editar OS ${data.numero_os || ''}`;
             maintIdInput.value = data.id;
             deviceSelect.value = data.aparelho_id;
@@ -115,7 +115,7 @@ async function generateRepairOrder(maintId) {
         return;
     }
     try {
-        const maintDetails = state.maintenance.find(m => m.id === maintId);
+        const maintDetails = maintenanceList.find(m => m.id === maintId);
         if (!maintDetails) throw new Error("Dados da manutenção não localizados.");
 
         const statusColors = { 'Concluído': '#10b981', 'Em manutenção': '#f59e0b', 'Cancelado': '#ef4444' };
@@ -171,9 +171,15 @@ export function initMaintenanceModule() {
     const addMaintenanceBtn = document.getElementById("add-maintenance-btn");
     const cancelMaintenanceFormBtn = document.getElementById("cancel-maintenance-form-btn");
 
+    maintenanceList = createPagedList({
+        endpoint: 'maintenance',
+        render: items => renderMaintenanceTable(maintenanceTableBody, noMaintenanceMessage, items),
+        paginationId: 'maintenance-pagination',
+    });
+
     if (manageMaintenanceBtn) {
         manageMaintenanceBtn.addEventListener("click", () => {
-            renderMaintenanceTable(maintenanceTableBody, noMaintenanceMessage);
+            maintenanceList.reset();
             openModal(maintenanceListModal);
         });
     }
@@ -211,12 +217,8 @@ export function initMaintenanceModule() {
                 showToast(result.message);
                 closeModal(maintenanceFormModal);
                 
-                // Otimização: Recarrega apenas os dados de manutenção e o dashboard.
-                const [updatedMaintenance, updatedDevices] = await Promise.all([fetchData('maintenance'), fetchData('devices')]);
-                updateState({ maintenance: updatedMaintenance, devices: updatedDevices });
-                await refreshDashboard();
-
-                renderMaintenanceTable(maintenanceTableBody, noMaintenanceMessage);
+                // Recarrega só a página atual da tabela e o dashboard.
+                await Promise.all([maintenanceList.load(), refreshDashboard()]);
 
             } catch (error) {
                 showToast(`Erro: ${error.message}`, true);
@@ -250,12 +252,7 @@ export function initMaintenanceModule() {
                     }
                     showToast('Registo removido.');
                     
-                    // Otimização: Recarrega apenas os dados de manutenção e o dashboard.
-                    const [updatedMaintenance, updatedDevices] = await Promise.all([fetchData('maintenance'), fetchData('devices')]);
-                    updateState({ maintenance: updatedMaintenance, devices: updatedDevices });
-                    await refreshDashboard();
-
-                    renderMaintenanceTable(maintenanceTableBody, noMaintenanceMessage);
+                    await Promise.all([maintenanceList.load(), refreshDashboard()]);
                 } catch (error) {
                     showToast(`Erro: ${error.message}`, true);
                 }
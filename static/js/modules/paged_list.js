@@ -0,0 +1,102 @@
+// SMARTCONTROL/static/js/modules/paged_list.js
+// Tabelas das janelas de gestão (funcionários, aparelhos, linhas, manutenções).
+// Cada página vem do servidor (?page=&limit=&q=) com o total da listagem, em vez de
+// descarregar a tabela inteira no arranque e filtrar/paginar no browser.
+
+import { API_URL, fetchData } from './api.js';
+
+export const PAGE_SIZE = 25;
+
+/**
+ * Cria o controlador de uma tabela paginada.
+ * @param {object} options
+ * @param {string} options.endpoint Listagem da API (ex: 'employees').
+ * @param {function(Array): void} options.render Desenha as linhas da página atual.
+ * @param {string} options.paginationId ID do contentor dos controlos de paginação.
+ * @param {HTMLInputElement} [options.searchInput] Caixa de pesquisa (enviada como ?q=).
+ */
+export function createPagedList({ endpoint, render, paginationId, searchInput = null, limit = PAGE_SIZE }) {
+    const list = { page: 1, total: 0, items: [], query: '' };
+    let latest = 0;
+    const paginationEl = document.getElementById(paginationId);
+
+    function queryParams(extra = {}) {
+        const params = new URLSearchParams(extra);
+        if (list.query) params.set('q', list.query);
+        return params;
+    }
+
+    function renderPagination() {
+        if (!paginationEl) return;
+        if (list.total === 0) {
+            paginationEl.innerHTML = '';
+            return;
+        }
+        const totalPages = Math.ceil(list.total / limit);
+        const start = (list.page - 1) * limit + 1;
+        const end = Math.min(list.page * limit, list.total);
+        const button = (page, label, disabled) =>
+            `<button data-page="${page}" class="px-3 py-1 rounded-md bg-gray-200 hover:bg-gray-300 ${disabled ? 'opacity-50 cursor-not-allowed' : ''}" ${disabled ? 'disabled' : ''}>${label}</button>`;
+        paginationEl.innerHTML = `
+            <p class="text-sm text-gray-600">Mostrando ${start} - ${end} de ${list.total} registos</p>
+            <div class="flex gap-2 items-center">
+                ${button(list.page - 1, 'Anterior', list.page <= 1)}
+                <span class="px-3 py-1 text-sm">${list.page} / ${totalPages}</span>
+                ${button(list.page + 1, 'Próximo', list.page >= totalPages)}
+            </div>
+        `;
+    }
+
+    async function load(page = list.page) {
+        const requestId = ++latest;
+        const data = await fetchData(`${endpoint}?${queryParams({ page, limit })}`);
+        if (requestId !== latest) return; // chegou um pedido mais recente (pesquisa/página)
+
+        list.items = data && Array.isArray(data.items) ? data.items : [];
+        list.total = data && data.total ? data.total : 0;
+        list.page = data && data.page ? data.page : page;
+        if (list.items.length === 0 && list.page > 1 && list.total > 0) {
+            // A página deixou de existir (ex: exclusão do último registo): vai para a última
+            return load(Math.ceil(list.total / limit));
+        }
+        render(list.items);
+        renderPagination();
+    }
+
+    if (paginationEl) {
+        paginationEl.addEventListener('click', (e) => {
+            const button = e.target.closest('button[data-page]');
+            if (!button || button.disabled) return;
+            load(parseInt(button.dataset.page, 10));
+        });
+    }
+
+    if (searchInput) {
+        let timer = null;
+        searchInput.addEventListener('input', () => {
+            clearTimeout(timer);
+            timer = setTimeout(() => {
+                list.query = searchInput.value.trim();
+                load(1);
+            }, 300);
+        });
+    }
+
+    return {
+        load,
+        // Ao abrir a janela: sem pesquisa, primeira página
+        reset() {
+            list.query = '';
+            if (searchInput) searchInput.value = '';
+            return load(1);
+        },
+        // Só procura na página atual (os botões das linhas pertencem sempre a ela)
+        find(predicate) {
+            return list.items.find(predicate);
+        },
+        // Exportação no servidor (/api/export) com a pesquisa atual
+        exportUrl(dataset, format = 'csv') {
+            return `${API_URL}/api/export/${dataset}?${queryParams({ format })}`;
+        },
+    };
+}
@@ -2,7 +2,7 @@
 
 import { state } from '../app.js';
 import { showToast } from './ui.js';
-import { fetchItemById } from './api.js';
+import { fetchItemById, fetchOneBy } from './api.js';
 import { getReportHeader, printContent, renderTemplate } from './reports.js';
 import { initRecordsFormModule, openRecordForm } from './records_form.js';
 import { initRecordsTableModule, fetchRecordsPage, renderMainTable } from './records_table.js'; // Import from records_table.js
@@ -63,15 +63,13 @@ export async function printSingleRecord(recordOrData) {
     let recordDataToPrint;
     try {
         if (typeof recordOrData === 'object' && recordOrData !== null) {
-            const employee = state.employees.find(e => e.matricula === recordOrData.employeeMatricula);
-            recordDataToPrint = { ...recordOrData, employeeName: employee?.name || recordOrData.employeeName || recordOrData.employeeMatricula, employeePosition: employee?.position || recordOrData.employeePosition || 'N/A' };
+            recordDataToPrint = { ...recordOrData, employeeName: recordOrData.employeeName || recordOrData.employeeMatricula, employeePosition: recordOrData.employeePosition || 'N/A' };
         }
         else if (typeof recordOrData === 'number' || (typeof recordOrData === 'string' && !isNaN(parseInt(recordOrData)))) {
              const recordId = parseInt(recordOrData, 10);
              const record = await fetchItemById('records', recordId);
              if (!record) throw new Error('Registo não encontrado para impressão.');
-             const employee = state.employees.find(e => e.matricula === record.employeeMatricula);
-             recordDataToPrint = { ...record, employeeName: employee?.name || record.employeeMatricula, employeePosition: employee?.position || 'N/A' };
+             recordDataToPrint = { ...record, employeeName: record.employeeName || record.employeeMatricula, employeePosition: record.employeePosition || 'N/A' };
         } else { throw new Error('Dados inválidos fornecidos para impressão.'); }
         if (!recordDataToPrint) { throw new Error('Não foi possível obter os dados para impressão.'); }
         const content = generatePrintableTermHTML(recordDataToPrint);
@@ -94,7 +92,7 @@ export function initRecordsModule() {
     // Listener botão Imprimir DENTRO do modal
     const printTermBtn = document.getElementById('print-term-btn');
     if(printTermBtn) {
-        printTermBtn.addEventListener('click', (e) => {
+        printTermBtn.addEventListener('click', async (e) => {
             e.stopPropagation();
             e.preventDefault();
 
@@ -103,15 +101,15 @@ export function initRecordsModule() {
                 printSingleRecord(parseInt(recordId, 10)); // Edição
             } else {
                  // Novo Termo
-                 isPrinting = true;
                  if (isPrinting) { console.warn("Impressão já em andamento."); return; }
+                 isPrinting = true;
                  try {
-                     const employeeSelect = document.getElementById('employeeSelect');
-                     const deviceSelect = document.getElementById('deviceSelect');
-                     const selectedEmployee = state.employees.find(emp => emp.matricula === employeeSelect.value);
-                     const selectedDevice = state.devices.find(d => d.imei1 === deviceSelect.value);
-                     if (!selectedEmployee || !selectedDevice) { showToast("Selecione Funcionário e Aparelho para imprimir.", true); return; } // Valida
-                     const formDataForPrint = { id: 'Novo', employeeName: selectedEmployee.name, employeeMatricula: selectedEmployee.matricula, employeePosition: selectedEmployee.position, deviceModel: selectedDevice.model, deviceImei: selectedDevice.imei1, deviceLine: document.getElementById('deviceLineDisplay').value || 'N/A', deliveryDate: document.getElementById('deliveryDate').value, deliveryCondition: document.getElementById('deliveryCondition').value, deliveryNotes: document.getElementById('deliveryNotes').value, accessories: Array.from(document.querySelectorAll('input[name="accessories"]:checked')).map(cb => cb.value), delivery_checker: state.currentUser?.nome || 'N/A', data_devolucao: null, condicao_devolucao: null, notas_devolucao: null, return_checker: null };
+                     const employeeOption = document.getElementById('employeeSelect').selectedOptions[0];
+                     const deviceOption = document.getElementById('deviceSelect').selectedOptions[0];
+                     if (!employeeOption?.value || !deviceOption?.value) { showToast("Selecione Funcionário e Aparelho para imprimir.", true); return; } // Valida
+                     // O cargo não vem na pesquisa: busca só este funcionário
+                     const selectedEmployee = await fetchOneBy('employees', 'matricula', employeeOption.value);
+                     const formDataForPrint = { id: 'Novo', employeeName: employeeOption.dataset.name, employeeMatricula: employeeOption.value, employeePosition: selectedEmployee?.position || 'N/A', deviceModel: deviceOption.dataset.model, deviceImei: deviceOption.value, deviceLine: document.getElementById('deviceLineDisplay').value || 'N/A', deliveryDate: document.getElementById('deliveryDate').value, deliveryCondition: document.getElementById('deliveryCondition').value, deliveryNotes: document.getElementById('deliveryNotes').value, accessories: Array.from(document.querySelectorAll('input[name="accessories"]:checked')).map(cb => cb.value), delivery_checker: state.currentUser?.nome || 'N/A', data_devolucao: null, condicao_devolucao: null, notas_devolucao: null, return_checker: null };
                      const content = generatePrintableTermHTML(formDataForPrint);
                      printContent(content);
                  } finally {
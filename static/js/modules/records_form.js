@@ -1,8 +1,8 @@
 // SMARTCONTROL/static/js/modules/records_form.js
 
-import { state, fetchAllData, fetchData } from '../app.js';
-import { openModal, closeModal, showToast, formatDateForInput, setLoading, unsetLoading } from './ui.js';
-import { API_URL, fetchItemById, handleFileUpload } from './api.js';
+import { state } from '../app.js';
+import { openModal, closeModal, showToast, formatDateForInput, setLoading, unsetLoading, bindSearchSelect } from './ui.js';
+import { API_URL, fetchItemById, fetchOneBy, handleFileUpload, searchEntities } from './api.js';
 import { printSingleRecord } from './records.js'; // Importa a função de impressão
 import { fetchRecordsPage } from './records_table.js';
 import { refreshDashboard } from './dashboard.js';
@@ -72,17 +72,6 @@ export async function openRecordForm(recordId = null) {
         return;
     }
 
-    if (!recordId) {
-        showToast("A carregar dados atualizados...");
-        try {
-            await fetchAllData();
-        } catch (error) {
-            showToast("Erro ao carregar dados atualizados. Não é possível criar novo termo.", true);
-            console.error("Falha ao carregar dados em openRecordForm:", error);
-            return;
-        }
-    }
-
     form.reset();
     document.getElementById('record-id').value = recordId || '';
 
@@ -129,9 +118,7 @@ export async function openRecordForm(recordId = null) {
             const data = await fetchItemById('records', recordId);
             if (!data) { closeModal(modal); showToast("Termo não encontrado.", true); return; }
 
-            // CORREÇÃO: Comparar a matrícula do funcionário (e.matricula) com a matrícula do registro (data.employeeMatricula).
-            const employeeData = state.employees.find(e => e.matricula === data.employeeMatricula);
-            employeeSelect.innerHTML = `<option value="${data.employeeMatricula}" selected disabled>${employeeData ? `${employeeData.name} (${employeeData.matricula})` : `Matrícula: ${data.employeeMatricula}`}</option>`;
+            employeeSelect.innerHTML = `<option value="${data.employeeMatricula}" selected disabled>${data.employeeName ? `${data.employeeName} (${data.employeeMatricula})` : `Matrícula: ${data.employeeMatricula}`}</option>`;
             deviceSelect.innerHTML = `<option value="${data.deviceImei}" selected disabled>${data.deviceModel || 'Modelo Desconhecido'} (${data.deviceImei})</option>`;
             document.getElementById('deviceLineDisplay').value = data.deviceLine || 'Nenhuma';
             document.getElementById('deliveryDate').value = formatDateForInput(data.data_entrega);
@@ -168,24 +155,9 @@ export async function openRecordForm(recordId = null) {
         returnFieldset.classList.add('hidden');
         returnFieldset.querySelectorAll('select, input, textarea').forEach(el => el.disabled = true);
 
-        employeeSelect.innerHTML = '<option value="">Selecione um funcionário...</option>';
-        if (state.employees && Array.isArray(state.employees) && state.employees.length > 0) {
-            state.employees.forEach(e => {
-                employeeSelect.innerHTML += `<option value="${e.matricula}">${e.name} (${e.matricula})</option>`;
-            });
-        }
-
-        deviceSelect.innerHTML = '<option value="">Selecione um aparelho...</option>';
-        if (state.devices && Array.isArray(state.devices)) {
-            const availableDevices = state.devices.filter(d => d.status === 'Disponível');
-            if (availableDevices.length > 0) {
-                availableDevices.forEach(d => {
-                    deviceSelect.innerHTML += `<option value="${d.imei1}">${d.model} (${d.imei1})</option>`;
-                });
-            } else {
-                deviceSelect.innerHTML = '<option value="">Nenhum aparelho disponível</option>';
-            }
-        }
+        // Funcionário e aparelho são escolhidos pela pesquisa (/api/search), ligada em initRecordsFormModule
+        employeeSelect.innerHTML = '<option value="">Pesquise o funcionário acima...</option>';
+        deviceSelect.innerHTML = '<option value="">Pesquise um aparelho disponível acima...</option>';
 
         document.getElementById('deliveryDate').value = formatDateForInput(new Date());
         document.getElementById('deliveryCondition').value = 'Novo';
@@ -204,12 +176,30 @@ export function initRecordsFormModule() {
     if (deviceSelect) {
         const newSelect = deviceSelect.cloneNode(true);
         deviceSelect.parentNode.replaceChild(newSelect, deviceSelect);
-        newSelect.addEventListener('change', (e) => {
+        newSelect.addEventListener('change', async (e) => {
             const selectedImei = e.target.value;
-            const device = state.devices.find(d => d.imei1 === selectedImei);
             const lineDisplay = document.getElementById('deviceLineDisplay');
-            if (lineDisplay) { lineDisplay.value = device?.currentLine || 'Nenhuma'; }
+            if (!lineDisplay) return;
+            if (!selectedImei) { lineDisplay.value = ''; return; }
+            const device = await fetchOneBy('devices', 'imei1', selectedImei);
+            if (e.target.value === selectedImei) { lineDisplay.value = device?.currentLine || 'Nenhuma'; }
         });
+
+        // Só aparelhos livres (sem termo "Em Uso" e em condição de uso)
+        bindSearchSelect(
+            document.getElementById('deviceSearch'), newSelect,
+            query => searchEntities(query, 'device', { available: true }),
+            r => `<option value="${r.value}" data-model="${r.label}">${r.label} (${r.value})</option>`
+        );
+    }
+
+    const employeeSelect = document.getElementById('employeeSelect');
+    if (employeeSelect) {
+        bindSearchSelect(
+            document.getElementById('employeeSearch'), employeeSelect,
+            query => searchEntities(query, 'employee', { available: true }),
+            r => `<option value="${r.value}" data-name="${r.label}">${r.label} (${r.value})</option>`
+        );
     }
 
     const addRecordBtn = document.getElementById('add-record-btn');
@@ -257,8 +247,7 @@ export function initRecordsFormModule() {
                 success = true;
                 showToast(result.message);
                 if (method === 'POST' && result.newRecord) {
-                     const employee = state.employees.find(e => e.matricula === recordData.employeeMatricula);
-                     createdRecordDataForPrint = { ...result.newRecord, deliveryDate: recordData.deliveryDate, deliveryCondition: recordData.deliveryCondition, deliveryNotes: recordData.deliveryNotes, accessories: recordData.accessories, delivery_checker: recordData.deliveryChecker, employeePosition: employee?.position || 'N/A' };
+                     createdRecordDataForPrint = { ...result.newRecord, deliveryDate: recordData.deliveryDate, deliveryCondition: recordData.deliveryCondition, deliveryNotes: recordData.deliveryNotes, accessories: recordData.accessories, delivery_checker: recordData.deliveryChecker, employeePosition: result.newRecord.employeePosition || 'N/A' };
                 }
 
                 closeModal(recordModal);
@@ -2,12 +2,19 @@
 
 import { state } from '../app.js';
 import { openModal, closeModal, showToast, formatDateForInput } from './ui.js';
+import { API_URL, fetchData } from './api.js';
+
+// Totais dos cabeçalhos calculados no servidor (/api/reports/summary, em cache)
+async function fetchReportSummary() {
+    const summary = await fetchData('reports/summary');
+    return summary && summary.devices ? summary : null;
+}
 
 export function getReportHeader() {
     const info = state.companyInfo;
-    const logoHtml = info && info.logo
+    const logoHtml = info && info.reportLogoUrl
         // Aplicamos a classe 'company-logo' e removemos estilos inline exceto object-fit
-        ? `<img src="data:image/png;base64,${info.logo}" alt="Logótipo" class="company-logo" style="object-fit:contain;" onerror="this.style.display='none'">`
+        ? `<img src="${API_URL}${info.reportLogoUrl}" alt="Logótipo" class="company-logo" style="object-fit:contain;" onerror="this.style.display='none'">`
         : '';
 
     // Usamos classes CSS para estrutura
@@ -53,10 +60,25 @@ export function renderTemplate(templateId, data) {
     }
     return html;
 }
-// Adicione estas funções melhoradas ao reports.js
+// Tabela de um relatório impresso (resumo ou detalhe)
+function reportTable(headers, dataRows, footerRow = '') {
+    return `
+        <table style="width:100%; border-collapse:collapse; font-size:10px;">
+            <thead>
+                <tr style="background:#333; color:white;">
+                    ${headers.map(h => `<th style="padding:12px 8px; text-align:left; font-weight:600; border:1px solid #555;">${h}</th>`).join('')}
+                </tr>
+            </thead>
+            <tbody>
+                ${dataRows.join('')}
+            </tbody>
+            ${footerRow ? `<tfoot>${footerRow}</tfoot>` : ''}
+        </table>
+    `;
+}
 
-// Função base melhorada para gerar relatórios
-function generateReport(title, headers, dataRows, reportModal, subtitle = '') {
+// Função base dos relatórios impressos: resumo agregado e, a seguir, a listagem detalhada
+function generateReport(title, headers, dataRows, reportModal, subtitle = '', footerRow = '', detail = null) {
     const now = new Date();
     const timestamp = `${now.toLocaleDateString('pt-BR')} às ${now.toLocaleTimeString('pt-BR')}`;
     
@@ -80,20 +102,16 @@ function generateReport(title, headers, dataRows, reportModal, subtitle = '') {
                     <p style="margin:0; font-size:14px;">⚠️ Nenhum dado disponível para este relatório.</p>
                 </div>
             ` : `
-                <table style="width:100%; border-collapse:collapse; font-size:10px;">
-                    <thead>
-                        <tr style="background:#333; color:white;">
-                            ${headers.map(h => `<th style="padding:12px 8px; text-align:left; font-weight:600; border:1px solid #555;">${h}</th>`).join('')}
-                        </tr>
-                    </thead>
-                    <tbody>
-                        ${dataRows.join('')}
-                    </tbody>
-                </table>
+                ${reportTable(headers, dataRows, footerRow)}
+
+                ${detail ? `
+                    <h3 style="font-size:14px; font-weight:700; margin:32px 0 12px 0;">${detail.title}</h3>
+                    ${reportTable(detail.headers, detail.rows)}
+                ` : ''}
                 
                 <div style="margin-top:20px; padding:12px; background:#f0f0f0; border-radius:4px;">
                     <p style="margin:0; font-size:10px; color:#666;">
-                        <strong>Total de registos:</strong> ${dataRows.length} | 
+                        ${detail ? `<strong>Total de registos:</strong> ${detail.rows.length} | ` : ''}
                         <strong>Relatório:</strong> ${title}
                     </p>
                 </div>
@@ -111,169 +129,202 @@ function generateReport(title, headers, dataRows, reportModal, subtitle = '') {
     closeModal(reportModal);
 }
 
-// Relatório Geral de Movimentações - MELHORADO
-function generateGeneralReport(reportModal) {
-    const headers = ['Funcionário', 'Matrícula', 'Aparelho', 'IMEI', 'Linha', 'Data Entrega', 'Status'];
-    
-    const rows = state.records.map((r, index) => {
-        const bgColor = index % 2 === 0 ? '#ffffff' : '#f9f9f9';
-        const statusColor = r.status === 'Em Uso' ? '#3b82f6' : '#10b981';
-        const deliveryDate = new Date(r.deliveryDate + 'T00:00:00').toLocaleDateString('pt-BR');
-        
-        return `
-            <tr style="background:${bgColor}; border-bottom:1px solid #e5e7eb;">
-                <td style="padding:10px 8px; border:1px solid #e5e7eb;">${r.employeeName}</td>
-                <td style="padding:10px 8px; border:1px solid #e5e7eb; text-align:center;">${r.employeeMatricula}</td>
-                <td style="padding:10px 8px; border:1px solid #e5e7eb;">${r.deviceModel}</td>
-                <td style="padding:10px 8px; border:1px solid #e5e7eb; font-family:monospace;">${r.deviceImei}</td>
-                <td style="padding:10px 8px; border:1px solid #e5e7eb; text-align:center;">${r.deviceLine || '---'}</td>
-                <td style="padding:10px 8px; border:1px solid #e5e7eb; text-align:center;">${deliveryDate}</td>
-                <td style="padding:10px 8px; border:1px solid #e5e7eb; text-align:center;">
-                    <span style="padding:4px 8px; background:${statusColor}; color:white; border-radius:12px; font-size:9px; font-weight:600;">
-                        ${r.status}
-                    </span>
-                </td>
-            </tr>
-        `;
-    });
-    
-    const subtitle = `Total de movimentações: ${state.records.length} | Em uso: ${state.records.filter(r => r.status === 'Em Uso').length}`;
-    generateReport('Relatório Geral de Movimentações', headers, rows, reportModal, subtitle);
+const CELL_STYLE = 'padding:10px 8px; border:1px solid #e5e7eb;';
+
+function formatMoney(value) {
+    return value === null || value === undefined ? '---' : `R$ ${Number(value).toFixed(2)}`;
 }
 
-// Relatório de Inventário de Aparelhos - MELHORADO
-function generateDevicesReport(reportModal) {
-    const headers = ['Modelo', 'IMEI', 'Status', 'Condição', 'Linha', 'Funcionário'];
-    
-    const rows = state.devices.map((d, index) => {
-        const bgColor = index % 2 === 0 ? '#ffffff' : '#f9f9f9';
-        
-        let empName = '---';
-        if (d.status === 'Em uso') {
-            const rec = state.records.find(r => r.deviceImei === d.imei1 && r.status === 'Em Uso');
-            if (rec) empName = rec.employeeName;
-        }
-        
-        const statusColors = {
-            'Em uso': '#3b82f6',
-            'Disponível': '#10b981',
-            'Indisponível': '#f59e0b'
-        };
-        
-        const conditionColors = {
-            'Novo': '#3b82f6',
-            'Aprovado para uso': '#10b981',
-            'Em manutenção': '#f59e0b',
-            'Danificado': '#ef4444',
-            'Sinistrado': '#dc2626',
-            'Com Defeito': '#ec4899'
-        };
-        
-        return `
-            <tr style="background:${bgColor}; border-bottom:1px solid #e5e7eb;">
-                <td style="padding:10px 8px; border:1px solid #e5e7eb;">${d.model}</td>
-                <td style="padding:10px 8px; border:1px solid #e5e7eb; font-family:monospace;">${d.imei1}</td>
-                <td style="padding:10px 8px; border:1px solid #e5e7eb; text-align:center;">
-                    <span style="padding:4px 8px; background:${statusColors[d.status] || '#6b7280'}; color:white; border-radius:12px; font-size:9px; font-weight:600;">
-                        ${d.status}
-                    </span>
-                </td>
-                <td style="padding:10px 8px; border:1px solid #e5e7eb; text-align:center;">
-                    <span style="padding:4px 8px; background:${conditionColors[d.condition] || '#6b7280'}; color:white; border-radius:12px; font-size:9px; font-weight:600;">
-                        ${d.condition}
-                    </span>
-                </td>
-                <td style="padding:10px 8px; border:1px solid #e5e7eb; text-align:center;">${d.currentLine || '---'}</td>
-                <td style="padding:10px 8px; border:1px solid #e5e7eb;">${empName}</td>
-            </tr>
-        `;
-    });
-    
-    const emUso = state.devices.filter(d => d.status === 'Em uso').length;
-    const disponiveis = state.devices.filter(d => d.status === 'Disponível').length;
-    const subtitle = `Total: ${state.devices.length} | Em uso: ${emUso} | Disponíveis: ${disponiveis}`;
-    
-    generateReport('Relatório de Inventário de Aparelhos', headers, rows, reportModal, subtitle);
+function formatDate(value) {
+    return value ? new Date(formatDateForInput(value) + 'T00:00:00').toLocaleDateString('pt-BR') : '---';
 }
 
-// Relatório de Linhas - MELHORADO
-function generateLinesReport(reportModal) {
-    const headers = ['Número', 'Operadora', 'Plano', 'Status', 'Aparelho Vinculado'];
-    
-    const rows = state.lines.map((line, index) => {
-        const bgColor = index % 2 === 0 ? '#ffffff' : '#f9f9f9';
-        
-        const statusColors = {
-            'Ativa': '#10b981',
-            'Inativa': '#f59e0b',
-            'Cancelada': '#ef4444'
-        };
-        
-        return `
-            <tr style="background:${bgColor}; border-bottom:1px solid #e5e7eb;">
-                <td style="padding:10px 8px; border:1px solid #e5e7eb; font-weight:600;">${line.numero}</td>
-                <td style="padding:10px 8px; border:1px solid #e5e7eb;">${line.operadora}</td>
-                <td style="padding:10px 8px; border:1px solid #e5e7eb;">${line.plano || '---'}</td>
-                <td style="padding:10px 8px; border:1px solid #e5e7eb; text-align:center;">
-                    <span style="padding:4px 8px; background:${statusColors[line.status] || '#6b7280'}; color:white; border-radius:12px; font-size:9px; font-weight:600;">
-                        ${line.status}
-                    </span>
-                </td>
-                <td style="padding:10px 8px; border:1px solid #e5e7eb; font-family:monospace; text-align:center;">${line.imeiVinculado || '---'}</td>
-            </tr>
-        `;
-    });
-    
-    const ativas = state.lines.filter(l => l.status === 'Ativa').length;
-    const vinculadas = state.lines.filter(l => l.imeiVinculado).length;
-    const subtitle = `Total: ${state.lines.length} | Ativas: ${ativas} | Vinculadas: ${vinculadas}`;
-    
-    generateReport('Relatório de Inventário de Linhas Telefónicas', headers, rows, reportModal, subtitle);
+function badge(text, color) {
+    return `<span style="padding:4px 8px; background:${color || '#6b7280'}; color:white; border-radius:12px; font-size:9px; font-weight:600;">${text}</span>`;
 }
 
-// Relatório de Manutenção - MELHORADO
-function generateMaintenanceReport(reportModal) {
-    const headers = ['Nº OS', 'Aparelho', 'IMEI', 'Envio', 'Retorno', 'Defeito', 'Custo', 'Status'];
-    
-    const rows = state.maintenance.map((m, index) => {
+// Linha de detalhe: cells = [conteúdo] ou [conteúdo, estilo extra da célula]
+function detailRow(index, cells) {
+    const bgColor = index % 2 === 0 ? '#ffffff' : '#f9f9f9';
+    return `
+        <tr style="background:${bgColor}; border-bottom:1px solid #e5e7eb;">
+            ${cells.map(([content, style = '']) => `<td style="${CELL_STYLE} ${style}">${content ?? '---'}</td>`).join('')}
+        </tr>
+    `;
+}
+
+// Todas as linhas de uma listagem, em streaming (?stream=json), com os mesmos filtros da API
+async function fetchAll(endpoint, params = {}) {
+    const data = await fetchData(`${endpoint}?${new URLSearchParams({ ...params, stream: 'json' })}`);
+    return Array.isArray(data) ? data : [];
+}
+
+const CENTER = 'text-align:center;';
+const MONO = 'font-family:monospace;';
+
+const DEVICE_STATUS_COLORS = { 'Em uso': '#3b82f6', 'Disponível': '#10b981', 'Indisponível': '#f59e0b' };
+const DEVICE_CONDITION_COLORS = {
+    'Novo': '#3b82f6', 'Aprovado para uso': '#10b981', 'Em manutenção': '#f59e0b',
+    'Danificado': '#ef4444', 'Sinistrado': '#dc2626', 'Com Defeito': '#ec4899',
+};
+const LINE_STATUS_COLORS = { 'Ativa': '#10b981', 'Inativa': '#f59e0b', 'Cancelada': '#ef4444' };
+const MAINTENANCE_STATUS_COLORS = { 'Em manutenção': '#f59e0b', 'Concluído': '#10b981', 'Cancelado': '#ef4444' };
+
+// Relatórios impressos: o resumo vem de /api/reports/<name>?group_by=... (GROUP BY no
+// servidor) e a listagem detalhada do endpoint da listagem em streaming (?stream=json).
+// columns: [{key, label, format?}] - primeiro as dimensões, depois as métricas.
+// detail: {title, headers, load()} - load devolve as linhas <tr> da listagem.
+const REPORT_DEFINITIONS = {
+    general: {
+        name: 'records',
+        groupBy: ['month', 'status'],
+        title: 'Relatório Geral de Movimentações',
+        columns: [
+            { key: 'month', label: 'Mês de Entrega' },
+            { key: 'status', label: 'Status' },
+            { key: 'total', label: 'Termos' },
+            { key: 'inUse', label: 'Em Uso' },
+            { key: 'returned', label: 'Devolvidos' },
+        ],
+        subtitle: summary => `Total de movimentações: ${summary.records.total} | Em uso: ${summary.records.inUse}`,
+        detail: {
+            title: 'Movimentações',
+            headers: ['Funcionário', 'Matrícula', 'Aparelho', 'IMEI', 'Linha', 'Data Entrega', 'Status'],
+            async load() {
+                const records = await fetchAll('records');
+                return records.map((r, index) => detailRow(index, [
+                    [r.employeeName], [r.employeeMatricula, CENTER], [r.deviceModel], [r.deviceImei, MONO],
+                    [r.deviceLine || '---', CENTER], [formatDate(r.deliveryDate), CENTER],
+                    [badge(r.status, r.status === 'Em Uso' ? '#3b82f6' : '#10b981'), CENTER],
+                ]));
+            },
+        },
+    },
+    devices: {
+        name: 'devices',
+        groupBy: ['model', 'condition'],
+        title: 'Relatório de Inventário de Aparelhos',
+        columns: [
+            { key: 'model', label: 'Modelo' },
+            { key: 'condition', label: 'Condição' },
+            { key: 'total', label: 'Aparelhos' },
+            { key: 'inUse', label: 'Em Uso' },
+            { key: 'unavailable', label: 'Indisponíveis' },
+        ],
+        subtitle: summary => `Total: ${summary.devices.total} | Em uso: ${summary.devices.inUse} | Disponíveis: ${summary.devices.available}`,
+        detail: {
+            title: 'Aparelhos',
+            headers: ['Modelo', 'IMEI', 'Status', 'Condição', 'Linha', 'Funcionário'],
+            async load() {
+                // Funcionário de cada aparelho em uso: pelos termos 'Em Uso'
+                const [devices, inUse] = await Promise.all([fetchAll('devices'), fetchAll('records', { filter: 'Em Uso' })]);
+                const employeeByImei = new Map(inUse.map(r => [r.deviceImei, r.employeeName]));
+                return devices.map((d, index) => detailRow(index, [
+                    [d.model], [d.imei1, MONO],
+                    [badge(d.status, DEVICE_STATUS_COLORS[d.status]), CENTER],
+                    [badge(d.condition, DEVICE_CONDITION_COLORS[d.condition]), CENTER],
+                    [d.currentLine || '---', CENTER], [employeeByImei.get(d.imei1) || '---'],
+                ]));
+            },
+        },
+    },
+    lines: {
+        name: 'lines',
+        groupBy: ['operator', 'status'],
+        title: 'Relatório de Inventário de Linhas Telefónicas',
+        columns: [
+            { key: 'operator', label: 'Operadora' },
+            { key: 'status', label: 'Status' },
+            { key: 'total', label: 'Linhas' },
+            { key: 'active', label: 'Ativas' },
+            { key: 'linked', label: 'Vinculadas' },
+        ],
+        subtitle: summary => `Total: ${summary.lines.total} | Ativas: ${summary.lines.active} | Vinculadas: ${summary.lines.linked}`,
+        detail: {
+            title: 'Linhas',
+            headers: ['Número', 'Operadora', 'Plano', 'Status', 'Aparelho Vinculado'],
+            async load() {
+                const lines = await fetchAll('lines');
+                return lines.map((line, index) => detailRow(index, [
+                    [line.numero, 'font-weight:600;'], [line.operadora], [line.plano || '---'],
+                    [badge(line.status, LINE_STATUS_COLORS[line.status]), CENTER],
+                    [line.imeiVinculado || '---', MONO + CENTER],
+                ]));
+            },
+        },
+    },
+    maintenance: {
+        name: 'maintenance',
+        groupBy: ['month', 'supplier'],
+        title: 'Relatório de Manutenção de Aparelhos',
+        columns: [
+            { key: 'month', label: 'Mês de Envio' },
+            { key: 'supplier', label: 'Fornecedor' },
+            { key: 'total', label: 'Ordens de Serviço' },
+            { key: 'open', label: 'Em Manutenção' },
+            { key: 'totalCost', label: 'Custo Total', format: formatMoney },
+            { key: 'averageCost', label: 'Custo Médio', format: formatMoney },
+        ],
+        subtitle: summary => `Total de OS: ${summary.maintenance.total} | Em manutenção: ${summary.maintenance.open} | Custo Total: ${formatMoney(summary.maintenance.totalCost)}`,
+        detail: {
+            title: 'Ordens de Serviço',
+            headers: ['Nº OS', 'Aparelho', 'IMEI', 'Envio', 'Retorno', 'Defeito', 'Custo', 'Status'],
+            async load() {
+                const orders = await fetchAll('maintenance');
+                return orders.map((m, index) => {
+                    const defect = m.defeito_reportado || '';
+                    return detailRow(index, [
+                        [m.numero_os || 'N/A', 'font-weight:600;'], [m.modelo || 'N/A'], [m.imei1 || 'N/A', MONO],
+                        [formatDate(m.data_envio), CENTER], [formatDate(m.data_retorno), CENTER],
+                        [defect.length > 50 ? `${defect.substring(0, 50)}...` : defect, 'font-size:9px;'],
+                        [m.custo ? formatMoney(m.custo) : '---', 'text-align:right; font-weight:600;'],
+                        [badge(m.status, MAINTENANCE_STATUS_COLORS[m.status]), CENTER],
+                    ]);
+                });
+            },
+        },
+    },
+};
+
+async function generateAggregateReport(definition, reportModal) {
+    const [report, summary, detailRows] = await Promise.all([
+        fetchData(`reports/${definition.name}?group_by=${definition.groupBy.join(',')}`),
+        fetchReportSummary(),
+        definition.detail.load(),
+    ]);
+    if (!report || !Array.isArray(report.rows)) {
+        showToast('Erro ao gerar o relatório.', true);
+        return;
+    }
+
+    const cell = (column, value) => {
+        const text = column.format ? column.format(value) : (value ?? '---');
+        return `<td style="${CELL_STYLE}">${text}</td>`;
+    };
+
+    const rows = report.rows.map((row, index) => {
         const bgColor = index % 2 === 0 ? '#ffffff' : '#f9f9f9';
-        const dataEnvio = formatDateForInput(m.data_envio);
-        const dataRetorno = m.data_retorno ? formatDateForInput(m.data_retorno) : '---';
-        const custo = m.custo ? `R$ ${parseFloat(m.custo).toFixed(2)}` : '---';
-        
-        const statusColors = {
-            'Em manutenção': '#f59e0b',
-            'Concluído': '#10b981',
-            'Cancelado': '#ef4444'
-        };
-        
         return `
             <tr style="background:${bgColor}; border-bottom:1px solid #e5e7eb;">
-                <td style="padding:10px 8px; border:1px solid #e5e7eb; font-weight:600;">${m.numero_os || 'N/A'}</td>
-                <td style="padding:10px 8px; border:1px solid #e5e7eb;">${m.modelo || 'N/A'}</td>
-                <td style="padding:10px 8px; border:1px solid #e5e7eb; font-family:monospace;">${m.imei1 || 'N/A'}</td>
-                <td style="padding:10px 8px; border:1px solid #e5e7eb; text-align:center;">${dataEnvio}</td>
-                <td style="padding:10px 8px; border:1px solid #e5e7eb; text-align:center;">${dataRetorno}</td>
-                <td style="padding:10px 8px; border:1px solid #e5e7eb; font-size:9px;">${(m.defeito_reportado || '').substring(0, 50)}${m.defeito_reportado && m.defeito_reportado.length > 50 ? '...' : ''}</td>
-                <td style="padding:10px 8px; border:1px solid #e5e7eb; text-align:right; font-weight:600;">${custo}</td>
-                <td style="padding:10px 8px; border:1px solid #e5e7eb; text-align:center;">
-                    <span style="padding:4px 8px; background:${statusColors[m.status] || '#6b7280'}; color:white; border-radius:12px; font-size:9px; font-weight:600;">
-                        ${m.status}
-                    </span>
-                </td>
+                ${definition.columns.map(column => cell(column, row[column.key])).join('')}
             </tr>
         `;
     });
-    
-    const emManutencao = state.maintenance.filter(m => m.status === 'Em manutenção').length;
-    const custoTotal = state.maintenance
-        .filter(m => m.custo)
-        .reduce((sum, m) => sum + parseFloat(m.custo), 0)
-        .toFixed(2);
-    
-    const subtitle = `Total de OS: ${state.maintenance.length} | Em manutenção: ${emManutencao} | Custo Total: R$ ${custoTotal}`;
-    
-    generateReport('Relatório de Manutenção de Aparelhos', headers, rows, reportModal, subtitle);
+
+    // Linha de totais: só as métricas somáveis (report.totals); as dimensões ficam em branco
+    const footerRow = `
+        <tr style="background:#f0f0f0; font-weight:700;">
+            ${definition.columns.map((column, index) => {
+                if (index === 0) return `<td style="${CELL_STYLE}">Total</td>`;
+                if (!(column.key in report.totals)) return `<td style="${CELL_STYLE}"></td>`;
+                return cell(column, report.totals[column.key]);
+            }).join('')}
+        </tr>
+    `;
+
+    const subtitle = summary ? definition.subtitle(summary) : '';
+    const detail = { title: definition.detail.title, headers: definition.detail.headers, rows: detailRows };
+    generateReport(definition.title, definition.columns.map(c => c.label), rows, reportModal, subtitle, footerRow, detail);
 }
 
 export function initReportsModule() {
@@ -287,9 +338,9 @@ export function initReportsModule() {
 
     if (generateReportBtn) generateReportBtn.addEventListener('click', () => openModal(reportModal));
     if (closeReportModalBtn) closeReportModalBtn.addEventListener('click', () => closeModal(reportModal));
-    if (reportGeneralBtn) reportGeneralBtn.addEventListener('click', () => generateGeneralReport(reportModal));
-    if (reportDevicesBtn) reportDevicesBtn.addEventListener('click', () => generateDevicesReport(reportModal));
-    if (reportLinesBtn) reportLinesBtn.addEventListener('click', () => generateLinesReport(reportModal));
-    if (reportMaintenanceBtn) reportMaintenanceBtn.addEventListener('click', () => generateMaintenanceReport(reportModal));
+    if (reportGeneralBtn) reportGeneralBtn.addEventListener('click', () => generateAggregateReport(REPORT_DEFINITIONS.general, reportModal));
+    if (reportDevicesBtn) reportDevicesBtn.addEventListener('click', () => generateAggregateReport(REPORT_DEFINITIONS.devices, reportModal));
+    if (reportLinesBtn) reportLinesBtn.addEventListener('click', () => generateAggregateReport(REPORT_DEFINITIONS.lines, reportModal));
+    if (reportMaintenanceBtn) reportMaintenanceBtn.addEventListener('click', () => generateAggregateReport(REPORT_DEFINITIONS.maintenance, reportModal));
 
 }
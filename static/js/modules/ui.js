@@ -100,4 +100,40 @@ export function unsetLoading(button) {
         delete button.dataset.originalContent;
     }
     button.disabled = false;
-}
\ No newline at end of file
+}
+/**
+ * Liga uma caixa de pesquisa a um <select>: ao escrever (com uma pausa de 300 ms),
+ * chama search(texto) e preenche o select com os resultados, em vez de carregar
+ * a lista completa no browser.
+ * @param {HTMLInputElement} input A caixa de pesquisa.
+ * @param {HTMLSelectElement} select O select a preencher.
+ * @param {function(string): Promise<Array>} search Devolve os resultados do texto.
+ * @param {function(object): string} toOption Devolve o HTML do <option> de um resultado.
+ * @param {function(): string} [baseOptions] Opções fixas no topo (ex: "Nenhuma"), em vez
+ *        do texto de ajuda; a opção escolhida mantém-se se continuar na lista.
+ */
+export function bindSearchSelect(input, select, search, toOption, baseOptions = null) {
+    let timer = null;
+    let latest = 0;
+    input.addEventListener('input', () => {
+        clearTimeout(timer);
+        timer = setTimeout(async () => {
+            const query = input.value.trim();
+            const requestId = ++latest;
+            const results = query.length >= 2 ? await search(query) : [];
+            if (requestId !== latest) return; // chegou uma pesquisa mais recente
+            if (baseOptions) {
+                const previous = select.value;
+                select.innerHTML = baseOptions() + results.map(toOption).join('');
+                if ([...select.options].some(option => option.value === previous)) select.value = previous;
+                return;
+            }
+            select.innerHTML = query.length < 2
+                ? '<option value="">Escreva pelo menos 2 caracteres para pesquisar...</option>'
+                : results.length === 0
+                    ? '<option value="">Nenhum resultado encontrado</option>'
+                    : `<option value="">Selecione (${results.length} resultado(s))...</option>` + results.map(toOption).join('');
+            select.dispatchEvent(new Event('change'));
+        }, 300);
+    });
+}
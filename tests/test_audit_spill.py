@@ -0,0 +1,63 @@
+# Ficheiro de spill da auditoria assíncrona: reposto na tabela por replay_spill.
+
+from datetime import datetime
+from routes.audit_helper import AuditWriter, replay_spill
+import os
+import pytest
+
+ROW = (datetime(2025, 3, 1, 10, 30), 1, 'admin', 'UPDATE', 'Device', 7, '{"message": "ok"}')
+
+
+class SpillCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def executemany(self, sql, rows):
+        if self.conn.fail:
+            raise RuntimeError('base de dados em baixo')
+        self.conn.pending.extend(rows)
+
+    def close(self):
+        pass
+
+
+class SpillConnection:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.pending = []
+        self.inserted = []
+
+    def cursor(self):
+        return SpillCursor(self)
+
+    def commit(self):
+        self.inserted.extend(self.pending)
+        self.pending = []
+
+    def rollback(self):
+        self.pending = []
+
+
+@pytest.fixture
+def spill_path(tmp_path):
+    path = str(tmp_path / 'audit_spill.jsonl')
+    AuditWriter(spill_path=path)._spill([ROW, ROW])
+    return path
+
+
+def test_replay_inserts_entries_and_removes_the_file(spill_path):
+    conn = SpillConnection()
+    assert replay_spill(conn, spill_path, batch_size=1) == 2
+    assert conn.inserted == [ROW, ROW]
+    assert os.listdir(os.path.dirname(spill_path)) == []
+
+
+def test_failed_replay_is_resumed_with_new_spill(spill_path):
+    with pytest.raises(RuntimeError):
+        replay_spill(SpillConnection(fail=True), spill_path)
+    assert os.path.exists(f"{spill_path}.replaying")
+
+    AuditWriter(spill_path=spill_path)._spill([ROW])  # entrada nova enquanto isso
+    conn = SpillConnection()
+    assert replay_spill(conn, spill_path) == 3
+    assert os.listdir(os.path.dirname(spill_path)) == []
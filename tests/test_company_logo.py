@@ -0,0 +1,51 @@
+# Cabeçalhos do logótipo servido por GET /api/company/logo.
+
+from flask import Flask, g
+from routes.company_routes import company_bp
+
+SVG = b'<svg xmlns="http://www.w3.org/2000/svg"><script>alert(1)</script></svg>'
+PNG = b'\x89PNG\r\n\x1a\n' + b'\x00' * 16
+
+
+class LogoCursor:
+    """Responde às duas consultas da rota: o hash e depois os bytes do logótipo."""
+
+    def __init__(self, data):
+        self.data = data
+        self.row = None
+
+    def execute(self, sql, params=()):
+        if 'logo_hash' in sql:
+            self.row = {'logo_hash': 'ab' * 32, 'has_report': 0}
+        else:
+            self.row = {'data': self.data}
+
+    def fetchone(self):
+        return self.row
+
+
+def _client(data):
+    app = Flask(__name__)
+    app.register_blueprint(company_bp, url_prefix='/api/company')
+
+    @app.before_request
+    def attach_cursor():
+        g.db_cursor = LogoCursor(data)
+
+    return app.test_client()
+
+
+def test_stored_svg_is_served_without_scripts():
+    response = _client(SVG).get('/api/company/logo')
+    assert response.status_code == 200
+    assert response.mimetype == 'image/svg+xml'
+    assert response.headers['Content-Security-Policy'] == "default-src 'none'; style-src 'unsafe-inline'"
+    assert response.headers['X-Content-Type-Options'] == 'nosniff'
+    assert response.headers['Content-Disposition'] == 'inline; filename=logo.svg'
+
+
+def test_raster_logo_gets_nosniff_only():
+    response = _client(PNG).get('/api/company/logo')
+    assert response.mimetype == 'image/png'
+    assert response.headers['X-Content-Type-Options'] == 'nosniff'
+    assert 'Content-Security-Policy' not in response.headers
@@ -0,0 +1,70 @@
+# Exportação XLSX: o texto das listagens nunca é gravado como fórmula.
+
+from routes import export_routes
+import pytest
+
+ROW = {'name': '=HYPERLINK("http://x","y")', 'matricula': '00123', 'position': 7, 'email': None}
+
+
+class FakeSheet:
+    def __init__(self, calls):
+        self.calls = calls
+
+    def write_row(self, *args):
+        pass
+
+    def __getattr__(self, method):
+        return lambda *args: self.calls.append((method,) + args[:3])
+
+
+class FakeWorkbook:
+    instances = []
+
+    def __init__(self, path, options):
+        self.options = options
+        self.calls = []
+        FakeWorkbook.instances.append(self)
+
+    def add_worksheet(self):
+        return FakeSheet(self.calls)
+
+    def add_format(self, props):
+        return props
+
+    def close(self):
+        pass
+
+
+class FakeCursor:
+    def __init__(self):
+        self.rows = [ROW]
+
+    def fetchmany(self, size):
+        rows, self.rows = self.rows, []
+        return rows
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def workbook(monkeypatch, tmp_path):
+    FakeWorkbook.instances.clear()
+    monkeypatch.setattr(export_routes, 'xlsxwriter', type('xlsxwriter', (), {'Workbook': FakeWorkbook}))
+    monkeypatch.setattr(export_routes, 'open_stream_cursor', lambda sql, params: FakeCursor())
+    columns = export_routes.EXPORTS['employees'][1]
+    export_routes._write_xlsx('SELECT 1', (), columns, str(tmp_path / 'out.xlsx'))
+    return FakeWorkbook.instances[0]
+
+
+def test_xlsx_disables_string_conversion(workbook):
+    assert workbook.options['strings_to_formulas'] is False
+    assert workbook.options['strings_to_numbers'] is False
+
+
+def test_xlsx_writes_text_as_strings(workbook):
+    assert workbook.calls == [
+        ('write_string', 1, 0, '=HYPERLINK("http://x","y")'),
+        ('write_string', 1, 1, '00123'),
+        ('write_number', 1, 2, 7),
+    ]
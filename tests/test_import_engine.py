@@ -0,0 +1,49 @@
+# Pré-passagem das importações (validate_import) contra a collation da base de dados.
+
+from flask import Flask
+from routes.import_engine import ImportSpec, validate_import
+import pytest
+
+SPEC = ImportSpec(
+    table='funcionarios', columns=('nome', 'matricula'), min_columns=2,
+    parse=lambda row: (row[0].strip(), row[1].strip()),
+    label=lambda row: f'Matrícula {row[1]}', name='funcionarios',
+    unique=[('matricula', 'Matrícula')],
+)
+
+
+class CollationCursor:
+    """Devolve os valores guardados que a collation *_ci (sem acentos/maiúsculas) considera iguais."""
+
+    def __init__(self, stored):
+        self.stored = stored
+        self.rows = []
+
+    def execute(self, sql, params):
+        fold = lambda v: v.rstrip().lower().replace('é', 'e')
+        wanted = {fold(v) for v in params}
+        self.rows = [{'value': v} for v in self.stored if fold(v) in wanted]
+
+    def fetchall(self):
+        return self.rows
+
+
+@pytest.fixture(autouse=True)
+def app_context():
+    with Flask(__name__).app_context():
+        yield
+
+
+def test_existing_value_with_different_accents_is_reported():
+    rows = [['Ana', 'JOSE01'], ['Rui', 'R02']]
+    report = validate_import(SPEC, rows, CollationCursor(['José01']))
+
+    assert report.existing == {2: 'Matrícula JOSE01: já existe na base de dados.'}
+    assert report.rejected == {}
+
+
+def test_file_duplicates_ignore_case_and_accents():
+    rows = [['Ana', 'José01'], ['Rui', 'jose01 ']]
+    report = validate_import(SPEC, rows, CollationCursor([]))
+
+    assert report.rejected == {3: 'Matrícula jose01: repetido no ficheiro (linha 2).'}
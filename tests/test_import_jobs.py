@@ -0,0 +1,96 @@
+# Jobs de importação que não chegam a correr não podem ficar 'Pendente'.
+
+from flask import Flask
+from routes import import_jobs
+import pytest
+
+
+class JobCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.rowcount = 0
+
+    def execute(self, sql, params=()):
+        self.conn.statements.append((sql, params))
+        self.rowcount = self.conn.rowcount
+
+    def close(self):
+        pass
+
+
+class JobConnection:
+    def __init__(self, rowcount=1):
+        self.rowcount = rowcount
+        self.statements = []
+        self.commits = 0
+        self.closed = False
+
+    def cursor(self, **kwargs):
+        return JobCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / 'import.csv'
+    path.write_text('nome;matricula\n')
+    return str(path)
+
+
+def _run(csv_path):
+    import_jobs._run_job(Flask(__name__), 7, None, csv_path, 1, 'admin', 'Funcionários', ())
+
+
+def test_job_without_connection_is_marked_failed_on_a_new_one(monkeypatch, csv_path):
+    retry = JobConnection()
+    connections = iter([None, retry])
+    monkeypatch.setattr(import_jobs, 'get_connection', lambda: next(connections))
+
+    _run(csv_path)
+
+    sql, params = retry.statements[0]
+    assert sql.startswith('UPDATE import_jobs SET status')
+    assert params == (import_jobs.JOB_FAILED, import_jobs.JOB_ERROR_MESSAGE, 7)
+    assert retry.commits == 1 and retry.closed
+
+
+def test_job_no_longer_pending_is_not_started(monkeypatch, csv_path):
+    conn = JobConnection(rowcount=0)  # já dado como órfão pelo batimento de outro processo
+    monkeypatch.setattr(import_jobs, 'get_connection', lambda: conn)
+
+    _run(csv_path)
+
+    assert len(conn.statements) == 1
+    assert conn.statements[0][1][-1] == import_jobs.JOB_PENDING
+    assert conn.closed
+
+
+def test_heartbeat_renews_own_jobs_and_expires_orphans(monkeypatch):
+    monkeypatch.setattr(import_jobs, '_active_jobs', {3, 1})
+    conn = JobConnection(rowcount=2)
+
+    assert import_jobs.heartbeat(conn) == 2
+
+    (renew_sql, renew_params), (expire_sql, expire_params) = conn.statements
+    assert renew_sql.startswith('UPDATE import_jobs SET heartbeat_em = NOW() WHERE id IN (%s, %s)')
+    assert renew_params == (1, 3)
+    assert 'COALESCE(heartbeat_em, criado_em)' in expire_sql
+    assert expire_params[2:] == (import_jobs.JOB_PENDING, import_jobs.JOB_RUNNING, import_jobs.IMPORT_JOB_STALE_MINUTES)
+    assert conn.commits == 1
+
+
+def test_finished_job_stops_its_heartbeat(monkeypatch, csv_path):
+    monkeypatch.setattr(import_jobs, '_active_jobs', {7})
+    monkeypatch.setattr(import_jobs, 'get_connection', lambda: JobConnection(rowcount=0))
+
+    _run(csv_path)
+
+    assert import_jobs._active_jobs == set()
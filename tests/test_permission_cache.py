@@ -0,0 +1,65 @@
+# Cache de permissões: a invalidação acompanha o commit real da requisição.
+
+from flask import Flask, g
+from config.database import LazyConnection
+from routes import decorators
+import pytest
+
+
+class StubConnection:
+    def cursor(self, **kwargs):
+        return None
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    decorators.invalidate_user_permissions()
+    yield
+    decorators.invalidate_user_permissions()
+
+
+def _request(deferred_commit=True):
+    app = Flask(__name__)
+    ctx = app.test_request_context()
+    ctx.push()
+    g.db_conn = LazyConnection(factory=StubConnection, deferred_commit=deferred_commit)
+    g.db_conn.cursor()  # a rota já usou a conexão
+    return ctx
+
+
+def test_invalidation_waits_for_the_real_commit():
+    decorators._store_permissions(5, 'user', {'users_update': True})
+    ctx = _request()
+    try:
+        g.db_conn.commit()  # diferido
+        decorators.invalidate_user_permissions_after_commit(5)
+        assert decorators._get_cached_permissions(5) is not None
+
+        g.db_conn.finish()
+        assert decorators._get_cached_permissions(5) is None
+    finally:
+        ctx.pop()
+
+
+def test_invalidation_dropped_on_rollback():
+    decorators._store_permissions(5, 'user', {})
+    ctx = _request()
+    try:
+        decorators.invalidate_user_permissions_after_commit(5)
+        g.db_conn.rollback()
+        assert decorators._get_cached_permissions(5) is not None
+    finally:
+        ctx.pop()
+
+
+def test_read_before_invalidation_is_not_stored():
+    generation = decorators._current_generation()
+    decorators.invalidate_user_permissions(5)  # commit de outra requisição a meio da leitura
+    decorators._store_permissions(5, 'administrador', {}, generation=generation)
+    assert decorators._get_cached_permissions(5) is None
@@ -0,0 +1,26 @@
+# Predicado keyset da listagem de termos: colunas guardadas, na forma que usa o índice (col, id).
+
+from routes.records_routes import _keyset_after
+import pytest
+
+
+def test_plain_column_uses_range_form():
+    sql, params = _keyset_after('r.data_entrega', 'deliveryDate', 'desc', '2025-03-01', 42)
+    assert sql == '(r.data_entrega < %s OR (r.data_entrega = %s AND r.id < %s))'
+    assert params == ['2025-03-01', '2025-03-01', 42]
+
+
+@pytest.mark.parametrize('direction, last, expected_sql, expected_params', [
+    # ORDER BY status segue o ENUM: desc = 'Devolvido' e depois 'Em Uso'
+    ('desc', 'Devolvido', '(r.status IN (%s) OR (r.status = %s AND r.id < %s))', ['Em Uso', 'Devolvido', 9]),
+    ('desc', 'Em Uso', '(r.status = %s AND r.id < %s)', ['Em Uso', 9]),
+    ('asc', 'Em Uso', '(r.status IN (%s) OR (r.status = %s AND r.id > %s))', ['Devolvido', 'Em Uso', 9]),
+    ('asc', 'Devolvido', '(r.status = %s AND r.id > %s)', ['Devolvido', 9]),
+])
+def test_status_follows_enum_order(direction, last, expected_sql, expected_params):
+    assert _keyset_after('r.status', 'status', direction, last, 9) == (expected_sql, expected_params)
+
+
+def test_unknown_status_in_cursor_is_rejected():
+    with pytest.raises(ValueError):
+        _keyset_after('r.status', 'status', 'asc', 'Perdido', 9)
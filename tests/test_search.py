@@ -0,0 +1,22 @@
+# Consulta da pesquisa unificada (build_search_sql) com e sem ?available=1.
+
+from routes.search_routes import build_search_sql
+
+
+def test_every_branch_returns_value_and_available():
+    sql, params = build_search_sql('galaxy', ['device', 'employee', 'line'], 10)
+    branches = sql.split(' UNION ALL ')
+    assert len(branches) == 6  # 4 por prefixo + 2 FULLTEXT
+    for branch in branches:
+        assert 'AS `value`' in branch and 'AS available' in branch
+        assert 'AND (' not in branch.split('WHERE', 1)[1]
+    assert sql.count('%s') == len(params)
+
+
+def test_available_filters_every_branch():
+    sql, params = build_search_sql('galaxy', ['device', 'employee', 'line'], 10, only_available=True)
+    for branch in sql.split(' UNION ALL '):
+        where = branch.split('WHERE', 1)[1]
+        assert ' AND (' in where
+    assert 'registro_atual_id IS NULL' in sql
+    assert sql.count('%s') == len(params)
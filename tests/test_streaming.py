@@ -0,0 +1,108 @@
+# Respostas em streaming com DB_UNIT_OF_WORK=true: o after_request faz finish()
+# (rollback) na conexão da requisição antes de o gerador ler as linhas.
+
+from flask import Flask, g
+from config.database import LazyConnection
+from routes import streaming
+import json
+import pytest
+
+ROWS = [{'id': 1, 'nome': 'Ana'}, {'id': 2, 'nome': 'Rui'}]
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.pending = []
+
+    def execute(self, sql, params=None):
+        self.pending = list(self.conn.rows)
+
+    def fetchmany(self, size):
+        rows, self.pending = self.pending[:size], self.pending[size:]
+        return rows
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, rows):
+        self.rows = rows
+        self.cursors = []
+        self.rolled_back = False
+        self.closed = False
+
+    def cursor(self, **kwargs):
+        cursor = FakeCursor(self)
+        self.cursors.append(cursor)
+        return cursor
+
+    def rollback(self):
+        # Como o mysql-connector: o rollback consome o resultado ainda por ler
+        for cursor in self.cursors:
+            cursor.pending = []
+        self.rolled_back = True
+
+    def commit(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def connections(monkeypatch):
+    request_conn = FakeConnection(ROWS)
+    stream_conn = FakeConnection(ROWS)
+    monkeypatch.setattr(streaming, 'get_connection', lambda: stream_conn)
+    return request_conn, stream_conn
+
+
+@pytest.fixture
+def app(connections):
+    request_conn, _ = connections
+    app = Flask(__name__)
+
+    @app.before_request
+    def db_connect():
+        g.db_conn = LazyConnection(factory=lambda: request_conn, deferred_commit=True)
+
+    @app.after_request
+    def db_commit(response):
+        g.db_conn.finish()
+        return response
+
+    @app.teardown_request
+    def db_disconnect(exception=None):
+        g.db_conn.close()
+
+    @app.route('/json')
+    def as_json():
+        g.db_conn.cursor().execute("SELECT 1")  # a rota já usou a conexão da requisição
+        return streaming.stream_query("SELECT id, nome FROM funcionarios", fmt='ndjson', batch_size=1)
+
+    @app.route('/csv')
+    def as_csv():
+        g.db_conn.cursor().execute("SELECT 1")
+        return streaming.stream_csv("SELECT id, nome FROM funcionarios", (),
+                                    [('id', 'Id'), ('nome', 'Nome')], 'funcionarios.csv')
+
+    return app
+
+
+def test_stream_query_survives_unit_of_work_finish(app, connections):
+    request_conn, stream_conn = connections
+    response = app.test_client().get('/json')
+
+    assert [json.loads(line) for line in response.get_data(as_text=True).splitlines()] == ROWS
+    assert request_conn.rolled_back
+    assert stream_conn.closed
+
+
+def test_stream_csv_survives_unit_of_work_finish(app, connections):
+    _, stream_conn = connections
+    response = app.test_client().get('/csv')
+
+    assert response.get_data(as_text=True).splitlines() == ['﻿Id,Nome', '1,Ana', '2,Rui']
+    assert stream_conn.closed
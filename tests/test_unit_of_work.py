@@ -0,0 +1,72 @@
+# Modo unit of work (DB_UNIT_OF_WORK=true): o commit diferido só acontece se a rota não falhou.
+
+from flask import g, jsonify
+from config.database import LazyConnection
+import pytest
+
+
+class StubConnection:
+    def __init__(self):
+        self.log = []
+
+    def cursor(self, **kwargs):
+        return StubCursor(self)
+
+    def commit(self):
+        self.log.append('COMMIT')
+
+    def rollback(self):
+        self.log.append('ROLLBACK')
+
+    def close(self):
+        pass
+
+
+class StubCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, sql, params=None):
+        self.conn.log.append('exec')
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # create_app escreve em logs/
+    from app import create_app
+    app = create_app()
+    stub = StubConnection()
+    app.stub = stub
+
+    @app.before_request
+    def use_stub():
+        g.db_conn = LazyConnection(factory=lambda: stub, deferred_commit=True)
+
+    def write_then(outcome):
+        g.db_conn.cursor().execute("UPDATE aparelhos SET modelo = 'x'")
+        g.db_conn.commit()
+        if outcome == 'raise':
+            raise RuntimeError('falha depois do commit')
+        if outcome == 'error':
+            return jsonify({'message': 'Erro'}), 500
+        return jsonify({'message': 'ok'})
+
+    app.add_url_rule('/uow/<outcome>', 'uow', write_then)
+    return app
+
+
+def test_commit_when_route_succeeds(app):
+    response = app.test_client().get('/uow/ok')
+    assert response.status_code == 200
+    assert app.stub.log == ['exec', 'COMMIT']
+
+
+@pytest.mark.parametrize('outcome', ['raise', 'error'])
+def test_rollback_when_route_fails_after_commit(app, outcome):
+    response = app.test_client().get(f'/uow/{outcome}')
+    assert response.status_code == 500
+    assert 'COMMIT' not in app.stub.log
+    assert app.stub.log[:2] == ['exec', 'ROLLBACK']
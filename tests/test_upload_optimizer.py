@@ -0,0 +1,84 @@
+# Pool de otimização dos uploads e regra "só publica se ficar mais pequeno" nos PDFs.
+
+from routes import upload_optimizer
+import os
+import types
+import pytest
+
+
+class FakePdf:
+    def __init__(self, size):
+        self.size = size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def save(self, path, **options):
+        with open(path, 'wb') as output:
+            output.write(b'%' * self.size)
+
+
+def _fake_pikepdf(size):
+    return types.SimpleNamespace(
+        open=lambda path: FakePdf(size),
+        ObjectStreamMode=types.SimpleNamespace(generate='generate'),
+    )
+
+
+@pytest.fixture
+def original_pdf(tmp_path):
+    path = tmp_path / 'abc.pdf'
+    path.write_bytes(b'%' * 100)
+    return str(path)
+
+
+def test_pdf_larger_than_original_is_discarded(monkeypatch, original_pdf):
+    monkeypatch.setattr(upload_optimizer, 'pikepdf', _fake_pikepdf(150))
+    assert upload_optimizer._optimize_pdf(original_pdf) == []
+    assert not os.path.exists(upload_optimizer.variant_path(original_pdf, 'opt'))
+    assert os.listdir(os.path.dirname(original_pdf)) == ['abc.pdf']  # sem temporários
+
+
+def test_smaller_pdf_is_published(monkeypatch, original_pdf):
+    monkeypatch.setattr(upload_optimizer, 'pikepdf', _fake_pikepdf(60))
+    optimized = upload_optimizer.variant_path(original_pdf, 'opt')
+    assert upload_optimizer._optimize_pdf(original_pdf) == [optimized]
+    assert os.path.getsize(optimized) == 60
+
+
+def test_executor_does_not_fork_and_shuts_down(monkeypatch):
+    monkeypatch.setattr(upload_optimizer, '_executor', None)
+    executor = upload_optimizer._get_executor()
+    try:
+        assert executor._mp_context.get_start_method() in ('forkserver', 'spawn')
+    finally:
+        upload_optimizer.shutdown()
+    assert upload_optimizer._executor is None
+
+
+class DoneFuture:
+    def __init__(self, error=None):
+        self.error = error
+
+    def cancelled(self):
+        return False
+
+    def exception(self):
+        return self.error
+
+    def result(self):
+        return []
+
+
+@pytest.mark.parametrize('error', [None, RuntimeError('pdf corrompido')])
+def test_finished_optimization_is_marked_even_without_variant(monkeypatch, original_pdf, error):
+    monkeypatch.setattr(upload_optimizer, 'pikepdf', _fake_pikepdf(150))
+    monkeypatch.setattr(upload_optimizer, 'UPLOAD_OPTIMIZE_WORKERS', 1)
+    assert not upload_optimizer.optimization_finished(original_pdf, 'pdf')
+
+    upload_optimizer._log_result(DoneFuture(error), original_pdf)
+
+    assert upload_optimizer.optimization_finished(original_pdf, 'pdf')
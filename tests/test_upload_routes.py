@@ -0,0 +1,38 @@
+# Cache dos ficheiros do store: max-age=0 só enquanto a otimização está pendente.
+
+from flask import Flask
+from routes import upload_optimizer, upload_routes, upload_store
+import pytest
+
+DIGEST = 'ab' * 32
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    monkeypatch.setattr(upload_store, 'UPLOAD_STORE_DIR', str(tmp_path))
+    monkeypatch.setattr(upload_optimizer, 'pikepdf', object())
+    monkeypatch.setattr(upload_optimizer, 'UPLOAD_OPTIMIZE_WORKERS', 1)
+    path = upload_store.path_for(DIGEST, 'pdf')
+    (tmp_path / DIGEST[:2] / DIGEST[2:4]).mkdir(parents=True)
+    with open(path, 'wb') as output:
+        output.write(b'%PDF-1.4')
+    app = Flask(__name__)
+    app.register_blueprint(upload_routes.upload_bp, url_prefix='/api/upload')
+    client = app.test_client()
+    client.path = path
+    return client
+
+
+def test_original_revalidates_while_optimization_is_pending(client):
+    response = client.get(f'/api/upload/files/{DIGEST}.pdf')
+    assert response.cache_control.max_age == 0
+    assert not response.cache_control.immutable
+    response.close()
+
+
+def test_original_is_immutable_once_optimization_finished(client):
+    upload_optimizer._mark_done(client.path)  # terminou sem versão mais pequena
+    response = client.get(f'/api/upload/files/{DIGEST}.pdf')
+    assert response.cache_control.max_age == upload_routes.UPLOAD_MAX_AGE
+    assert response.cache_control.immutable
+    response.close()